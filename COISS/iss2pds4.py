@@ -1,7 +1,7 @@
-import os, sys
-from Migrate import migrate_file
+import argparse, os, sys
+from BatchMigrate import DEFAULT_MANIFEST_FILEPATH, migrate_files
 
-def migrate1(pds3_file):
+def make_task(pds3_file):
     pds3_file = os.path.abspath(pds3_file)
     original_filepath = pds3_file[pds3_file.index('xxx/')+4:]
 
@@ -21,14 +21,28 @@ def migrate1(pds3_file):
         os.makedirs(out_dir)
 
     pds4_file = os.path.join(out_dir, sclk + camera + '.img')
-    migrate_file(pds3_file, output_filepath=pds4_file,
-                            original_filepath=original_filepath)
-
-for arg in sys.argv[1:]:
+    return (pds3_file, pds4_file, original_filepath)
+
+parser = argparse.ArgumentParser(
+    description='Migrate COISS VICAR files to PDS4 in parallel. Rerunning '
+                'with the same manifest skips files already migrated.')
+parser.add_argument('--jobs', type=int, default=None,
+                    help='number of worker processes (default: one per CPU)')
+parser.add_argument('--manifest', default=DEFAULT_MANIFEST_FILEPATH,
+                    help='manifest of completed files (default: %s)' %
+                         DEFAULT_MANIFEST_FILEPATH)
+parser.add_argument('--verify', action='store_true',
+                    help='verify that each output back-migrates to its input')
+parser.add_argument('paths', nargs='+',
+                    help='VICAR files or volume directories')
+args = parser.parse_args()
+
+tasks = []
+for arg in args.paths:
 
     if os.path.isfile(arg):
         if arg.endswith('.IMG') or arg.endswith('.img'):
-            migrate1(arg)
+            tasks.append(make_task(arg))
 
     elif os.path.isdir(arg):
         datapath = os.path.join(arg, 'data')
@@ -36,14 +50,11 @@ for arg in sys.argv[1:]:
             arg = datapath
 
         for root, dirs, files in os.walk(arg):
-            prev_root = ''
-            for name in files:
+            dirs.sort()
+            for name in sorted(files):
                 if name.endswith('.IMG') or name.endswith('.img'):
-
-                    if root != prev_root:
-                        print root
-                        prev_root = root
-
                     filename = os.path.join(root, name)
-                    migrate1(filename)
+                    tasks.append(make_task(filename))
 
+failures = migrate_files(tasks, args.manifest, args.jobs, verify=args.verify)
+sys.exit(1 if failures else 0)
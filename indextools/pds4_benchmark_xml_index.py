@@ -0,0 +1,215 @@
+"""
+XML Index Benchmark
+
+This script generates a synthetic bundle of PDS4 labels locally, holding the elements
+of sample_elements.txt among filler elements, and times pds4_create_xml_index.py on it.
+The XSD file named by the labels is put straight into a schema cache directory, and the
+index is built with --offline, so nothing is downloaded. Each run writes a profile report
+with --profile-report, and the wall time and the phase times of each run are printed.
+
+Usage:
+    python pds4_benchmark_xml_index.py
+        [--labels LABELS]
+        [--groups GROUPS]
+        [--fields FIELDS]
+        [--jobs JOBS [JOBS ...]]
+        [--directory DIRECTORY]
+        [--output-file OUTPUT_FILE]
+
+Arguments:
+    --labels LABELS      The number of labels in the bundle. The default is 1000.
+    --groups GROUPS      The number of groups of filler elements in each label. The
+                         default is 20.
+    --fields FIELDS      The number of filler elements in each group. The default is 10.
+    --jobs JOBS          The numbers of processes to build the index with; each is run
+                         once for all elements and once for sample_elements.txt. The
+                         default is 1.
+    --directory DIRECTORY
+                         The directory to generate the bundle in, which is kept. If not
+                         given, a temporary directory is used and removed afterwards.
+    --output-file OUTPUT_FILE
+                         An optional file to write the profile reports of all runs to,
+                         as JSON.
+"""
+import argparse
+import json
+from pathlib import Path
+import subprocess
+import sys
+import tempfile
+import time
+
+from pds4_create_xml_index import SchemaCache
+
+MODULE_DIR = Path(__file__).resolve().parent
+
+# The XSD URL named by the synthetic labels. It is only ever found in the schema cache.
+SCHEMA_URL = 'https://example.com/pds4/benchmark/PDS4_BENCHMARK_1000.xsd'
+
+NAMESPACE = 'http://pds.nasa.gov/pds4/pds/v1'
+
+# Every LABEL_NIL_INTERVAL-th label has a nil publication_date, to exercise the
+# handling of nillable elements.
+LABEL_NIL_INTERVAL = 10
+
+SCHEMA_TEMPLATE = f'''<?xml version="1.0" encoding="UTF-8"?>
+<xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema"
+    xmlns:pds="{NAMESPACE}" targetNamespace="{NAMESPACE}">
+  <xs:simpleType name="publication_date">
+    <xs:restriction base="pds:ASCII_Date_YMD"/>
+  </xs:simpleType>
+  <xs:element name="publication_date" type="pds:publication_date" nillable="true"/>
+</xs:schema>
+'''
+
+
+def generate_label(number, groups, fields):
+    """Return the text of a synthetic label.
+
+    Inputs:
+        number    The number of the label, used in its LID.
+        groups    The number of groups of filler elements.
+        fields    The number of filler elements in each group.
+    """
+    if number % LABEL_NIL_INTERVAL == 0:
+        publication_date = ('<publication_date xsi:nil="true" '
+                            'nilReason="unknown"/>')
+    else:
+        publication_date = (f'<publication_date>2024-01-{number % 28 + 1:02d}'
+                            '</publication_date>')
+
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             f'<Product_Observational xmlns="{NAMESPACE}"',
+             '    xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"',
+             f'    xsi:schemaLocation="{NAMESPACE} {SCHEMA_URL}">',
+             '  <Identification_Area>',
+             f'    <logical_identifier>urn:nasa:pds:benchmark:data:p{number:06d}'
+             '</logical_identifier>',
+             '    <version_id>1.0</version_id>',
+             f'    <title>Synthetic benchmark product {number}</title>',
+             '    <information_model_version>1.21.0.0</information_model_version>',
+             '    <product_class>Product_Observational</product_class>',
+             '    <Citation_Information>',
+             f'      <publication_year>{2000 + number % 25}</publication_year>',
+             f'      {publication_date}',
+             '      <description>A product generated for benchmarking.</description>',
+             '    </Citation_Information>',
+             '  </Identification_Area>',
+             '  <Observation_Area>']
+    for group in range(groups):
+        lines.append(f'    <Group_{group}>')
+        for field in range(fields):
+            lines.append(f'      <field_{field}>{number * fields + field}</field_{field}>')
+        lines.append(f'    </Group_{group}>')
+    lines += ['  </Observation_Area>',
+              '</Product_Observational>',
+              '']
+
+    return '\n'.join(lines)
+
+
+def generate_bundle(directory, labels, groups, fields):
+    """Generate a synthetic bundle, and a schema cache holding its XSD file.
+
+    Inputs:
+        directory    The directory to generate the bundle in.
+        labels       The number of labels.
+        groups       The number of groups of filler elements in each label.
+        fields       The number of filler elements in each group.
+
+    Returns:
+        The path to the schema cache directory.
+    """
+    data_dir = directory / 'bundle' / 'data'
+    data_dir.mkdir(parents=True, exist_ok=True)
+    for number in range(labels):
+        (data_dir / f'p{number:06d}.xml').write_text(
+            generate_label(number, groups, fields), encoding='utf8')
+
+    schema_cache = SchemaCache(directory / 'schemas')
+    schema_cache.xsd_path(SCHEMA_URL).write_text(SCHEMA_TEMPLATE, encoding='utf8')
+
+    return schema_cache.cache_dir
+
+
+def run_benchmark(directory, cache_dir, jobs, elements_file):
+    """Build the index of the synthetic bundle once, and return its profile report.
+
+    Inputs:
+        directory        The directory holding the synthetic bundle.
+        cache_dir        The schema cache directory.
+        jobs             The number of processes to build the index with.
+        elements_file    Optional elements file.
+
+    Returns:
+        The profile report, with the wall time of the run under 'wall_seconds'.
+    """
+    report_path = directory / 'profile.json'
+    command = [sys.executable, str(MODULE_DIR / 'pds4_create_xml_index.py'),
+               str(directory / 'bundle'), 'data/*.xml',
+               '--output-file', str(directory / 'index.csv'),
+               '--schema-cache-dir', str(cache_dir), '--offline',
+               '--jobs', str(jobs),
+               '--profile-report', str(report_path)]
+    if elements_file:
+        command += ['--elements-file', str(elements_file)]
+
+    start = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    wall_seconds = time.perf_counter() - start
+
+    with open(report_path, 'r', encoding='utf8') as report_file:
+        report = json.load(report_file)
+    report['wall_seconds'] = wall_seconds
+
+    return report
+
+
+def print_report(name, report):
+    """Print the wall time, the label times, and the phase times of a run."""
+    labels = report['labels']
+    print(f'{name}: {report["wall_seconds"]:.3f} s, '
+          f'{labels["count"] / report["wall_seconds"]:.1f} labels/s, '
+          f'label p50 {labels["p50"] * 1000:.2f} ms, '
+          f'p99 {labels["p99"] * 1000:.2f} ms')
+    for phase, times in report['phases'].items():
+        print(f'    {phase:16} {times["seconds"]:9.3f} s {times["count"]:9d}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--labels', type=int, default=1000,
+                        help='The number of labels in the bundle.')
+    parser.add_argument('--groups', type=int, default=20,
+                        help='The number of groups of filler elements in each label.')
+    parser.add_argument('--fields', type=int, default=10,
+                        help='The number of filler elements in each group.')
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1],
+                        help='The numbers of processes to build the index with.')
+    parser.add_argument('--directory', type=str,
+                        help='The directory to generate the bundle in, which is kept.')
+    parser.add_argument('--output-file', type=str,
+                        help='A file to write the profile reports of all runs to.')
+
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directory = Path(args.directory or temp_dir)
+        cache_dir = generate_bundle(directory, args.labels, args.groups, args.fields)
+
+        reports = {}
+        for jobs in args.jobs:
+            for elements_file in (None, MODULE_DIR / 'sample_elements.txt'):
+                name = (f'jobs={jobs} '
+                        f'elements={elements_file.name if elements_file else "all"}')
+                reports[name] = run_benchmark(directory, cache_dir, jobs,
+                                              elements_file)
+                print_report(name, reports[name])
+
+    if args.output_file:
+        with open(args.output_file, 'w', encoding='utf8') as output_file:
+            json.dump(reports, output_file, indent=1)
+
+
+if __name__ == '__main__':
+    main()
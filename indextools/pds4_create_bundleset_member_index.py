@@ -1,14 +1,19 @@
 """Create a csv file of a bundleset's members and their information.
 
 This module creates an index file containing the LIDs and filepaths of each
-bundle.xml file. There are two command-line arguments.
+bundle.xml file. There are four command-line arguments.
 
 Usage:
 
 python pds4_create_bundleset_member_index.py <bundleset_dir> [--filesuffix (xml|lblx)]
+    [--output-format (csv|parquet|arrow)] [--profile-report REPORT]
 
 <bundleset_dir> is the root directory of the bundleset.
 If given, --filesuffix specifies the type of label file; if not given, the default is xml
+If given, --output-format specifies the format of the index file: csv (the default),
+parquet, or arrow. Parquet and Arrow files need the pyarrow package.
+If given, --profile-report times the phases of the run, like finding and reading the
+labels, and writes a JSON report of them to the given file.
 """
 import argparse
 import os
@@ -25,7 +30,18 @@ def main():
     parser.add_argument('--filesuffix', type=str, default='xml',
                         help='The type of label file present within the collection')
 
+    parser.add_argument('--output-format', choices=list(tools.OUTPUT_SUFFIXES),
+                        default='csv',
+                        help='The format of the index file: csv, parquet, or arrow. '
+                             'The default is csv.')
+
+    parser.add_argument('--profile-report', type=str,
+                        help='Time the phases of the run, and write a JSON report of '
+                             'them to this file.')
+
     args = parser.parse_args()
+    if args.profile_report:
+        tools.PROFILE.enable()
     
     basedir, bundleset_name = os.path.split(
         tools.clean_directory_path(args.directorypath))
@@ -50,7 +66,11 @@ def main():
                 print(f'Data product with LID {lid} has no attributed filepath.')
                 sys.exit(1)
                 
-        tools.create_results_file(args.directorypath, 'bundleset', member_index)
+        tools.create_results_file(args.directorypath, 'bundleset', member_index,
+                                  args.output_format)
+
+    if args.profile_report:
+        tools.PROFILE.write_report(args.profile_report)
 
 
 if __name__ == '__main__':
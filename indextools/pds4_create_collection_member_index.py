@@ -1,15 +1,22 @@
 """Create a csv file of a collection product's information.
 
 This module creates an index file containing the LIDs, VIDs, Member Status,
-and filepaths of each file within a collection product. There are two command-line
+and filepaths of each file within a collection product. There are five command-line
 arguments.
 
 Usage:
 
 python pds4_create_collection_member_index.py <collection_dir> [--filesuffix (xml|lblx)]
+    [--incremental] [--output-format (csv|parquet|arrow)] [--profile-report REPORT]
 
 <collection_dir> is the root directory of the collection.
 If given, --filesuffix specifies the type of label file; if not given, the default is xml
+If given, --incremental keeps a label manifest next to the index file, and only reads
+the labels that are new or have changed since the last run.
+If given, --output-format specifies the format of the index file: csv (the default),
+parquet, or arrow. Parquet and Arrow files need the pyarrow package.
+If given, --profile-report times the phases of the run, like finding and reading the
+labels, and writes a JSON report of them to the given file.
 """
 import argparse
 import os
@@ -26,7 +33,22 @@ def main():
     parser.add_argument('--filesuffix', type=str, default='xml',
                         help='The type of label file present within the collection')
 
+    parser.add_argument('--incremental', action='store_true',
+                        help='Keep a manifest of the scraped labels next to the index '
+                             'file, and only read new or changed labels.')
+
+    parser.add_argument('--output-format', choices=list(tools.OUTPUT_SUFFIXES),
+                        default='csv',
+                        help='The format of the index file: csv, parquet, or arrow. '
+                             'The default is csv.')
+
+    parser.add_argument('--profile-report', type=str,
+                        help='Time the phases of the run, and write a JSON report of '
+                             'them to this file.')
+
     args = parser.parse_args()
+    if args.profile_report:
+        tools.PROFILE.enable()
     
     basedir, collection_name = os.path.split(
         tools.clean_directory_path(args.collectionpath))
@@ -64,17 +86,27 @@ def main():
                                             r'[\w-]+\.(?:'+re.escape(args.filesuffix)+')')
     # Crossmatches the LIDS of files with the collection product file's
     # contents.
+    if args.incremental:
+        manifest_path = tools.get_manifest_filepath(args.collectionpath, 'collection',
+                                                    args.output_format)
+    else:
+        manifest_path = None
     tools.dataprod_crossmatch(collprod_paths,
                               basedir,
                               collection_name,
-                              member_index)
+                              member_index,
+                              manifest_path)
     for key in member_index:
         if member_index[key]['Path'] is None:
             lid = member_index[key]['LID']
             print(f'Data product with LID {lid} has no attributed filepath.')
             sys.exit(1)
         
-    tools.create_results_file(args.collectionpath, 'collection', member_index)
+    tools.create_results_file(args.collectionpath, 'collection', member_index,
+                              args.output_format)
+
+    if args.profile_report:
+        tools.PROFILE.write_report(args.profile_report)
 
 
 if __name__ == '__main__':
@@ -16,6 +16,13 @@ Usage:
         [--clean-header-field-names]
         [--extra-file-info EXTRA_FILE_INFO]
         [--config-file CONFIG_FILE]
+        [--schema-cache-dir SCHEMA_CACHE_DIR]
+        [--offline]
+        [--jobs JOBS]
+        [--incremental]
+        [--output-format OUTPUT_FORMAT]
+        [--profile-report PROFILE_REPORT]
+        [--profile-slowest PROFILE_SLOWEST]
 
 Arguments:
     directorypath        The path to the directory containing the bundle to scrape.
@@ -24,7 +31,10 @@ Arguments:
                          may be specified separated by spaces. Surround each pattern
                          with quotes.
     --elements-file ELEMENTS_FILE
-                         Optional text file containing elements to scrape.
+                         Optional text file containing elements to scrape, one per
+                         line: either an element name, which matches the element
+                         wherever it appears, or an absolute path of element names
+                         like /Product_Observational/Identification_Area/title.
     --xpaths             Activate XPath headers in the final index file.
     --output-file OUTPUT_FILE
                          The output path and filename for the resulting index file.
@@ -39,6 +49,31 @@ Arguments:
                          specified separated by spaces.
     --config-file CONFIG_FILE
                          An optional .ini configuration file for further customization.
+    --schema-cache-dir SCHEMA_CACHE_DIR
+                         The directory in which to keep local copies of the XSD files
+                         named in the labels, and the nillable elements found in them.
+                         The default is ~/.cache/pds4indextools/schemas.
+    --offline            Only use the local copies in the schema cache directory; never
+                         download an XSD file.
+    --jobs JOBS          The number of processes to scrape the labels with. The index
+                         file is the same whatever the number. The default is 1.
+    --incremental        Keep a manifest of the scraped labels next to the index file, and
+                         only scrape the labels that are new or have changed since the
+                         last run.
+    --output-format OUTPUT_FORMAT
+                         The format of the index file: "csv" (the default), "parquet",
+                         or "arrow" (Arrow IPC). In Parquet and Arrow files, the columns
+                         of integer and real elements hold numbers. They need the
+                         pyarrow package.
+    --profile-report PROFILE_REPORT
+                         Time the phases of the run (globbing, parsing, schema lookups,
+                         traversal, tag conversion, spooling and writing) and each
+                         label, and write a JSON report of the phase times and counts
+                         and the percentiles of the label times to this file.
+    --profile-slowest PROFILE_SLOWEST
+                         With --profile-report, also profile each label with cProfile,
+                         and write the statistics of this many of the slowest labels
+                         next to the report, with the suffix .prof.
 
 Example:
 python3 pds4_create_xml_index.py <toplevel_directory> "glob_path1" "glob_path2" 
@@ -47,11 +82,33 @@ python3 pds4_create_xml_index.py <toplevel_directory> "glob_path1" "glob_path2"
 
 import argparse
 import configparser
+import cProfile
+import csv
+import functools
+import hashlib
+import heapq
+import itertools
+import json
 from lxml import etree
-import pandas as pd
+import math
+from multiprocessing import Pool
+import os
 from pathlib import Path
 import requests
 import sys
+import tempfile
+import time
+
+import pds4_index_tools as tools
+
+
+# The number of rows sorted in memory at a time when sorting the index.
+SORT_RUN_ROWS = 100000
+
+# The XSD data types whose values are written as integers or reals to Parquet and Arrow
+# index files.
+INTEGER_DATA_TYPES = {'pds:ASCII_Integer', 'pds:ASCII_NonNegative_Integer'}
+REAL_DATA_TYPES = {'pds:ASCII_Real'}
 
 
 def default_value_for_nil(config, data_type, nil_value):
@@ -75,44 +132,23 @@ def default_value_for_nil(config, data_type, nil_value):
     return default
 
 
-def convert_header_to_tag(path, root, namespaces):
-    """Convert an XPath expression to an XML tag.
+def convert_tag_to_header(tag, prefixes):
+    """Convert an XML tag to a column header, replacing its namespace with a prefix.
 
     Inputs:
-        path          XPath expression.
-        root          The root element of the XML document.
-        namespaces    Dictionary of XML namespace mappings.
+        tag         The XML tag, like "{namespace}name".
+        prefixes    Dictionary of XML namespace prefixes.
 
     Returns:
-        Converted XML tag.
+        Converted XML tag, like "prefix:name".
     """
-    tag = str(root.xpath(path, namespaces=namespaces)[0].tag)
+    for namespace in prefixes.keys():
+        if namespace in tag:
+            tag = tag.replace('{'+namespace+'}', prefixes[namespace]+':')
 
     return tag
 
 
-def convert_header_to_xpath(root, xpath_find, namespaces):
-    """Convert an XML header path to an XPath expression.
-
-    Inputs:
-        root           The root element of the XML document.
-        xpath_find     Original XML header path.
-        namespaces     Dictionary of XML namespace mappings.
-
-    Returns:
-        Converted XPath expression.
-    """
-    sections = xpath_find.split('/')
-    xpath_final = ''
-    portion = ''
-    for sec in sections[1:]:
-        portion = portion + '/' + sec
-        tag = str(root.xpath(portion, namespaces=namespaces)[0].tag)
-        xpath_final = xpath_final + '/' + tag
-
-    return xpath_final
-
-
 def load_config_file(specified_config_file):
     """Create a config object from a given configuration file.
 
@@ -146,19 +182,35 @@ def load_config_file(specified_config_file):
     
     return config
 
-def update_nillable_elements_from_xsd_file(xsd_file, nillable_elements_info):
-    """Store all nillable elements and their data types in a dictionary.
+def default_schema_cache_dir():
+    """Return the default directory for local copies of XSD files.
+
+    This follows $XDG_CACHE_HOME if it is set, and ~/.cache otherwise.
+
+    Returns:
+        The path to the schema cache directory.
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(cache_home) / 'pds4indextools' / 'schemas'
+
+
+def nillable_elements_from_xsd(xsd_content):
+    """Find all nillable elements of an XSD file and their data types.
 
     Inputs:
-        xsd file                  An XML Schema Definition file.
-        nillable_elements_info    A dictionary containing nillable element information.
+        xsd_content    The contents of an XML Schema Definition file.
+
+    Returns:
+        A dictionary of the base data types of the nillable elements, keyed by
+        element name.
     """
-    tree = etree.fromstring(requests.get(xsd_file).content)
+    tree = etree.fromstring(xsd_content)
     namespace = {'xs': 'http://www.w3.org/2001/XMLSchema'}
 
     elements_with_nillable = tree.xpath('//xs:element[@nillable="true"]',
                                         namespaces=namespace)
 
+    nillable_elements_info = {}
     for element in elements_with_nillable:
         name = element.get('name')
         type_attribute = element.get('type')
@@ -197,20 +249,130 @@ def update_nillable_elements_from_xsd_file(xsd_file, nillable_elements_info):
                     # Type definition not found, might be external or built-in type
                     nillable_elements_info[name] = 'External or built-in type'
 
+    return nillable_elements_info
+
+
+class SchemaCache:
+    """A cache of the nillable elements found in XSD files.
+
+    Each XSD URL is looked up at most once per run. On disk, the cache directory
+    holds a local copy of each XSD file, named by a hash of its URL, and the table of
+    nillable elements found in it, named by the hashes of its URL and its contents, so
+    that a changed local copy is parsed again. In offline mode, XSD files are never
+    downloaded, and only the local copies are used.
+    """
+
+    def __init__(self, cache_dir=None, offline=False):
+        """Create a schema cache.
+
+        Inputs:
+            cache_dir    The directory for local copies of XSD files, or None to keep
+                         the cache in memory only.
+            offline      If True, never download an XSD file.
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.offline = offline
+        self.nillable_tables = {}
+
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _url_key(self, url):
+        return hashlib.sha256(url.encode('utf8')).hexdigest()
+
+    def xsd_path(self, url):
+        """Return the path to the local copy of an XSD file, which may not exist."""
+        return self.cache_dir / f'{self._url_key(url)}.xsd'
+
+    def get_xsd_content(self, url):
+        """Return the contents of an XSD file.
+
+        The local copy is used if there is one. Otherwise, the file is downloaded and
+        a local copy saved.
 
-def process_schema_location(file_path):
+        Inputs:
+            url    The URL of the XSD file.
+
+        Returns:
+            The contents of the XSD file as bytes.
+        """
+        if self.cache_dir is not None:
+            xsd_path = self.xsd_path(url)
+            if xsd_path.exists():
+                return xsd_path.read_bytes()
+
+        if self.offline:
+            print(f'No local copy of {url} in the schema cache directory '
+                  f'{self.cache_dir} and --offline was given')
+            sys.exit(1)
+
+        response = requests.get(url)
+        response.raise_for_status()
+        content = response.content
+
+        if self.cache_dir is not None:
+            tools.write_file_atomically(xsd_path, content)
+
+        return content
+
+    def get_nillable_elements(self, url):
+        """Return the nillable elements found in an XSD file.
+
+        Inputs:
+            url    The URL of the XSD file.
+
+        Returns:
+            A dictionary of the base data types of the nillable elements, keyed by
+            element name. It must not be modified.
+        """
+        if url in self.nillable_tables:
+            return self.nillable_tables[url]
+
+        content = self.get_xsd_content(url)
+        table = None
+        if self.cache_dir is not None:
+            content_key = hashlib.sha256(content).hexdigest()
+            table_path = (self.cache_dir /
+                          f'{self._url_key(url)}-{content_key}.json')
+            if table_path.exists():
+                with open(table_path, 'r', encoding='utf8') as table_file:
+                    table = json.load(table_file)
+
+        if table is None:
+            table = nillable_elements_from_xsd(content)
+            if self.cache_dir is not None:
+                tools.write_file_atomically(table_path,
+                                            json.dumps(table, sort_keys=True,
+                                                       indent=1).encode('utf8'))
+
+        self.nillable_tables[url] = table
+        return table
+
+
+def update_nillable_elements_from_xsd_file(xsd_file, nillable_elements_info,
+                                           schema_cache=None):
+    """Store all nillable elements and their data types in a dictionary.
+
+    Inputs:
+        xsd file                  An XML Schema Definition file.
+        nillable_elements_info    A dictionary containing nillable element information.
+        schema_cache              The SchemaCache to look the XSD file up in. If None,
+                                  the file is downloaded and parsed.
+    """
+    if schema_cache is None:
+        schema_cache = SchemaCache()
+    nillable_elements_info.update(schema_cache.get_nillable_elements(xsd_file))
+
+
+def process_schema_location(root):
     """Process schema location from an XML file.
 
     Args:
-        file_path    Path to the XML file.
+        root    The root element of the XML document.
 
     Returns:
         List of XSD URLs extracted from the schema location.
     """
-    # Load and parse the XML file
-    tree = etree.parse(file_path)
-    root = tree.getroot()
-
     # Extract the xsi:schemaLocation attribute value
     schema_location_values = root.get(
         '{http://www.w3.org/2001/XMLSchema-instance}schemaLocation'
@@ -222,124 +384,884 @@ def process_schema_location(file_path):
     return xsd_urls
 
 
-def process_tags(xml_results, key, root, namespaces, prefixes, args):
-    """Process XML tags based on the provided options.
-
-    If the --xpaths command is used, the XPath is converted into a format that
-    contains the names and namespaces of all the parent elements of that element.
-    If the --xpaths command is not used, the XPath is converted into the
-    associated element tag of that element, and given its associated namespace. These
-    values then replace their old versions in the xml_results dictionary.
+def process_tags(xml_results, headers):
+    """Replace the keys of the results with their column headers.
 
+    If a header is shared by several keys, the last value is kept, in the position of
+    the first.
 
     Inputs:
-        xml_results    A dictionary containing XML data to be processed.
-        key            The key representing the XML tag to be processed.
-        root           The root element of the XML tree.
-        namespaces     A dictionary containing XML namespace mappings.
-        prefixes       A dictionary containing XML namespace prefixes.
-        args           Command-line arguments.
-    """
-    if args.xpaths:
-        key_new = convert_header_to_xpath(root, key, namespaces)
-        for namespace in prefixes.keys():
-            if namespace in key_new:
-                key_new = key_new.replace(
-                    '{'+namespace+'}', prefixes[namespace]+':')
-        xml_results[key_new] = xml_results[key]
-        del xml_results[key]
-    else:
-        key_new = convert_header_to_tag(key, root, namespaces)
-        for namespace in prefixes.keys():
-            if namespace in key_new:
-                key_new = key_new.replace(
-                    '{'+namespace+'}', prefixes[namespace]+':')
-        xml_results[key_new] = xml_results[key]
-        del xml_results[key]
+        xml_results    A dictionary of results keyed by element.
+        headers        A dictionary of the column header for each key.
 
+    Returns:
+        A dictionary of results keyed by column header.
+    """
+    processed_results = {}
+    for key, value in xml_results.items():
+        processed_results[headers[key]] = value
+
+    return processed_results
 
-def store_element_text(element, tree, results_dict, nillable_elements_info, config, label):
+
+def store_element_text(element, key, results_dict, nillable_elements_info, config,
+                       label):
     """Store text content of an XML element in a results dictionary.
 
     Inputs:
         element                   The XML element.
-        tree                      The XML tree.
+        key                       The key to store the element text under.
         results_dict              Dictionary to store results.
         nillable_elements_info    A dictionary containing nillable element information.
         config                    The configuration data.
         label                     The name of the label file.
     """
     if element.text and element.text.strip():
-        xpath = tree.getpath(element)
         text = ' '.join(element.text.strip().split())
 
         # Check if the tag already exists in the results dictionary
-        if xpath in results_dict:
+        if key in results_dict:
             # If the tag already exists, create a list to store multiple values
-            if not isinstance(results_dict[xpath], list):
-                results_dict[xpath] = [results_dict[xpath]]
-            results_dict[xpath].append(text)
+            if not isinstance(results_dict[key], list):
+                results_dict[key] = [results_dict[key]]
+            results_dict[key].append(text)
         else:
-            results_dict[xpath] = text
+            results_dict[key] = text
     else:
-        xpath = tree.getpath(element)
         tag = element.xpath('local-name()')
         nil_value = element.get('nilReason')
         if tag in nillable_elements_info.keys():
             data_type = nillable_elements_info[tag]
             default = default_value_for_nil(config, data_type, nil_value)
-            results_dict[xpath] = default
+            results_dict[key] = default
         else:
             parent_check = len(element)
             if not parent_check:
                 print(f'Non-nillable element in {label} has no associated text: {tag}')
-                
 
-def traverse_and_store(element, tree, results_dict, elements_to_scrape,
-                       nillable_elements_info, config, label):
+
+class ElementSelector:
+    """The elements to scrape from an elements file, compiled for matching.
+
+    Element names are kept in a set, and absolute paths of element names in a trie of
+    nested dictionaries, with the key None marking the end of a path. The parser is
+    given the names of all the elements that may be selected, so it reports no others,
+    and whole subtrees without them are never seen.
+    """
+
+    def __init__(self, elements_to_scrape):
+        """Compile the elements to scrape.
+
+        Inputs:
+            elements_to_scrape    List of element names and absolute element paths.
+        """
+        self.names = set()
+        self.trie = {}
+        tail_names = set()
+        for element in elements_to_scrape:
+            if element.startswith('/'):
+                path = element.strip('/').split('/')
+                node = self.trie
+                for name in path:
+                    node = node.setdefault(name, {})
+                node[None] = True
+                tail_names.add(path[-1])
+            else:
+                self.names.add(element)
+        self.tags = ['{*}' + name for name in sorted(self.names | tail_names)]
+
+    def matches(self, element, local_name):
+        """Return True if an element, reported by the parser, is selected."""
+        if local_name in self.names and element.tag.startswith('{'):
+            return True
+        node = self.trie
+        for ancestor in reversed(list(element.iterancestors())):
+            node = node.get(ancestor.tag.rpartition('}')[2])
+            if node is None:
+                return False
+        node = node.get(local_name)
+        return node is not None and None in node
+
+
+@functools.lru_cache(maxsize=None)
+def compile_element_selector(elements_to_scrape):
+    """Return the ElementSelector for a tuple of elements to scrape."""
+    return ElementSelector(elements_to_scrape)
+
+
+def parse_label_events(file, selector):
+    """Start parsing a label incrementally.
+
+    Inputs:
+        file        The path to the label file.
+        selector    The ElementSelector of the elements to scrape, or None for all.
+
+    Returns:
+        The root element, with its attributes, and an iterator over the remaining
+        parse events. Without a selector, they are the 'start', 'end', 'comment' and
+        'pi' events after the start of the root; with one, only the 'start' and 'end'
+        events of the elements that may be selected.
+    """
+    if selector is None:
+        events = etree.iterparse(str(file), events=('start', 'end', 'comment', 'pi'))
+        for event, root in events:
+            if event == 'start':
+                return root, events
+
+    events = etree.iterparse(str(file), events=('start', 'end'), tag=selector.tags)
+    for event, element in events:
+        return (element.getroottree().getroot(),
+                itertools.chain([(event, element)], events))
+    return events.root, iter(())
+
+
+def timed_events(events, phases):
+    """Yield parse events, adding the time spent parsing them to the 'parse' phase.
+
+    Inputs:
+        events    The parse events.
+        phases    A dictionary of phase times, as for tools.add_phase_time().
+    """
+    events = iter(events)
+    seconds = 0.0
+    try:
+        while True:
+            start = time.perf_counter()
+            event = next(events, None)
+            seconds += time.perf_counter() - start
+            if event is None:
+                return
+            yield event
+    finally:
+        tools.add_phase_time(phases, 'parse', seconds, 0)
+
+
+def traverse_and_store(root, events, results_dict, headers, selector,
+                       nillable_elements_info, config, label, prefixes, xpaths,
+                       phases=None):
     """Traverse an XML tree and store text content of specified elements in a dictionary.
 
+    The tree is traversed as it is parsed, from the events of parse_label_events().
+    Each element is stored at its end, and then cleared. Without a selector, every
+    element is stored, and its column header is worked out on the way down, from its
+    tag and the header of its parent; with one, only the selected elements are seen,
+    and their headers are worked out from their ancestors.
+
     Inputs:
-        element                   The current XML element.
-        tree                      The XML tree.
-        results_dict              Dictionary to store results.
-        prefixes                  Dictionary of XML namespace prefixes.
-        elements_to_scrape        Optional list of elements to scrape.
+        root                      The root element.
+        events                    The remaining parse events of the XML tree.
+        results_dict              Dictionary to store results, keyed by the position
+                                  of the element in document order.
+        headers                   Dictionary to store the column header of each key.
+        selector                  The ElementSelector of the elements to scrape, or
+                                  None for all.
         nillable_elements_info    A dictionary containing nillable element information.
         config                    The configuration data.
         label                     The name of the label file.
+        prefixes                  Dictionary of XML namespace prefixes.
+        xpaths                    If True, the column headers are the full XPaths of the
+                                  elements; otherwise, they are their tags.
+        phases                    Optional dictionary of phase times, as for
+                                  tools.add_phase_time(), to add the times spent
+                                  parsing, converting tags, and traversing to.
     """
-    tag = str(element.tag)
-    if elements_to_scrape is None or any(tag.endswith("}" + elem)
-                                         for elem in elements_to_scrape):
-        store_element_text(element, tree, results_dict,
-                           nillable_elements_info, config, label)
-    for child in element:
-        traverse_and_store(child, tree, results_dict, elements_to_scrape,
+    if phases is not None:
+        start = time.perf_counter()
+        timed_phases = ('parse', 'tag_conversion')
+        timed_seconds = sum(phases.get(name, [0.0])[0] for name in timed_phases)
+        events = timed_events(events, phases)
+
+    positions = itertools.count()
+    tag_headers = {}
+
+    def tag_header(tag):
+        header = tag_headers.get(tag)
+        if header is None:
+            with tools.timed_phase(phases, 'tag_conversion'):
+                header = tag_headers[tag] = convert_tag_to_header(tag, prefixes)
+        return header
+
+    def store(element, key):
+        store_element_text(element, key, results_dict,
                            nillable_elements_info, config, label)
 
+    if selector is None:
+        # The stack holds the full XPath header and the key of each open element.
+        header = tag_header(str(root.tag))
+        stack = [('/' + header, next(positions))]
+        headers[stack[0][1]] = stack[0][0] if xpaths else header
+        for event, element in events:
+            if event == 'end':
+                _, key = stack.pop()
+                store(element, key)
+                if stack:
+                    element.clear(keep_tail=True)
+                continue
+            header = tag_header(str(element.tag))
+            xpath_header = stack[-1][0] + '/' + header
+            key = next(positions)
+            headers[key] = xpath_header if xpaths else header
+            if event == 'start':
+                stack.append((xpath_header, key))
+            elif stack:
+                # Comments and processing instructions have no end event.
+                store(element, key)
+    else:
+        keys = []
+        for event, element in events:
+            if event == 'start':
+                tag = element.tag
+                if selector.matches(element, tag.rpartition('}')[2]):
+                    key = next(positions)
+                    if xpaths:
+                        ancestors = reversed(list(element.iterancestors()))
+                        headers[key] = ''.join('/' + tag_header(ancestor.tag)
+                                               for ancestor in ancestors)
+                        headers[key] += '/' + tag_header(tag)
+                    else:
+                        headers[key] = tag_header(tag)
+                    keys.append(key)
+                else:
+                    keys.append(None)
+            else:
+                key = keys.pop()
+                if key is not None:
+                    store(element, key)
+                element.clear(keep_tail=True)
 
-def write_results_to_csv(results_list, args, output_csv_path):
-    """Write results from a list of dictionaries to a CSV file.
+    # Put the results back in document order, as they were stored at element ends.
+    stored_results = sorted(results_dict.items())
+    results_dict.clear()
+    results_dict.update(stored_results)
+
+    if phases is not None:
+        timed_seconds = (sum(phases.get(name, [0.0])[0] for name in timed_phases) -
+                         timed_seconds)
+        tools.add_phase_time(phases, 'traverse',
+                             time.perf_counter() - start - timed_seconds)
+
+
+def scrape_label(file, args, elements_to_scrape, nillable_elements_info,
+                 schema_cache, config):
+    """Scrape one label file into a row of the index.
+
+    The label is parsed once, incrementally; its schema locations and namespaces come
+    from the root tag, and its element values and column headers from the rest.
 
     Inputs:
-        results_list          List of dictionaries containing results.
-        output_csv_path       The output directory and filename.
+        file                      The path to the label file.
+        args                      Command-line arguments.
+        elements_to_scrape        Optional list of elements to scrape.
+        nillable_elements_info    A dictionary containing nillable element information.
+        schema_cache              The SchemaCache to look XSD files up in.
+        config                    The configuration data.
+
+    Returns:
+        A dictionary holding the row of the index under 'Results', and the XSD URLs of
+        the label under 'Schemas'. With --profile-report, it also holds the profile of
+        the label under 'Profile': its name, time, and phase times, and with
+        --profile-slowest, its marshalled cProfile statistics.
+    """
+    if args.profile_report:
+        phases = {}
+        profiler = cProfile.Profile() if args.profile_slowest else None
+        start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+    else:
+        phases = None
+
+    if elements_to_scrape is None:
+        selector = None
+    else:
+        selector = compile_element_selector(tuple(elements_to_scrape))
+    with tools.timed_phase(phases, 'parse'):
+        root, events = parse_label_events(file, selector)
+
+    xml_urls = process_schema_location(root)
+    with tools.timed_phase(phases, 'schema', len(xml_urls)):
+        for url in xml_urls:
+            update_nillable_elements_from_xsd_file(url, nillable_elements_info,
+                                                   schema_cache)
+
+    filepath = file.relative_to(args.directorypath)
+
+    namespaces = root.nsmap
+    namespaces['pds'] = namespaces.pop(None)
+    prefixes = {v: k for k, v in namespaces.items()}
+
+    xml_results = {}
+    headers = {}
+    traverse_and_store(root, events, xml_results, headers, selector,
+                       nillable_elements_info, config, file, prefixes, args.xpaths,
+                       phases)
+
+    with tools.timed_phase(phases, 'rows'):
+        xml_results = process_tags(xml_results, headers)
+
+        lid = xml_results.get('pds:logical_identifier', 'Missing_LID')
+
+        # Attach extra columns if asked for.
+        bundle_lid = ':'.join(lid.split(':')[:4])
+        bundle = bundle_lid.split(':')[-1]
+        extras = {'LID': lid, 'filepath': filepath, 'filename': file.name,
+                  'bundle': bundle, 'bundle_lid': bundle_lid}
+        if args.extra_file_info:
+            xml_results = {**{ele: extras[ele] for ele in args.extra_file_info},
+                           **xml_results}
+
+    result_dict = {'Results': xml_results, 'Schemas': xml_urls}
+    if phases is not None:
+        if profiler is not None:
+            profiler.disable()
+        result_dict['Profile'] = {
+            'label': str(filepath),
+            'seconds': time.perf_counter() - start,
+            'phases': phases,
+            'stats': None if profiler is None else tools.cprofile_stats(profiler)}
+
+    return result_dict
+
+
+def label_schema_urls(file):
+    """Return the XSD URLs of a label, reading no further than its root tag.
+
+    Inputs:
+        file    The path to the label file.
+
+    Returns:
+        List of XSD URLs extracted from the schema location.
+    """
+    for _, root in etree.iterparse(str(file), events=('start',)):
+        return process_schema_location(root)
+
+
+# The state of a scraping worker process, set up by init_scrape_worker().
+_scrape_worker_state = {}
+
+
+def init_scrape_worker(args, elements_to_scrape):
+    """Set up a scraping worker process with its own configuration and schema cache.
+
+    Inputs:
+        args                  Command-line arguments.
+        elements_to_scrape    Optional list of elements to scrape.
+    """
+    _scrape_worker_state['args'] = args
+    _scrape_worker_state['elements_to_scrape'] = elements_to_scrape
+    _scrape_worker_state['config'] = load_config_file(args.config_file)
+    _scrape_worker_state['schema_cache'] = SchemaCache(args.schema_cache_dir,
+                                                       args.offline)
+
+
+def scrape_label_shard(shard):
+    """Scrape a run of consecutive labels in a worker process.
+
+    Scraping a label uses the nillable elements of every XSD named by the labels
+    before it, so before scraping the shard, the nillable elements are first gathered
+    from the XSDs named by the labels before the shard, as a serial run would have.
+
+    Inputs:
+        shard    A tuple of the label files to scrape, and the XSD URLs of the labels
+                 before them, each given once, in the order of its last use.
+
+    Returns:
+        A list of the rows of the index for the label files, in order.
+    """
+    label_files, prior_urls = shard
+    args = _scrape_worker_state['args']
+    schema_cache = _scrape_worker_state['schema_cache']
+
+    phases = {} if args.profile_report else None
+    nillable_elements_info = {}
+    with tools.timed_phase(phases, 'schema', len(prior_urls)):
+        for url in prior_urls:
+            update_nillable_elements_from_xsd_file(url, nillable_elements_info,
+                                                   schema_cache)
+
+    results = []
+    for file in label_files:
+        if args.verbose:
+            print(f'Now scraping {file}')
+        results.append(scrape_label(file, args,
+                                    _scrape_worker_state['elements_to_scrape'],
+                                    nillable_elements_info, schema_cache,
+                                    _scrape_worker_state['config']))
+
+    if phases is not None:
+        # Count the time spent gathering the nillable elements of the labels before
+        # the shard with the first label of the shard.
+        for name, (seconds, count) in phases.items():
+            tools.add_phase_time(results[0]['Profile']['phases'], name, seconds, count)
+    return results
+
+
+def scrape_labels(label_files, args, elements_to_scrape, schema_cache, config):
+    """Scrape labels one after another.
+
+    Inputs:
+        label_files           The list of label files.
+        args                  Command-line arguments.
+        elements_to_scrape    Optional list of elements to scrape.
+        schema_cache          The SchemaCache to look XSD files up in.
+        config                The configuration data.
+
+    Yields:
+        The results of scrape_label(), one for each label file, in order.
+    """
+    nillable_elements_info = {}
+    for file in label_files:
+        if args.verbose:
+            print(f'Now scraping {file}')
+        yield scrape_label(file, args, elements_to_scrape, nillable_elements_info,
+                           schema_cache, config)
+
+
+def make_scrape_shards(label_files, label_urls, to_scrape, shard_size):
+    """Split the labels to scrape into shards of consecutive labels.
+
+    Inputs:
+        label_files    The list of all label files, in order.
+        label_urls     The XSD URLs of each label file.
+        to_scrape      Whether each label file is to be scraped.
+        shard_size     The largest number of labels in a shard.
+
+    Returns:
+        A list of shards for scrape_label_shard().
+    """
+    shards = []
+    shard_files = None
+    prior_urls = {}
+    for file, urls, scrape in zip(label_files, label_urls, to_scrape):
+        if scrape:
+            if shard_files is None or len(shard_files) == shard_size:
+                shard_files = []
+                shards.append((shard_files, list(prior_urls)))
+            shard_files.append(file)
+        else:
+            shard_files = None
+        for url in urls:
+            # Keep the URLs in the order of their last use.
+            prior_urls.pop(url, None)
+            prior_urls[url] = None
+
+    return shards
+
+
+def scrape_shards(shards, args, elements_to_scrape, jobs):
+    """Scrape shards of labels, with several worker processes if jobs is over one.
+
+    The rows are merged back in the order of the shards, so the result is the same as
+    scraping the labels one after another.
+
+    Inputs:
+        shards                The shards of labels, from make_scrape_shards().
+        args                  Command-line arguments.
+        elements_to_scrape    Optional list of elements to scrape.
+        jobs                  The number of worker processes.
+
+    Yields:
+        The results of scrape_label() for the labels of the shards, in order.
+    """
+    if jobs > 1:
+        with Pool(jobs, initializer=init_scrape_worker,
+                  initargs=(args, elements_to_scrape)) as pool:
+            for results in pool.imap(scrape_label_shard, shards):
+                yield from results
+    else:
+        init_scrape_worker(args, elements_to_scrape)
+        for shard in shards:
+            yield from scrape_label_shard(shard)
+
+
+def scrape_labels_in_parallel(label_files, args, elements_to_scrape, jobs):
+    """Scrape labels with several worker processes.
+
+    The labels are split into runs of consecutive labels, a few for each process.
+
+    Inputs:
+        label_files           The list of label files.
+        args                  Command-line arguments.
+        elements_to_scrape    Optional list of elements to scrape.
+        jobs                  The number of worker processes.
+
+    Yields:
+        The results of scrape_label(), one for each label file, in order.
+    """
+    shard_size = max(1, math.ceil(len(label_files) / (jobs * 4)))
+    with tools.PROFILE.phase('schema_urls', len(label_files)):
+        label_urls = [label_schema_urls(file) for file in label_files]
+    shards = make_scrape_shards(label_files, label_urls, [True] * len(label_files),
+                                shard_size)
+
+    yield from scrape_shards(shards, args, elements_to_scrape, jobs)
+
+
+def scrape_fingerprint(args, elements_to_scrape, config):
+    """Return a fingerprint of the options that determine the rows scraped from labels.
+
+    Inputs:
+        args                  Command-line arguments.
+        elements_to_scrape    Optional list of elements to scrape.
+        config                The configuration data.
+
+    Returns:
+        The fingerprint, as a hex digest.
+    """
+    options = {'xpaths': args.xpaths,
+               'extra_file_info': args.extra_file_info,
+               'elements_to_scrape': elements_to_scrape,
+               'config': {section: dict(config[section])
+                          for section in config.sections()}}
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode('utf8')).hexdigest()
+
+
+def scrape_labels_incrementally(label_files, args, elements_to_scrape, config,
+                                manifest_path, jobs):
+    """Scrape only the labels that are new or have changed since the last run.
+
+    The rows of unchanged labels are taken from the label manifest, which is saved
+    with the rows of all the given labels, so deleted labels are dropped, once the
+    last row has been yielded.
+
+    Inputs:
+        label_files           The list of label files.
+        args                  Command-line arguments.
+        elements_to_scrape    Optional list of elements to scrape.
+        config                The configuration data.
+        manifest_path         The path to the label manifest.
+        jobs                  The number of worker processes.
+
+    Yields:
+        The results of scrape_label(), one for each label file, in order.
+    """
+    fingerprint = scrape_fingerprint(args, elements_to_scrape, config)
+    manifest_entries = tools.load_label_manifest(manifest_path, fingerprint)
+
+    keys = [str(file.relative_to(args.directorypath)) for file in label_files]
+    with tools.PROFILE.phase('manifest', len(label_files)):
+        entries = [tools.unchanged_label_entry(manifest_entries, key, file)
+                   for key, file in zip(keys, label_files)]
+    with tools.PROFILE.phase('schema_urls', len(label_files)):
+        label_urls = [label_schema_urls(file) if entry is None else entry['schemas']
+                      for file, entry in zip(label_files, entries)]
+    to_scrape = [entry is None for entry in entries]
+    if args.verbose:
+        print(f'{sum(to_scrape)} new or changed files to scrape')
+
+    shard_size = max(1, math.ceil(sum(to_scrape) / (jobs * 4)))
+    shards = make_scrape_shards(label_files, label_urls, to_scrape, shard_size)
+    scraped_results = iter(scrape_shards(shards, args, elements_to_scrape, jobs))
+
+    new_manifest_entries = {}
+    for file, key, entry in zip(label_files, keys, entries):
+        if entry is None:
+            result_dict = next(scraped_results)
+            entry = tools.new_label_entry(file, schemas=result_dict['Schemas'],
+                                          row=result_dict['Results'])
+        else:
+            result_dict = {'Results': entry['row'], 'Schemas': entry['schemas']}
+        new_manifest_entries[key] = entry
+        yield result_dict
+
+    tools.save_label_manifest(manifest_path, fingerprint, new_manifest_entries)
+
+
+def profiled_results(results_list):
+    """Yield results, adding the profiles of their labels to the profile of the run.
+
+    Inputs:
+        results_list    Iterable of the results of scrape_label(), some with profiles.
     """
-    rows = []
     for result_dict in results_list:
-        rows.append(result_dict['Results'])
+        profile = result_dict.pop('Profile', None)
+        if profile is not None:
+            tools.PROFILE.add_phases(profile['phases'])
+            tools.PROFILE.add_label(profile['label'], profile['seconds'],
+                                    profile['stats'])
+        yield result_dict
+
+
+def text_value_kind(text):
+    """Return 'int' or 'float' if a text can be read as one, and 'other' otherwise."""
+    try:
+        int(text)
+        return 'int'
+    except ValueError:
+        pass
+    try:
+        float(text)
+        return 'float'
+    except ValueError:
+        return 'other'
 
-    df = pd.DataFrame(rows)
 
-    if args.sort_by:
-        df.sort_values(by=args.sort_by, inplace=True)
+class ColumnTypes:
+    """The columns of an index, in order of first use, and the types of their values.
 
+    The values are written as pandas would write them from a DataFrame of all the rows:
+    a column of integers with a missing value, or of integers and reals, holds reals.
+    For Parquet and Arrow index files, the texts are also checked for numbers, so that
+    the columns of integer and real elements can hold numbers.
+    """
+
+    def __init__(self, parse_text=False):
+        self.type_names = {}
+        self.counts = {}
+        self.row_count = 0
+        self.parse_text = parse_text
+        self.value_kinds = {}
+
+    def add_row(self, row):
+        """Note the columns and the types of the values of a row."""
+        self.row_count += 1
+        for column, value in row.items():
+            if isinstance(value, bool):
+                type_name = 'other'
+            elif isinstance(value, int):
+                type_name = 'int'
+            elif isinstance(value, float):
+                type_name = 'float'
+            else:
+                type_name = 'other'
+            self.type_names.setdefault(column, set()).add(type_name)
+            self.counts[column] = self.counts.get(column, 0) + 1
+            if self.parse_text:
+                if isinstance(value, str):
+                    type_name = text_value_kind(value)
+                self.value_kinds.setdefault(column, set()).add(type_name)
+
+    def columns(self):
+        """Return the columns in order of first use."""
+        return list(self.type_names)
+
+    def is_numeric(self, column):
+        """Return True if all the values of a column are numbers."""
+        return 'other' not in self.type_names[column]
+
+    def is_real(self, column):
+        """Return True if the values of a column are written as reals."""
+        return self.is_numeric(column) and (
+            'float' in self.type_names[column] or
+            self.counts[column] < self.row_count)
+
+    def format_value(self, column, value):
+        """Return a value of a column as written to the index file."""
+        if self.is_real(column):
+            return repr(float(value))
+        return str(value)
+
+    def table_type(self, column, data_type):
+        """Return the Arrow type of a column: 'int64', 'float64', or 'string'.
+
+        Inputs:
+            column       The column.
+            data_type    The XSD data type of the element of the column, or None.
+        """
+        kinds = self.value_kinds[column]
+        if data_type in INTEGER_DATA_TYPES and kinds <= {'int'}:
+            return 'int64'
+        if data_type in REAL_DATA_TYPES and kinds <= {'int', 'float'}:
+            return 'float64'
+        if self.is_numeric(column):
+            return 'float64' if 'float' in self.type_names[column] else 'int64'
+        return 'string'
+
+    def table_value(self, column, table_type, value):
+        """Return a value of a column as written to a Parquet or Arrow index file."""
+        if table_type == 'int64':
+            return int(value)
+        if table_type == 'float64':
+            return float(value)
+        return str(value)
+
+
+def sort_key(row, sort_by, column_types):
+    """Return the key a row is sorted by, with missing values last.
+
+    Inputs:
+        row             A row of the index.
+        sort_by         The columns to sort by.
+        column_types    The ColumnTypes of the index.
+    """
+    key = []
+    for column in sort_by:
+        if column not in row:
+            key.append((1, 0))
+        elif column_types.is_numeric(column):
+            key.append((0, row[column]))
+        else:
+            key.append((0, str(row[column])))
+    return key
+
+
+def read_spooled_rows(spool_path):
+    """Yield the rows of a spool file, one JSON row per line."""
+    with open(spool_path, 'r', encoding='utf8') as spool_file:
+        for line in spool_file:
+            yield json.loads(line)
+
+
+def sort_spooled_rows(spool_path, sort_by, column_types, temp_dir):
+    """Sort the rows of a spool file with an external merge sort.
+
+    Runs of SORT_RUN_ROWS rows are sorted in memory and written to temporary files,
+    which are then merged. The sort is stable.
+
+    Inputs:
+        spool_path      The spool file of rows.
+        sort_by         The columns to sort by.
+        column_types    The ColumnTypes of the index.
+        temp_dir        The directory for the sorted runs.
+
+    Yields:
+        The rows in sorted order.
+    """
+    def keyed(numbered_rows):
+        for number, row in numbered_rows:
+            yield (sort_key(row, sort_by, column_types), number), row
+
+    run_paths = []
+    numbered_rows = enumerate(read_spooled_rows(spool_path))
+    while True:
+        run = list(itertools.islice(keyed(numbered_rows), SORT_RUN_ROWS))
+        if not run:
+            break
+        run.sort(key=lambda keyed_row: keyed_row[0])
+        run_path = os.path.join(temp_dir, f'run{len(run_paths)}.jsonl')
+        with open(run_path, 'w', encoding='utf8') as run_file:
+            for (_, number), row in run:
+                run_file.write(json.dumps([number, row]) + '\n')
+        run_paths.append(run_path)
+
+    runs = [keyed(tuple(numbered_row) for numbered_row in read_spooled_rows(run_path))
+            for run_path in run_paths]
+    for _, row in heapq.merge(*runs, key=lambda keyed_row: keyed_row[0]):
+        yield row
+
+
+def spool_results(results_list, spool_path, column_types):
+    """Write the rows of the results to a spool file, one JSON row per line.
+
+    Inputs:
+        results_list    Iterable of dictionaries containing results.
+        spool_path      The spool file.
+        column_types    The ColumnTypes to note the columns of the rows in.
+
+    Returns:
+        The XSD URLs of the labels, in order of first use.
+    """
+    schema_urls = {}
+    with open(spool_path, 'w', encoding='utf8') as spool_file:
+        for result_dict in results_list:
+            with tools.PROFILE.phase('spool'):
+                row = result_dict['Results']
+                column_types.add_row(row)
+                spool_file.write(json.dumps(row, default=str) + '\n')
+                schema_urls.update(dict.fromkeys(result_dict['Schemas']))
+
+    return list(schema_urls)
+
+
+def spooled_index_rows(spool_path, args, column_types, temp_dir):
+    """Return the rows of a spool file in the order of the index file.
+
+    Inputs:
+        spool_path      The spool file of rows.
+        args            Command-line arguments.
+        column_types    The ColumnTypes of the index.
+        temp_dir        The directory for the sorted runs, if --sort-by was given.
+
+    Returns:
+        An iterator over the rows.
+    """
+    if not args.sort_by:
+        return read_spooled_rows(spool_path)
+
+    columns = column_types.columns()
+    for column in args.sort_by:
+        if column not in columns:
+            print(f'Column {column} to sort by is not in the index')
+            sys.exit(1)
+    return sort_spooled_rows(spool_path, args.sort_by, column_types, temp_dir)
+
+
+def index_header(columns, args):
+    """Return the column headers of the index file."""
     if args.clean_header_field_names:
-        df.rename(columns=lambda x: x.replace(
-            ':', '_').replace('/', '__'), inplace=True)
+        return [column.replace(':', '_').replace('/', '__') for column in columns]
+    return columns
+
+
+def write_results_to_csv(results_list, args, output_csv_path):
+    """Write results from a list of dictionaries to a CSV file.
+
+    The rows are streamed to a spool file while the columns are found, then written
+    to the CSV file, after an external merge sort if --sort-by was given, so only a
+    bounded number of rows is ever held in memory. The output is the same as writing
+    a pandas DataFrame of all the rows.
 
-    df.to_csv(output_csv_path, index=False, na_rep='NaN')
+    Inputs:
+        results_list          Iterable of dictionaries containing results.
+        output_csv_path       The output directory and filename.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_csv_path))
+    with tempfile.TemporaryDirectory(dir=output_dir) as temp_dir:
+        spool_path = os.path.join(temp_dir, 'rows.jsonl')
+        column_types = ColumnTypes()
+        spool_results(results_list, spool_path, column_types)
+        columns = column_types.columns()
+        rows = spooled_index_rows(spool_path, args, column_types, temp_dir)
+
+        with tools.PROFILE.phase('write'), open(output_csv_path, 'w', encoding='utf8',
+                                                newline='') as output_file:
+            writer = csv.writer(output_file, lineterminator='\n')
+            writer.writerow(index_header(columns, args))
+            for row in rows:
+                writer.writerow([column_types.format_value(column, row[column])
+                                 if column in row else 'NaN'
+                                 for column in columns])
+
+
+def write_results_to_table(results_list, args, output_path, schema_cache):
+    """Write results from a list of dictionaries to a Parquet or Arrow IPC file.
+
+    The rows are spooled and sorted as for write_results_to_csv, then written in row
+    groups. The columns of elements whose XSD data types are integers or reals hold
+    numbers, if all their values are numbers; those of other elements hold their
+    texts, as written to a CSV file. Missing values are nulls.
+
+    Inputs:
+        results_list    Iterable of dictionaries containing results.
+        args            Command-line arguments.
+        output_path     The output directory and filename.
+        schema_cache    The SchemaCache to look the XSD data types of elements up in.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    with tempfile.TemporaryDirectory(dir=output_dir) as temp_dir:
+        spool_path = os.path.join(temp_dir, 'rows.jsonl')
+        column_types = ColumnTypes(parse_text=True)
+        schema_urls = spool_results(results_list, spool_path, column_types)
+        data_types = {}
+        with tools.PROFILE.phase('schema', len(schema_urls)):
+            for url in schema_urls:
+                update_nillable_elements_from_xsd_file(url, data_types, schema_cache)
+
+        columns = column_types.columns()
+        table_types = []
+        for column in columns:
+            element = column.rpartition('/')[2].rpartition(':')[2]
+            table_types.append(column_types.table_type(column,
+                                                       data_types.get(element)))
+
+        rows = ([column_types.table_value(column, table_type, row[column])
+                 if column in row else None
+                 for column, table_type in zip(columns, table_types)]
+                for row in spooled_index_rows(spool_path, args, column_types,
+                                              temp_dir))
+        with tools.PROFILE.phase('write'):
+            tools.write_table_file(output_path, index_header(columns, args),
+                                   table_types, rows, args.output_format)
 
 
 def main():
@@ -386,22 +1308,49 @@ def main():
     parser.add_argument('--config-file', type=str,
                         help='Read a user-specified configuration file.. File must be a '
                              '.ini file.')
+    parser.add_argument('--schema-cache-dir', type=str,
+                        default=default_schema_cache_dir(),
+                        help='The directory in which to keep local copies of XSD '
+                             'files and the nillable elements found in them. The '
+                             'default is ~/.cache/pds4indextools/schemas.')
+    parser.add_argument('--offline', action='store_true',
+                        help='Only use the local copies of XSD files in the schema '
+                             'cache directory; never download them.')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='The number of processes to scrape the labels with. The '
+                             'default is 1.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Keep a manifest of the scraped labels next to the index '
+                             'file, and only scrape new or changed labels.')
+    parser.add_argument('--output-format', choices=list(tools.OUTPUT_SUFFIXES),
+                        default='csv',
+                        help='The format of the index file: csv, parquet, or arrow. '
+                             'The default is csv.')
+    parser.add_argument('--profile-report', type=str,
+                        help='Time the phases of the run and each label, and write a '
+                             'JSON report of them to this file.')
+    parser.add_argument('--profile-slowest', type=int, default=0,
+                        help='With --profile-report, profile each label with cProfile, '
+                             'and write the statistics of this many of the slowest '
+                             'labels next to the report.')
 
     args = parser.parse_args()
+    if args.profile_report:
+        tools.PROFILE.enable(args.profile_slowest)
 
     verboseprint = print if args.verbose else lambda *a, **k: None
 
     config = load_config_file(args.config_file)
+    schema_cache = SchemaCache(args.schema_cache_dir, args.offline)
 
     directory_path = Path(args.directorypath)
     patterns = args.pattern
 
-    nillable_elements_info = {}
     label_files = []
-    all_results = []
-    for pattern in patterns:
-        files = directory_path.glob(f"{pattern}")
-        label_files.extend(files)
+    with tools.PROFILE.phase('glob'):
+        for pattern in patterns:
+            files = directory_path.glob(f"{pattern}")
+            label_files.extend(files)
 
     verboseprint(f'{len(label_files)} matching files found')
 
@@ -419,50 +1368,35 @@ def main():
     else:
         elements_to_scrape = None
 
-    for file in label_files:
-        verboseprint(f'Now scraping {file}')
-        tree = etree.parse(str(file))
-        root = tree.getroot()
-
-        xml_urls = process_schema_location(file)
-        for url in xml_urls:
-            update_nillable_elements_from_xsd_file(url, nillable_elements_info)
-
-        filepath = file.relative_to(args.directorypath)
-
-        namespaces = root.nsmap
-        namespaces['pds'] = namespaces.pop(None)
-        prefixes = {v: k for k, v in namespaces.items()}
-
-        xml_results = {}
-        traverse_and_store(root, tree, xml_results, elements_to_scrape,
-                           nillable_elements_info, config, file)
-
-        for key in list(xml_results.keys()):
-            process_tags(xml_results, key, root,
-                         namespaces, prefixes, args)
-
-        lid = xml_results.get('pds:logical_identifier', 'Missing_LID')
-
-        # Attach extra columns if asked for.
-        bundle_lid = ':'.join(lid.split(':')[:4])
-        bundle = bundle_lid.split(':')[-1]
-        extras = {'LID': lid, 'filepath': filepath, 'filename': file.name,
-                  'bundle': bundle, 'bundle_lid': bundle_lid}
-        if args.extra_file_info:
-            xml_results = {**{ele: extras[ele] for ele in args.extra_file_info},
-                           **xml_results}
-
-        result_dict = {'Results': xml_results}
-        all_results.append(result_dict)
-
     if args.output_file:
         output_path = args.output_file
     else:
-        output_path = args.directorypath / Path('index_file.csv')
+        output_path = args.directorypath / Path(
+            'index_file' + tools.OUTPUT_SUFFIXES[args.output_format])
+
+    if args.incremental:
+        manifest_path = str(output_path) + tools.MANIFEST_SUFFIX
+        all_results = scrape_labels_incrementally(label_files, args, elements_to_scrape,
+                                                  config, manifest_path, args.jobs)
+    elif args.jobs > 1:
+        all_results = scrape_labels_in_parallel(label_files, args, elements_to_scrape,
+                                                args.jobs)
+    else:
+        all_results = scrape_labels(label_files, args, elements_to_scrape, schema_cache,
+                                    config)
+
+    if args.profile_report:
+        all_results = profiled_results(all_results)
 
     verboseprint(f'Output file generated at {output_path}')
-    write_results_to_csv(all_results, args, output_path)
+    if args.output_format == 'csv':
+        write_results_to_csv(all_results, args, output_path)
+    else:
+        write_results_to_table(all_results, args, output_path, schema_cache)
+
+    if args.profile_report:
+        tools.PROFILE.write_report(args.profile_report)
+        verboseprint(f'Profile report generated at {args.profile_report}')
 
 
 if __name__ == '__main__':
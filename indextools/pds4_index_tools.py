@@ -2,12 +2,147 @@
    product's information.
 """
 
+from concurrent.futures import ThreadPoolExecutor
+import contextlib
 import csv
+import hashlib
+import heapq
+import itertools
+import json
+import marshal
+import math
 import os
+import pstats
 import sys
 import re
+import tempfile
+import time
 
-from lxml import objectify
+from lxml import etree, objectify
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# The number of bytes of a label to read at a time when looking for its LID.
+LABEL_READ_SIZE = 4096
+
+# The suffix added to the path of an index file to name its label manifest.
+MANIFEST_SUFFIX = '.manifest.json'
+
+# The formats an index file can be written in, and the suffix of each.
+OUTPUT_SUFFIXES = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+
+# The number of rows in each row group of a Parquet or Arrow index file.
+TABLE_BATCH_ROWS = 65536
+
+# The number of threads listing directories at once when looking for member files.
+SCAN_THREADS = 16
+
+# The listings of the directories read so far in this run, keyed by directory path, so
+# that each directory is only read once however many searches go through it.
+_directory_listings = {}
+
+
+class PhaseProfile:
+    """The cumulative times and counts of the phases of an index build.
+
+    Phases are timed with phase() or add_phase_time(), and the time of each label
+    scraped is noted with add_label(). Nothing is timed unless the profile is enabled.
+    The report gives the time and count of each phase, and the percentiles of the
+    label times.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.start_time = time.perf_counter()
+        self.phases = {}
+        self.label_seconds = []
+        self.slowest = []
+        self.slowest_count = 0
+
+    def enable(self, slowest_count=0):
+        """Start profiling.
+
+        Inputs:
+            slowest_count    The number of slowest labels to keep the cProfile
+                             statistics of.
+        """
+        self.enabled = True
+        self.start_time = time.perf_counter()
+        self.slowest_count = slowest_count
+
+    def phase(self, name, count=1):
+        """Time the body of a with statement as a phase."""
+        return timed_phase(self.phases if self.enabled else None, name, count)
+
+    def add_phases(self, phases):
+        """Add the phase times of a dictionary filled by add_phase_time()."""
+        for name, (seconds, count) in phases.items():
+            add_phase_time(self.phases, name, seconds, count)
+
+    def add_label(self, label, seconds, stats=None):
+        """Note the time of a label, and its marshalled cProfile statistics if any."""
+        self.label_seconds.append(seconds)
+        if stats is not None and self.slowest_count:
+            entry = (seconds, len(self.label_seconds), str(label), stats)
+            if len(self.slowest) < self.slowest_count:
+                heapq.heappush(self.slowest, entry)
+            else:
+                heapq.heappushpop(self.slowest, entry)
+
+    def report(self):
+        """Return the profile as a dictionary, ready to be written as JSON."""
+        label_seconds = sorted(self.label_seconds)
+        labels = {'count': len(label_seconds)}
+        if label_seconds:
+            labels['mean'] = sum(label_seconds) / len(label_seconds)
+            for percentile in (50, 90, 99):
+                rank = max(1, math.ceil(percentile / 100 * len(label_seconds)))
+                labels[f'p{percentile}'] = label_seconds[rank-1]
+            labels['max'] = label_seconds[-1]
+        if self.slowest:
+            labels['slowest'] = [{'label': label, 'seconds': seconds}
+                                 for seconds, _, label, _
+                                 in sorted(self.slowest, reverse=True)]
+
+        return {'total_seconds': time.perf_counter() - self.start_time,
+                'phases': {name: {'seconds': seconds, 'count': count}
+                           for name, (seconds, count)
+                           in sorted(self.phases.items(),
+                                     key=lambda item: -item[1][0])},
+                'labels': labels}
+
+    def write_report(self, report_path):
+        """Write the JSON report, and the cProfile statistics of the slowest labels.
+
+        The statistics of the slowest labels are added together and written next to
+        the report, with the suffix .prof, for pstats or snakeviz.
+
+        Inputs:
+            report_path    The path to the JSON report.
+        """
+        write_file_atomically(report_path,
+                              json.dumps(self.report(), indent=1).encode('utf8'))
+        if not self.slowest:
+            return
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            stats_paths = []
+            for _, number, _, stats in self.slowest:
+                stats_path = os.path.join(temp_dir, f'{number}.prof')
+                with open(stats_path, 'wb') as stats_file:
+                    stats_file.write(stats)
+                stats_paths.append(stats_path)
+            stats = pstats.Stats(*stats_paths)
+            stats.dump_stats(os.path.splitext(report_path)[0] + '.prof')
+
+
+# The profile of the current run.
+PROFILE = PhaseProfile()
 
 
 def add_bundle_data(bundle_member_entries, member_index):
@@ -109,6 +244,13 @@ def add_lid_to_member_index(labels, filepath, lid, member_index):
         sys.exit(1)
 
 
+def add_phase_time(phases, name, seconds, count=1):
+    """Add the time of a phase to a dictionary of [seconds, count] by phase name."""
+    totals = phases.setdefault(name, [0.0, 0])
+    totals[0] += seconds
+    totals[1] += count
+
+
 def clean_directory_path(path):
     """ Return a path that is consistent with Unix format"""
     clean_path = path.replace('\\', '/')
@@ -120,13 +262,20 @@ def clean_join(path, *paths):
     return os.path.join(path, *paths).replace('\\', '/')
 
 
-def create_results_file(base_directory, keyword, member_index):
+def cprofile_stats(profiler):
+    """Return the statistics of a cProfile.Profile, marshalled as in a .prof file."""
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+def create_results_file(base_directory, keyword, member_index, output_format='csv'):
     """Create the file of the results.
     
     The file is opened within the base_directory. The file is named
-    {keyword}_member_index.csv. The labels are taken from the keys of the nested
-    dictionaries within member_index, and are used as fieldnames for the csv file.
-    Each nested dictionary within member_index is then entered as a row into the csv file.
+    {keyword}_member_index.csv, or .parquet or .arrow for the other output formats.
+    The labels are taken from the keys of the nested dictionaries within member_index,
+    and are used as fieldnames for the file. Each nested dictionary within
+    member_index is then entered as a row into the file.
 
     Inputs:
         base_directory    The path to the base directory.
@@ -134,25 +283,36 @@ def create_results_file(base_directory, keyword, member_index):
         keyword           The keyword to determine the name of the file.
 
         member_index      The index of data product information.
+
+        output_format     The format of the file: 'csv', 'parquet', or 'arrow'.
     """
     if member_index == {}:
         raise ValueError('Dictionary of data product information was not populated.')
     found_keys = list(member_index.keys())[0]
     labels = list(member_index[found_keys].keys())
-    index_name = keyword+'_member_index.csv'
-    with open(clean_join(base_directory, index_name),
-              mode='w', encoding='utf8') as index_file:
-        member_index_writer = csv.DictWriter(index_file, fieldnames=labels)
-        member_index_writer.writeheader()
-        for index in member_index:
-            member_index_writer.writerow(member_index[index])
-
-
-def dataprod_crossmatch(label_paths, base_directory, subdirectory, member_index):
+    index_path = clean_join(base_directory, get_index_filename(keyword, output_format))
+    with PROFILE.phase('write'):
+        if output_format != 'csv':
+            rows = ([member.get(label) for label in labels]
+                    for member in member_index.values())
+            write_table_file(index_path, labels, ['string'] * len(labels), rows,
+                             output_format)
+            return
+
+        with open(index_path, mode='w', encoding='utf8') as index_file:
+            member_index_writer = csv.DictWriter(index_file, fieldnames=labels)
+            member_index_writer.writeheader()
+            for index in member_index:
+                member_index_writer.writerow(member_index[index])
+
+
+def dataprod_crossmatch(label_paths, base_directory, subdirectory, member_index,
+                        manifest_path=None):
     """Match the LID of a file to its counterpart in the member_index.
     
-    Each path within label_paths is parsed and scraped for its LID. If this LID exists as
-    an entry in member_index, the 'Path' key is set to this value. If it has
+    The member_index is first indexed by LID. Each path within label_paths is then
+    scraped for its LID, reading no further than the Identification_Area. If this LID
+    exists as an entry in member_index, the 'Path' key is set to this value. If it has
     no match within member_index, a message is printed with the path and the LID.
 
     Inputs:
@@ -163,17 +323,27 @@ def dataprod_crossmatch(label_paths, base_directory, subdirectory, member_index)
         subdirectory      The name of the subdirectory containing the data products.
         
         member_index      The dictionary of indexed information.
+
+        manifest_path     Optional path to a label manifest. If given, the LIDs of
+                          labels unchanged since the manifest was saved are taken from
+                          it, and the manifest is updated.
     """
-    for path in sorted(label_paths):
-        root = (objectify.parse(clean_join(base_directory, path),
-                                objectify.makeparser(remove_blank_text=True)).getroot())
-        lid = str(root.Identification_Area.logical_identifier.text)
-        if not any(lid in member_index[key]['LID'] for key in member_index):
-            print(f'PDS4 label found but not a member of the {subdirectory} collection: '
-                  f'{path}, {lid}')
-        else:
-            for key in member_index:
-                if lid == member_index[key]['LID']:
+    member_keys_by_lid = {}
+    for key in member_index:
+        member_keys_by_lid.setdefault(member_index[key]['LID'], []).append(key)
+
+    with PROFILE.phase('label_lids', len(label_paths)):
+        label_lids = get_label_lids(label_paths, base_directory, manifest_path)
+
+    with PROFILE.phase('crossmatch'):
+        for path in sorted(label_paths):
+            lid = label_lids[path]
+            member_keys = member_keys_by_lid.get(lid)
+            if member_keys is None:
+                print(f'PDS4 label found but not a member of the {subdirectory} '
+                      f'collection: {path}, {lid}')
+            else:
+                for key in member_keys:
                     member_index[key]['Path'] = path
 
 
@@ -258,20 +428,109 @@ def get_index_root(base_directory, path):
     Returns:
         index_root        The root element of the data product file.
     """
-    index_root = (objectify.parse(os.path.join(base_directory, path),
-                                  objectify.makeparser(
-                                      remove_blank_text=True))
-                  .getroot())
+    with PROFILE.phase('parse'):
+        index_root = (objectify.parse(os.path.join(base_directory, path),
+                                      objectify.makeparser(
+                                          remove_blank_text=True))
+                      .getroot())
     return index_root
 
 
+def get_label_lid(label_path):
+    """Return the LID of a label file.
+    
+    The label is fed to a pull parser a block at a time, and parsing stops at the end
+    of the Identification_Area, so the rest of the label is never read or built.
+
+    Inputs:
+        label_path    The path to the label file.
+
+    Returns:
+        lid           The LID of the label file.
+    """
+    parser = etree.XMLPullParser(events=('end',), tag='{*}Identification_Area')
+    with open(label_path, 'rb') as label_file:
+        while True:
+            block = label_file.read(LABEL_READ_SIZE)
+            if not block:
+                break
+            parser.feed(block)
+            for _, identification_area in parser.read_events():
+                return str(identification_area.find('{*}logical_identifier').text)
+
+    raise ValueError(f'Label file {label_path} has no Identification_Area.')
+
+
+def get_label_lids(label_paths, base_directory, manifest_path=None):
+    """Return the LIDs of label files.
+    
+    If a label manifest is given, the LIDs of the labels that are unchanged since it
+    was saved are taken from it; only new and changed labels are read. The manifest is
+    then saved with the LIDs of all the given labels, and no others.
+
+    Inputs:
+        label_paths       The list of label filepaths.
+
+        base_directory    The path to the base directory.
+
+        manifest_path     Optional path to a label manifest.
+
+    Returns:
+        label_lids        A dictionary of the LID of each label filepath.
+    """
+    if manifest_path is None:
+        return {path: get_label_lid(clean_join(base_directory, path))
+                for path in label_paths}
+
+    manifest_entries = load_label_manifest(manifest_path, 'lid')
+    new_manifest_entries = {}
+    label_lids = {}
+    for path in label_paths:
+        label_path = clean_join(base_directory, path)
+        entry = unchanged_label_entry(manifest_entries, path, label_path)
+        if entry is None:
+            entry = new_label_entry(label_path, lid=get_label_lid(label_path))
+        new_manifest_entries[path] = entry
+        label_lids[path] = entry['lid']
+    save_label_manifest(manifest_path, 'lid', new_manifest_entries)
+
+    return label_lids
+
+
+def get_index_filename(keyword, output_format='csv'):
+    """Return the name of a member index file.
+
+    Inputs:
+        keyword          The keyword of the index, like "bundle" or "collection".
+        output_format    The format of the file: 'csv', 'parquet', or 'arrow'.
+
+    Returns:
+        The name of the index file.
+    """
+    return keyword + '_member_index' + OUTPUT_SUFFIXES[output_format]
+
+
+def get_manifest_filepath(base_directory, keyword, output_format='csv'):
+    """Return the path of the label manifest kept next to a member index file.
+
+    Inputs:
+        base_directory    The path to the base directory.
+
+        keyword           The keyword that determines the name of the index file.
+
+    Returns:
+        The path to the label manifest.
+    """
+    return clean_join(base_directory, get_index_filename(keyword, output_format)) + MANIFEST_SUFFIX
+
+
 def get_member_files(directory, nlevels, basedir, regex):
     """Find and return all label files whose filenames match the regex.
-    
-    This function will return the first instance of a file that matches the given regex
-    file that exists within the directory structure in every subdirectory. When a match
-    is found, the value for subdirs is reset to [], preventing any further recursion
-    within that subdirectory and returning to the top level for the next search.
+
+    The directory tree is read one level of subdirectories at a time, with the
+    directories of each level listed in parallel, and every directory is only listed
+    once per run (see list_directory). The files are returned in the order os.walk()
+    would find them.
 
     Inputs:
         directory         The path to the base directory.
@@ -283,23 +542,40 @@ def get_member_files(directory, nlevels, basedir, regex):
 
         basedir           The path to the directory one level above directory.
         
-        file_type         The type of file to look for. 
+        regex             The regular expression the start of a filename must match.
 
     Returns:
         files_found       The results of the file search.
     """
-    file_paths = []
+    pattern = re.compile(regex)
     base_directory = clean_directory_path(os.path.abspath(directory))
-    base_dir_sep = base_directory.count(os.sep)
-    for subdir, dirs, files in os.walk(base_directory):
-        if nlevels is None or subdir.count(os.sep) - base_dir_sep < nlevels:
-            for file in files:
-                if re.match(regex, file):
-                    file_paths.append(shortpaths(clean_join(subdir, file), basedir))
-        if nlevels is not None and subdir.count(os.sep) - base_dir_sep == nlevels-1:
-             # We are at the maximum depth, so go no further
-             dirs[:] = []
-                    
+
+    listings = {}
+    level = [base_directory]
+    depth = 0
+    with PROFILE.phase('discovery'), ThreadPoolExecutor(SCAN_THREADS) as executor:
+        while level and (nlevels is None or depth < nlevels):
+            next_level = []
+            for subdir, listing in zip(level, executor.map(list_directory, level)):
+                listings[subdir] = listing
+                next_level.extend(os.path.join(subdir, name) for name in listing[1])
+            level = next_level
+            depth += 1
+
+    file_paths = []
+    stack = [base_directory] if listings else []
+    while stack:
+        subdir = stack.pop()
+        files, subdirs = listings[subdir]
+        matches = [file for file in files if pattern.match(file)]
+        if matches:
+            short_subdir = shortpaths(subdir, basedir)
+            file_paths.extend(os.path.join(short_subdir, file) if short_subdir != '.'
+                              else file for file in matches)
+        stack.extend(path for path in (os.path.join(subdir, name)
+                                       for name in reversed(subdirs))
+                     if path in listings)
+
     return file_paths
 
 
@@ -322,6 +598,115 @@ def get_namespaces(bunprod_root):
     return namespaces
 
 
+def file_sha256(path):
+    """Return the SHA-256 hex digest of the contents of a file."""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def list_directory(directory):
+    """Return the listing of a directory, reading it only the first time.
+
+    Inputs:
+        directory    The path to the directory.
+
+    Returns:
+        A tuple of the list of the names of the files in the directory, and the list of
+        the names of its subdirectories, in the order os.scandir() gives them. As with
+        os.walk(), symbolic links to directories are left out of both, and a directory
+        that cannot be read is empty.
+    """
+    listing = _directory_listings.get(directory)
+    if listing is not None:
+        return listing
+
+    files = []
+    subdirs = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if not is_dir:
+                    files.append(entry.name)
+                elif not entry.is_symlink():
+                    subdirs.append(entry.name)
+    except OSError:
+        files = []
+        subdirs = []
+
+    listing = _directory_listings[directory] = (files, subdirs)
+    return listing
+
+
+def load_label_manifest(manifest_path, fingerprint):
+    """Load the label entries of a label manifest.
+    
+    A label manifest records, for each label file scraped into an index, the file's
+    size, modification time and content hash, and the data scraped from it, so that a
+    later run need only scrape the labels that have changed. Its fingerprint records
+    the options the data was scraped with; a manifest saved with other options is
+    ignored.
+
+    Inputs:
+        manifest_path    The path to the label manifest.
+
+        fingerprint      The fingerprint of the current options.
+
+    Returns:
+        A dictionary of label entries keyed by label filepath, empty if there is no
+        usable manifest.
+    """
+    try:
+        with open(manifest_path, 'r', encoding='utf8') as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+    if manifest.get('fingerprint') != fingerprint:
+        return {}
+
+    return manifest['labels']
+
+
+def new_label_entry(label_path, **data):
+    """Create a label manifest entry for the current state of a label file.
+
+    Inputs:
+        label_path    The path to the label file.
+
+        data          The data scraped from the label, to store in the entry.
+
+    Returns:
+        The label entry.
+    """
+    stat = os.stat(label_path)
+    return {'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_sha256(label_path),
+            **data}
+
+
+def save_label_manifest(manifest_path, fingerprint, label_entries):
+    """Save a label manifest, replacing any earlier one atomically.
+
+    Inputs:
+        manifest_path    The path to the label manifest.
+
+        fingerprint      The fingerprint of the current options.
+
+        label_entries    A dictionary of label entries keyed by label filepath.
+    """
+    manifest = {'fingerprint': fingerprint, 'labels': label_entries}
+    write_file_atomically(manifest_path,
+                          json.dumps(manifest, indent=1, default=str).encode('utf8'))
+
+
 def shortpaths(fullpath, base_directory):
     """Shorten the filepath.
     
@@ -337,3 +722,114 @@ def shortpaths(fullpath, base_directory):
     """
     shortpath = os.path.relpath(fullpath, start=base_directory)
     return shortpath
+
+
+@contextlib.contextmanager
+def timed_phase(phases, name, count=1):
+    """Time the body of a with statement, adding it to a dictionary of phase times.
+
+    Inputs:
+        phases    A dictionary of [seconds, count] by phase name, or None to time
+                  nothing.
+        name      The name of the phase.
+        count     The count to add to the phase.
+    """
+    if phases is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_phase_time(phases, name, time.perf_counter() - start, count)
+
+
+def unchanged_label_entry(label_entries, key, label_path):
+    """Return the manifest entry of a label file if the file is unchanged.
+    
+    A file whose size and modification time match its entry is unchanged. A file of
+    the same size but a different modification time is hashed, and is unchanged if its
+    hash matches; its entry is then updated with the new modification time.
+
+    Inputs:
+        label_entries    A dictionary of label entries keyed by label filepath.
+
+        key              The label filepath the entry is keyed by.
+
+        label_path       The path to the label file.
+
+    Returns:
+        The label entry, or None if the label is new or has changed.
+    """
+    entry = label_entries.get(key)
+    if entry is None:
+        return None
+
+    stat = os.stat(label_path)
+    if stat.st_size != entry['size']:
+        return None
+    if stat.st_mtime_ns != entry['mtime_ns']:
+        if file_sha256(label_path) != entry['sha256']:
+            return None
+        entry['mtime_ns'] = stat.st_mtime_ns
+
+    return entry
+
+
+def write_file_atomically(file_path, contents):
+    """Write bytes to a file so that a partially written file is never seen.
+
+    The contents are written to a temporary file in the same directory, which is then
+    renamed over file_path.
+
+    Inputs:
+        file_path    The path of the file to write.
+
+        contents     The bytes to write.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(file_path)),
+                                     suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            temp_file.write(contents)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def write_table_file(file_path, columns, column_types, rows, output_format):
+    """Write the rows of an index to a Parquet or Arrow IPC file.
+
+    The rows are written in row groups of TABLE_BATCH_ROWS rows as they come, so only
+    one row group is held in memory at a time.
+
+    Inputs:
+        file_path        The path to the file.
+        columns          The names of the columns.
+        column_types     The Arrow type of each column: 'int64', 'float64', or
+                         'string'.
+        rows             Iterable of the rows, each a list of values in column order,
+                         with None for a missing value.
+        output_format    The format of the file: 'parquet' or 'arrow'.
+    """
+    if pyarrow is None:
+        print(f'The pyarrow package is needed to write {output_format} files')
+        sys.exit(1)
+
+    schema = pyarrow.schema([(column, pyarrow.type_for_alias(column_type))
+                             for column, column_type in zip(columns, column_types)])
+    if output_format == 'parquet':
+        writer = pyarrow.parquet.ParquetWriter(file_path, schema)
+    else:
+        writer = pyarrow.ipc.new_file(file_path, schema)
+
+    rows = iter(rows)
+    with writer:
+        while True:
+            batch = list(itertools.islice(rows, TABLE_BATCH_ROWS))
+            if not batch:
+                break
+            arrays = [pyarrow.array(values, type=field.type)
+                      for values, field in zip(zip(*batch), schema)]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
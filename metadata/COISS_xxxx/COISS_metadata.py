@@ -3,28 +3,58 @@
 # coiss_production.py: Generates all geometry indices for Cassini ISS at Saturn
 #
 # Syntax:
-#   python coiss_production.py COISS/COISS_2xxx/index/index.lbl
+#   python coiss_production.py [--jobs N] [--adaptive [--coarse N]
+#                              [--angle-tolerance DEG] [--distance-tolerance KM]
+#                              [--resolution-tolerance KM] [--time-tolerance S]]
+#                              COISS/COISS_2xxx/index/index.lbl ...
+#
+# With --jobs N, the snapshots of each index are processed by a pool of N worker
+# processes. Each worker loads its own SPICE kernels and meshgrids. The rows of
+# each snapshot are returned tagged with its position in the index, and written
+# by this process in the original order, so the files do not depend on N.
+#
+# The output files are checkpointed after every snapshot. If a run is
+# interrupted, running it again resumes after the last completed snapshot.
+#
+# With --adaptive, each FOV is sampled coarse-to-fine instead of at the full
+# density of its meshgrid; see adaptive_meshgrid().
 ################################################################################
 
 import oops
 import oops.inst.cassini.iss as iss
 import numpy as np
 import os, sys, traceback
+import argparse, multiprocessing
+from StringIO import StringIO
 
 import metadata as meta
 
-iss.initialize()
-
 ############################################
 # Key parameters of run
 ############################################
 
-execfile("COLUMNS_SATURN.py")       # define the columns, tiles, etc.
-
 SAMPLING = 3                        # pixel sampling density
 SELECTION = "DS"                    # summary files only
 COUNT_LENGTH = 7
 
+# Adaptive sampling; see adaptive_meshgrid()
+ADAPTIVE = False                    # True to sample each FOV coarse-to-fine
+COARSE = 4                          # coarse sampling, in meshgrid points
+ANGLE_TOLERANCE = 0.1 * oops.RPD    # tolerance for angles in radians
+DISTANCE_TOLERANCE = 100.           # tolerance for distances and radii in km
+RESOLUTION_TOLERANCE = 1.           # tolerance for resolutions in km/pixel
+TIME_TOLERANCE = 1.                 # tolerance for event times in seconds
+
+# The output files of each index, as (name, selection letter); the inventory is
+# always written. "planet" in a name is replaced by the name of the planet.
+OUTPUTS = [("inventory",       ""),
+           ("ring_summary",    "S"),
+           ("planet_summary",  "S"),
+           ("moon_summary",    "S"),
+           ("ring_detailed",   "D"),
+           ("planet_detailed", "D"),
+           ("moon_detailed",   "D")]
+
 ############################################
 # Construct the meshgrid for each ISS FOV
 ############################################
@@ -37,24 +67,47 @@ NAC_PIXEL = 6.0e-6  # approximate full-size NAC pixel in units of radians
 EXPAND = BORDER * NAC_PIXEL
 
 MESHGRIDS = {}
-for camera in PIXEL_SIZES.keys():
-  for mode in MODE_SIZES.keys():
-    pixel_wrt_nac = MODE_SIZES[mode] * PIXEL_SIZES[camera]
-    pixels = 1024 / MODE_SIZES[mode]
+COARSE_MESHGRIDS = {}
+
+def initialize():
+    """Load the SPICE kernels, define the columns and construct the meshgrids.
+
+    This is done once in every process that processes snapshots.
+    """
+
+    iss.initialize()
 
-    # Define sampling of FOV
-    origin = -float(BORDER) / pixel_wrt_nac
-    limit = pixels - origin
+    execfile("COLUMNS_SATURN.py", globals())   # define the columns, tiles, etc.
 
-    # Revise the sampling to be exact
-    samples = int((limit - origin) / SAMPLING + 0.999)
-    under = (limit - origin) / samples
+    for camera in PIXEL_SIZES.keys():
+      for mode in MODE_SIZES.keys():
+        pixel_wrt_nac = MODE_SIZES[mode] * PIXEL_SIZES[camera]
+        pixels = 1024 / MODE_SIZES[mode]
 
-    # Construct the meshgrid
-    limit += 0.0001
-    meshgrid = oops.Meshgrid.for_fov(iss.ISS.fovs[(camera,mode,True)], origin,
-                                     undersample=under, limit=limit, swap=True)
-    MESHGRIDS[(camera,mode)] = meshgrid
+        # Define sampling of FOV
+        origin = -float(BORDER) / pixel_wrt_nac
+        limit = pixels - origin
+
+        # Revise the sampling to be exact
+        samples = int((limit - origin) / SAMPLING + 0.999)
+        under = (limit - origin) / samples
+
+        # Construct the meshgrid
+        limit += 0.0001
+        meshgrid = oops.Meshgrid.for_fov(iss.ISS.fovs[(camera,mode,True)],
+                                         origin, undersample=under,
+                                         limit=limit, swap=True)
+        MESHGRIDS[(camera,mode)] = meshgrid
+
+        # Select every COARSE-th point, always including the last row and
+        # column, for adaptive sampling
+        uv = meshgrid.uv.vals
+        rows = np.unique(np.append(np.arange(0, uv.shape[0], COARSE),
+                                   uv.shape[0] - 1))
+        cols = np.unique(np.append(np.arange(0, uv.shape[1], COARSE),
+                                   uv.shape[1] - 1))
+        coarse = oops.Meshgrid(meshgrid.fov, oops.Pair(uv[rows][:,cols]))
+        COARSE_MESHGRIDS[(camera,mode)] = (coarse, rows, cols)
 
 ############################################
 # ISS metadata functions
@@ -89,184 +142,604 @@ def target_name(dict):
     except KeyError:
         return target
 
-def process_index(input_filename, selection="S"):
-    """Process one index file and write a selection of metadata files.
+def column_tolerance(column_desc):
+    """Returns the tolerance of adaptive sampling for a column description, as
+    a tuple (tolerance, period), where period is 2*pi for angles and None
+    otherwise. The tolerance is in the units of the backplane: radians, km,
+    km/pixel or seconds, and zero for boolean backplanes."""
+
+    name = column_desc[0][0]
+    if len(column_desc) > 2:
+        flag = meta.ALT_FORMAT_DICT[(name, column_desc[2])][0]
+    else:
+        flag = meta.FORMAT_DICT[name][0]
+
+    if flag in ("DEG", "360", "-180"):
+        return (ANGLE_TOLERANCE, 2*np.pi)
+    if name.startswith("where_"):
+        return (0., None)
+    if name == "event_time":
+        return (TIME_TOLERANCE, None)
+    if "resolution" in name:
+        return (RESOLUTION_TOLERANCE, None)
+
+    return (DISTANCE_TOLERANCE, None)
+
+def adaptive_keys(moon_names, selection):
+    """Returns the column descriptions and the tile keys of the files written
+    for a snapshot, which define where a coarse sampling of its FOV must be
+    refined.
 
     Input:
-        input_filename  the name of the label for an ISS index file.
+        moon_names      the names of the moons in the FOV.
+        selection       the selection of files, as in process_snapshot().
+
+    Return:             (column_descs, tile_keys), where column_descs is a list
+                        of the distinct column descriptions and tile_keys is a
+                        list of the distinct boolean backplane keys of the
+                        tiles.
+    """
+
+    column_lists = []
+    tile_lists = []
+    if "S" in selection:
+        column_lists += [RING_SUMMARY_COLUMNS, PLANET_SUMMARY_COLUMNS]
+        column_lists += [MOON_SUMMARY_DICT[name] for name in moon_names]
+
+    if "D" in selection:
+        column_lists += [RING_DETAILED_COLUMNS, PLANET_DETAILED_COLUMNS]
+        column_lists += [MOON_DETAILED_DICT[name] for name in moon_names]
+        tile_lists += [RING_TILES, PLANET_TILES]
+        tile_lists += [MOON_TILE_DICT[name] for name in moon_names]
+
+    column_descs = []
+    for column_list in column_lists:
+        for column_desc in column_list:
+            if column_desc not in column_descs:
+                column_descs.append(column_desc)
+
+    tile_keys = []
+    for tiles in tile_lists:
+        for tile_list in tiles:
+            for key in tile_list:
+                if key not in tile_keys:
+                    tile_keys.append(key)
+
+    return (column_descs, tile_keys)
+
+def tile_boundaries(key):
+    """Returns the limits of a boolean tile key, as a list of tuples (key,
+    limit), where key is the backplane key that the tile divides."""
+
+    if key[0] in ("where_below", "where_above"):
+        return [(key[1], key[2])]
+    if key[0] == "where_between":
+        return [(key[1], key[2]), (key[1], key[3])]
+    if key[0] in ("where_any", "where_all"):
+        boundaries = []
+        for subkey in key[1:]:
+            boundaries += tile_boundaries(subkey)
+        return boundaries
+
+    return []
+
+def coarse_arrays(values, shape):
+    """Returns the values and the mask of a backplane on the coarse meshgrid,
+    broadcasted to its shape. NaNs are masked and masked values are zero."""
+
+    vals = np.empty(shape)
+    vals[...] = values.vals
+    mask = np.zeros(shape, dtype='bool')
+    mask[...] = values.mask
+    mask |= np.isnan(vals)
+    vals[mask] = 0.
+
+    return (vals, mask)
+
+def cell_any(points):
+    """Returns True for each cell of the coarse meshgrid with a corner where a
+    boolean array of the coarse points is True."""
+
+    return points[:-1,:-1] | points[:-1,1:] | points[1:,:-1] | points[1:,1:]
+
+def slope_changes(vals, mask, tolerance, period=None):
+    """Returns True at each coarse point where the slope of a backplane along a
+    row or a column of the coarse meshgrid changes sign, which is where the
+    cells around the point can hide an extremum. Differences within half the
+    tolerance count as zero slope."""
+
+    changes = np.zeros(vals.shape, dtype='bool')
+    for (v, m, c) in [(vals, mask, changes), (vals.T, mask.T, changes.T)]:
+        diffs = v[1:] - v[:-1]
+        if period:
+            diffs = (diffs + period/2.) % period - period/2.
+
+        signs = np.sign(diffs) * (np.abs(diffs) > tolerance/2.)
+        valid = np.logical_not(m[1:] | m[:-1])
+        c[1:-1] |= valid[1:] & valid[:-1] & (signs[1:] != signs[:-1])
+
+    return changes
+
+def nearest_coarse(coarse, size):
+    """Returns the position within the sorted indices of coarse points along
+    one axis of the nearest coarse point to each of the size indices of the full
+    meshgrid."""
+
+    dense = np.arange(size)
+    upper = np.searchsorted(coarse, dense).clip(1, coarse.size - 1)
+    lower = upper - 1
+    return np.where(dense - coarse[lower] <= coarse[upper] - dense,
+                    lower, upper)
+
+def adaptive_meshgrid(snapshot, inventory_names, moon_names, blocker,
+                            selection):
+    """Returns a meshgrid that samples the FOV of a snapshot coarse-to-fine.
+
+    Every column of the files written for the snapshot is evaluated on a coarse
+    meshgrid, made of every COARSE-th point of the meshgrid in MESHGRIDS, with
+    the same masks as in the files; so are the keys of the tiles. Each cell
+    between four neighboring coarse points is refined to every point of that
+    meshgrid...
+        - if a mask or a tile changes between its corners, which happens at
+          limbs, terminators, ring edges, shadows and occultations;
+        - if the values of a column at its corners differ by more than its
+          tolerance; see column_tolerance();
+        - if the slope of a column along the rows or columns of the coarse
+          meshgrid changes sign at one of its corners, or a corner is the
+          coarse minimum or maximum of a column, so that extrema inside the
+          cell are sampled, such as the minimum emission and incidence angles
+          near the sub-observer and sub-solar points, or the minimum ring
+          radius;
+        - if it contains the center of a body in the inventory, which is its
+          sub-observer point;
+        - if it overlaps a body in the inventory that is less than two cells
+          wide or high, so that a body between the coarse points is sampled;
+          a larger body always covers coarse points, so its limb is found by
+          its mask;
+        - if the backplane that a tile divides crosses one of the tile's
+          limits between its corners, so that tiles narrower than a cell are
+          sampled.
+
+    Elsewhere, the values of every column vary by less than half its tolerance
+    between neighboring coarse points, and do not turn around, so for values
+    that vary smoothly within a cell, the minima and maxima are within the
+    tolerance of those found with every point.
+
+    The returned meshgrid is 1-D. Because it samples the FOV unevenly, each of
+    its points is weighted by the number of points of the full meshgrid it
+    stands for: itself, and every skipped point to which it is the nearest
+    coarse point. With these weights in the memo of metadata.py, the counts of
+    samples written into the files and the tiling minimum are in points of the
+    full meshgrid, as without adaptive sampling.
+
+    Input:
+        snapshot        the snapshot.
+        inventory_names the names of the bodies in the FOV.
+        moon_names      the names of the moons in the FOV.
+        blocker         the name of the blocker moon, if any.
+        selection       the selection of files, as in process_snapshot().
+
+    Return:             (meshgrid, weights), where weights is an integer array
+                        of the weights of the meshgrid points.
+    """
+
+    meshgrid = MESHGRIDS[(snapshot.detector, snapshot.sampling)]
+    (coarse, rows, cols) = COARSE_MESHGRIDS[(snapshot.detector,
+                                             snapshot.sampling)]
+    backplane = oops.Backplane(snapshot, coarse)
+
+    # Evaluate every column with its masks, and every tile
+    (column_descs, tile_keys) = adaptive_keys(moon_names, selection)
+    meta.MEMO.use(backplane)
+
+    refinements = []
+    for column_desc in column_descs:
+        values = meta.MEMO.masked_values(column_desc[0], PLANET,
+                                         column_desc[1], blocker)
+        refinements.append((values,) + column_tolerance(column_desc))
+
+    boundaries = []
+    for key in tile_keys:
+        refinements.append((backplane.evaluate(key), 0., None))
+        for boundary in tile_boundaries(key):
+            if boundary not in boundaries:
+                boundaries.append(boundary)
+
+    # Find the cells to refine
+    shape = (rows.size, cols.size)
+    refine = np.zeros((shape[0] - 1, shape[1] - 1), dtype='bool')
+    extrema = np.zeros(shape, dtype='bool')
+    for (values, tolerance, period) in refinements:
+        (vals, mask) = coarse_arrays(values, shape)
+
+        # A cell where the mask changes is always refined
+        any_masked = cell_any(mask)
+        all_masked = np.logical_not(cell_any(np.logical_not(mask)))
+        refine |= any_masked & ~all_masked
+
+        # Otherwise, compare the corners with the first one
+        corner_vals = [vals[:-1,:-1], vals[:-1,1:], vals[1:,:-1], vals[1:,1:]]
+        for corner in corner_vals[1:]:
+            diffs = corner - corner_vals[0]
+            if period:
+                diffs = (diffs + period/2.) % period - period/2.
+
+            refine |= ~any_masked & (np.abs(diffs) > tolerance/2.)
+
+        # Extrema can hide between the corners
+        if tolerance == 0. or np.all(mask): continue
+
+        extrema |= slope_changes(vals, mask, tolerance, period)
+        unmasked = np.flatnonzero(np.logical_not(mask))
+        extrema.flat[unmasked[np.argmin(vals.flat[unmasked])]] = True
+        extrema.flat[unmasked[np.argmax(vals.flat[unmasked])]] = True
+
+    refine |= cell_any(extrema)
+
+    # Refine the cells where a tile limit is crossed
+    for (key, limit) in boundaries:
+        (vals, mask) = coarse_arrays(backplane.evaluate(key), shape)
+        diffs = vals - limit
+        if meta.FORMAT_DICT[key[0]][0] in ("DEG", "360", "-180"):
+            diffs = (diffs + np.pi) % (2*np.pi) - np.pi
+
+        above = ~mask & (diffs > 0.)
+        below = ~mask & (diffs <= 0.)
+        refine |= cell_any(above) & cell_any(below)
+
+    # Refine the cells around the center of each body, and over small bodies
+    coarse_uv = coarse.uv.vals
+    cell_min = np.minimum(coarse_uv[:-1,:-1], coarse_uv[1:,1:])
+    cell_max = np.maximum(coarse_uv[:-1,:-1], coarse_uv[1:,1:])
+    cell_size = np.max(cell_max - cell_min, axis=(0,1))
+
+    inventory = snapshot.inventory(inventory_names, expand=EXPAND,
+                                   return_type="full")
+    for name in inventory_names:
+        body = inventory[name]
+        center = body["center_uv"].vals
+        refine |= np.all((cell_min <= center) & (center <= cell_max), axis=-1)
+
+        body_min = np.array([body["u_min"], body["v_min"]])
+        body_max = np.array([body["u_max"], body["v_max"]])
+        if np.any(body_max - body_min < 2 * cell_size):
+            refine |= np.all((cell_min <= body_max) & (body_min <= cell_max),
+                             axis=-1)
+
+    # Select the coarse points and every point of the refined cells
+    uv = meshgrid.uv.vals
+    selected = np.zeros(uv.shape[:2], dtype='bool')
+    selected[np.ix_(rows, cols)] = True
+    for (j, i) in zip(*np.nonzero(refine)):
+        selected[rows[j]:rows[j+1]+1, cols[i]:cols[i+1]+1] = True
+
+    # Count every skipped point with its nearest coarse point
+    counts = selected.astype('int')
+    (skipped_rows, skipped_cols) = np.nonzero(np.logical_not(selected))
+    near_rows = rows[nearest_coarse(rows, selected.shape[0])]
+    near_cols = cols[nearest_coarse(cols, selected.shape[1])]
+    np.add.at(counts, (near_rows[skipped_rows], near_cols[skipped_cols]), 1)
+
+    return (oops.Meshgrid(meshgrid.fov, oops.Pair(uv[selected])),
+            counts[selected])
+
+def output_filename(prefix, name):
+    """Returns the name of an output file of an index."""
+
+    return prefix + "_" + name.replace("planet", PLANET.lower()) + ".tab"
+
+def process_snapshot(snapshots, i, selection="S"):
+    """Process one snapshot of an index and return its rows.
+
+    Input:
+        snapshots       the list of snapshots of the index.
+        i               the position of the snapshot in the list.
         selection       a string containing...
                             "S" to generate summary files;
                             "D" to generate detailed files.
-    """
 
-    snapshots = iss.from_index(input_filename)
-    volume_id = snapshots[0].dict["VOLUME_ID"]
+    Return:             (i, texts, log, memo), where texts is a dictionary of
+                        the text to append to each output file, keyed by the
+                        names in OUTPUTS, log is the text to append to the log,
+                        and memo is the tuple (hits, misses) of the backplane
+                        memo for this snapshot.
+    """
 
     records = len(snapshots)
+    snapshot = snapshots[i]
 
-    # Open the output files
-    (path, filename) = os.path.split(input_filename)
-    path = path.replace("/index", "")
-    path = path.replace("/INDEX", "")
+    outputs = {}
+    for (name, letter) in OUTPUTS:
+        if letter in selection:
+            outputs[name] = StringIO()
 
-    prefix = path + "/" + volume_id
-    log_file = open(prefix + "_log.txt", "w")
-    inventory_file = open(prefix + "_inventory.tab", "w")
+    log_file = StringIO()
+    logstr = "%4d/%4d" % (i+1, records)
+    memo = (0, 0)
 
-    if "S" in selection:
-        ring_summary   = open(prefix + "_ring_summary.tab", "w")
-        planet_summary = open(prefix + "_%s_summary.tab" % PLANET.lower(), "w")
-        moon_summary   = open(prefix + "_moon_summary.tab", "w")
-
-    if "D" in selection:
-        ring_detailed   = open(prefix + "_ring_detailed.tab", "w")
-        planet_detailed = open(prefix + "_%s_detailed.tab" % PLANET.lower(),"w")
-        moon_detailed   = open(prefix + "_moon_detailed.tab", "w")
+    target = target_name(snapshot.dict)
+    if target in TRANSLATIONS.keys():
+        target = TRANSLATIONS[target]
 
-    # Loop through the snapshots...
+    # Don't abort if cspice throws a runtime error
+    try:
 
-    for i in range(records):
-        snapshot = snapshots[i]
+        # Create the record prefix
+        volume_id = snapshot.dict["VOLUME_ID"]
+        filespec = snapshot.dict["FILE_SPECIFICATION_NAME"]
+        roid = ring_observation_id(snapshot.dict)
+        prefixes = ['"' + volume_id + '"',
+                    '"%-45s"' % filespec.replace(".IMG", ".LBL"),
+                    '"' + roid + '"']
+
+        # Print a log of progress. This records where errors occurred
+        logstr = "%s  %4d/%4d  %s  %s" % (volume_id, i+1, records, roid,
+                                          target)
+        print logstr
+
+        # Inventory the bodies in the FOV (including targeted irregulars)
+        if (target not in SYSTEM_NAMES and oops.Body.exists(target)
+                                       and target != 'SUN'):
+            body_names = SYSTEM_NAMES + [target]
+        else:
+            body_names = SYSTEM_NAMES
+
+        inventory_names = snapshot.inventory(body_names, expand=EXPAND)
+
+        # Write a record into the inventory file
+        inventory_file = outputs["inventory"]
+        inventory_file.write(",".join(prefixes))
+        for name in inventory_names:
+            inventory_file.write(',"' + name + '"')
+
+        inventory_file.write("\r\n")    # Use <CR><LF> line termination
+
+        # Convert the inventory into a list of moon names
+        if len(inventory_names) > 0 and inventory_names[0] == PLANET:
+            moon_names = inventory_names[1:]
+        else:
+            moon_names = inventory_names
+
+        # Define a blocker moon, if any
+        if target in moon_names:
+            blocker = target
+        else:
+            blocker = None
+
+        # Add an irregular moon to the dictionaries if necessary
+        if target in moon_names and target not in MOON_SUMMARY_DICT.keys():
+            MOON_SUMMARY_DICT[target] = meta.replace(MOON_SUMMARY_COLUMNS,
+                                                     MOONX, target)
+            MOON_DETAILED_DICT[target] = meta.replace(MOON_DETAILED_COLUMNS,
+                                                      MOONX, target)
+            MOON_TILE_DICT[target] = meta.replace(MOON_TILES, MOONX, target)
+
+        # Create the backplane, sampling the FOV coarse-to-fine if requested
+        if ADAPTIVE:
+            (meshgrid, weights) = adaptive_meshgrid(snapshot, inventory_names,
+                                                    moon_names, blocker,
+                                                    selection)
+        else:
+            meshgrid = MESHGRIDS[(snapshot.detector, snapshot.sampling)]
+            weights = None
 
-        target = target_name(snapshot.dict)
-        if target in TRANSLATIONS.keys():
-            target = TRANSLATIONS[target]
+        backplane = oops.Backplane(snapshot, meshgrid)
+        meta.MEMO.use(backplane, weights)
 
-        # Don't abort if cspice throws a runtime error
-        try:
+        # Write the summary files
+        if "S" in selection:
+            meta.write_record(prefixes, backplane, blocker,
+                              outputs["ring_summary"], RING_SUMMARY_COLUMNS,
+                              PLANET,
+                              count_length=COUNT_LENGTH)
 
-            # Create the record prefix
-            volume_id = snapshot.dict["VOLUME_ID"]
-            filespec = snapshot.dict["FILE_SPECIFICATION_NAME"]
-            roid = ring_observation_id(snapshot.dict)
-            prefixes = ['"' + volume_id + '"',
-                        '"%-45s"' % filespec.replace(".IMG", ".LBL"),
-                        '"' + roid + '"']
+            meta.write_record(prefixes, backplane, blocker,
+                              outputs["planet_summary"], PLANET_SUMMARY_COLUMNS,
+                              PLANET, moon=PLANET,
+                              moon_length=NAME_LENGTH,
+                              count_length=COUNT_LENGTH)
 
-            # Create the backplane
-            meshgrid = MESHGRIDS[(snapshot.detector, snapshot.sampling)]
-            backplane = oops.Backplane(snapshot, meshgrid)
-
-            # Print a log of progress. This records where errors occurred
-            logstr = "%s  %4d/%4d  %s  %s" % (volume_id, i+1, records, roid,
-                                              target)
-            print logstr
-
-            # Inventory the bodies in the FOV (including targeted irregulars)
-            if (target not in SYSTEM_NAMES and oops.Body.exists(target)
-                                           and target != 'SUN'):
-                body_names = SYSTEM_NAMES + [target]
-            else:
-                body_names = SYSTEM_NAMES
-
-            inventory_names = snapshot.inventory(body_names, expand=EXPAND)
-
-            # Write a record into the inventory file
-            inventory_file.write(",".join(prefixes))
-            for name in inventory_names:
-                inventory_file.write(',"' + name + '"')
-
-            inventory_file.write("\r\n")    # Use <CR><LF> line termination
-
-            # Convert the inventory into a list of moon names
-            if len(inventory_names) > 0 and inventory_names[0] == PLANET:
-                moon_names = inventory_names[1:]
-            else:
-                moon_names = inventory_names
-
-            # Define a blocker moon, if any
-            if target in moon_names:
-                blocker = target
-            else:
-                blocker = None
-
-            # Add an irregular moon to the dictionaries if necessary
-            if target in moon_names and target not in MOON_SUMMARY_DICT.keys():
-                MOON_SUMMARY_DICT[target] = meta.replace(MOON_SUMMARY_COLUMNS,
-                                                         MOONX, target)
-                MOON_DETAILED_DICT[target] = meta.replace(MOON_DETAILED_COLUMNS,
-                                                          MOONX, target)
-                MOON_TILE_DICT[target] = meta.replace(MOON_TILES, MOONX, target)
-
-            # Write the summary files
-            if "S" in selection:
+            for name in moon_names:
                 meta.write_record(prefixes, backplane, blocker,
-                                  ring_summary, RING_SUMMARY_COLUMNS,
-                                  PLANET,
+                                  outputs["moon_summary"],
+                                  MOON_SUMMARY_DICT[name],
+                                  PLANET, moon=name,
+                                  moon_length=NAME_LENGTH,
                                   count_length=COUNT_LENGTH)
 
+        # Write the detailed files
+        if "D" in selection:
+            meta.write_record(prefixes, backplane, blocker,
+                              outputs["ring_detailed"], RING_DETAILED_COLUMNS,
+                              PLANET,
+                              count_length=COUNT_LENGTH, tiles=RING_TILES)
+
+            meta.write_record(prefixes, backplane, blocker,
+                              outputs["planet_detailed"],
+                              PLANET_DETAILED_COLUMNS,
+                              PLANET, moon=PLANET,
+                              moon_length=NAME_LENGTH,
+                              count_length=COUNT_LENGTH,
+                              tiles=PLANET_TILES)
+
+            for name in moon_names:
                 meta.write_record(prefixes, backplane, blocker,
-                                  planet_summary, PLANET_SUMMARY_COLUMNS,
-                                  PLANET, moon=PLANET,
+                                  outputs["moon_detailed"],
+                                  MOON_DETAILED_DICT[name],
+                                  PLANET, moon=name,
                                   moon_length=NAME_LENGTH,
-                                  count_length=COUNT_LENGTH)
+                                  count_length=COUNT_LENGTH,
+                                  tiles=MOON_TILE_DICT[name])
 
-                for name in moon_names:
-                    meta.write_record(prefixes, backplane, blocker,
-                                      moon_summary, MOON_SUMMARY_DICT[name],
-                                      PLANET, moon=name,
-                                      moon_length=NAME_LENGTH,
-                                      count_length=COUNT_LENGTH)
+        # Record the hit rate of the backplane memo
+        print meta.MEMO.report()
+        memo = (meta.MEMO.hits, meta.MEMO.misses)
 
-            # Write the detailed files
-            if "D" in selection:
-                meta.write_record(prefixes, backplane, blocker,
-                                  ring_detailed, RING_DETAILED_COLUMNS, PLANET,
-                                  count_length=COUNT_LENGTH, tiles=RING_TILES)
+    # A RuntimeError is probably caused by missing spice data. There is
+    # probably nothing we can do.
+    except RuntimeError as e:
 
-                meta.write_record(prefixes, backplane, blocker,
-                                  planet_detailed, PLANET_DETAILED_COLUMNS,
-                                  PLANET, moon=PLANET,
-                                  moon_length=NAME_LENGTH,
-                                  count_length=COUNT_LENGTH,
-                                  tiles=PLANET_TILES)
-
-                for name in moon_names:
-                    meta.write_record(prefixes, backplane, blocker,
-                                      moon_detailed, MOON_DETAILED_DICT[name],
-                                      PLANET, moon=name,
-                                      moon_length=NAME_LENGTH,
-                                      count_length=COUNT_LENGTH,
-                                      tiles=MOON_TILE_DICT[name])
-
-        # A RuntimeError is probably caused by missing spice data. There is
-        # probably nothing we can do.
-        except RuntimeError as e:
-
-            print e
-            log_file.write(40*"*" + "\n" + logstr + "\n")
-            log_file.write(str(e))
-            log_file.write("\n\n")
-
-        # Other kinds of errors are genuine bugs. For now, we just log the
-        # problem, and jump over the image; we can deal with it later.
-        except (AssertionError, AttributeError, IndexError, KeyError,
-                LookupError, TypeError, ValueError):
-
-            traceback.print_exc()
-            log_file.write(40*"*" + "\n" + logstr + "\n")
-            log_file.write(traceback.format_exc())
-            log_file.write("\n\n")
-
-    # Close all files
-    log_file.close()
-    inventory_file.close()
+        print e
+        log_file.write(40*"*" + "\n" + logstr + "\n")
+        log_file.write(str(e))
+        log_file.write("\n\n")
 
-    if "S" in selection:
-        ring_summary.close()
-        planet_summary.close()
-        moon_summary.close()
+    # Other kinds of errors are genuine bugs. For now, we just log the
+    # problem, and jump over the image; we can deal with it later.
+    except (AssertionError, AttributeError, IndexError, KeyError,
+            LookupError, TypeError, ValueError):
 
-    if "D" in selection:
-        ring_detailed.close()
-        planet_detailed.close()
-        moon_detailed.close()
+        traceback.print_exc()
+        log_file.write(40*"*" + "\n" + logstr + "\n")
+        log_file.write(traceback.format_exc())
+        log_file.write("\n\n")
+
+    texts = {}
+    for name in outputs:
+        texts[name] = outputs[name].getvalue()
+
+    return (i, texts, log_file.getvalue(), memo)
+
+# The snapshots of the index being processed by a worker process, keyed by the
+# name of the index file
+WORKER_SNAPSHOTS = {}
+
+def process_snapshot_in_worker(task):
+    """Process one snapshot in a worker process; the task is a tuple
+    (input_filename, i, selection). The worker reads each index file once.
+    Returns the value of process_snapshot()."""
+
+    (input_filename, i, selection) = task
+
+    if input_filename not in WORKER_SNAPSHOTS:
+        WORKER_SNAPSHOTS.clear()
+        WORKER_SNAPSHOTS[input_filename] = iss.from_index(input_filename)
+
+    return process_snapshot(WORKER_SNAPSHOTS[input_filename], i, selection)
+
+def process_index(input_filename, selection="S", pool=None):
+    """Process one index file and write a selection of metadata files.
+
+    Input:
+        input_filename  the name of the label for an ISS index file.
+        selection       a string containing...
+                            "S" to generate summary files;
+                            "D" to generate detailed files.
+        pool            an optional multiprocessing pool of worker processes,
+                        started with initialize(), to process the snapshots.
+    """
+
+    snapshots = iss.from_index(input_filename)
+    volume_id = snapshots[0].dict["VOLUME_ID"]
+
+    records = len(snapshots)
+
+    # Open the output files, resuming an interrupted run if possible
+    (path, filename) = os.path.split(input_filename)
+    path = path.replace("/index", "")
+    path = path.replace("/INDEX", "")
+
+    prefix = path + "/" + volume_id
+
+    filenames = {"log": prefix + "_log.txt"}
+    for (name, letter) in OUTPUTS:
+        if letter in selection:
+            filenames[name] = output_filename(prefix, name)
+
+    labels = [snapshot.dict["FILE_SPECIFICATION_NAME"]
+              for snapshot in snapshots]
+
+    checkpoint = meta.Checkpoint(prefix + "_progress.txt", filenames)
+    completed = checkpoint.start(labels)
+    if completed:
+        print "%s  resuming after %d/%d" % (volume_id, completed, records)
+
+    # Process the snapshots...
+    if pool is None:
+        results = (process_snapshot(snapshots, i, selection)
+                   for i in range(completed, records))
+    else:
+        tasks = [(input_filename, i, selection)
+                 for i in range(completed, records)]
+        results = pool.imap_unordered(process_snapshot_in_worker, tasks)
+
+    # ...and write their rows in the order of the index, committing each
+    # snapshot once it is written
+    pending = {}
+    next_i = completed
+    (hits, misses) = (0, 0)
+    for (i, texts, log, memo) in results:
+        pending[i] = (texts, log)
+        hits += memo[0]
+        misses += memo[1]
+        while next_i in pending:
+            (texts, log) = pending.pop(next_i)
+            for name in texts:
+                checkpoint.files[name].write(texts[name])
+            checkpoint.files["log"].write(log)
+            next_i += 1
+            checkpoint.commit(next_i, labels[next_i-1])
+
+    print "%s  backplane memo: %d hits, %d misses (%.1f%% hits)" % \
+        (volume_id, hits, misses, 100. * hits / max(hits + misses, 1))
+
+    # Close all files and give them their final names
+    checkpoint.finish()
 
 ############################################
 # Finally, generate the indices...
 ############################################
 
-for input_filename in sys.argv[1:]:
-    process_index(input_filename, selection=SELECTION)
+parser = argparse.ArgumentParser()
+parser.add_argument("index_files", nargs="+",
+                    help="The labels of the ISS index files.")
+parser.add_argument("--jobs", type=int, default=1,
+                    help="The number of worker processes; default 1.")
+parser.add_argument("--adaptive", action="store_true",
+                    help="Sample each FOV coarse-to-fine.")
+parser.add_argument("--coarse", type=int, default=COARSE,
+                    help="The coarse sampling of --adaptive, in meshgrid "
+                         "points; default %d." % COARSE)
+parser.add_argument("--angle-tolerance", type=float,
+                    default=ANGLE_TOLERANCE * oops.DPR,
+                    help="The tolerance of --adaptive for angles in degrees; "
+                         "default %g." % (ANGLE_TOLERANCE * oops.DPR))
+parser.add_argument("--distance-tolerance", type=float,
+                    default=DISTANCE_TOLERANCE,
+                    help="The tolerance of --adaptive for distances and radii "
+                         "in km; default %g." % DISTANCE_TOLERANCE)
+parser.add_argument("--resolution-tolerance", type=float,
+                    default=RESOLUTION_TOLERANCE,
+                    help="The tolerance of --adaptive for resolutions in "
+                         "km/pixel; default %g." % RESOLUTION_TOLERANCE)
+parser.add_argument("--time-tolerance", type=float,
+                    default=TIME_TOLERANCE,
+                    help="The tolerance of --adaptive for event times in "
+                         "seconds; default %g." % TIME_TOLERANCE)
+args = parser.parse_args()
+
+# Set these before the workers start, so that they inherit them
+ADAPTIVE = args.adaptive
+COARSE = args.coarse
+ANGLE_TOLERANCE = args.angle_tolerance * oops.RPD
+DISTANCE_TOLERANCE = args.distance_tolerance
+RESOLUTION_TOLERANCE = args.resolution_tolerance
+TIME_TOLERANCE = args.time_tolerance
+
+# Start the workers before this process loads the SPICE kernels, so that no two
+# processes share the open kernel files.
+if args.jobs > 1:
+    pool = multiprocessing.Pool(args.jobs, initializer=initialize)
+else:
+    pool = None
+
+initialize()
+
+for input_filename in args.index_files:
+    process_index(input_filename, selection=SELECTION, pool=pool)
+
+if pool is not None:
+    pool.close()
+    pool.join()
 
 ################################################################################
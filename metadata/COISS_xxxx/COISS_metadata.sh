@@ -5,6 +5,8 @@
 #
 # Sample usage:
 #   COISS_metadata.sh [.../pdsdata/holdings/metadata/COISS_2100] ...
+#
+# Set JOBS to the number of worker processes for each volume; default 1.
 ################################################################################
 
 # get the absolute path of the executable
@@ -27,7 +29,7 @@ cd $DIR
 for volpath in "$@"
 do
     echo $volpath
-    python COISS_metadata.py $volpath/index/index.lbl
+    python COISS_metadata.py --jobs ${JOBS:-1} $volpath/index/index.lbl
     python make_label.py $volpath/*summary.tab
     python make_label.py $volpath/*inventory.tab
 done
@@ -227,65 +227,70 @@ volname = input_dir[ivol:ivol+11]
 prefix = os.path.join(output_dir, volname)
 data_dir = os.path.join(input_dir, 'data')
 
-# Walk the directory tree, counting files to process
-count = 0
+# Walk the directory tree, listing the files to process
+paths = []
 for root, dirs, files in os.walk(data_dir):
   for name in files:
 
-    # Ignore any file that is not a VIMS file label
+    # Ignore any file that is not a UVIS file label
     if not name.lower().endswith(".lbl"): continue
     if len(name) > 6 and "20" not in name[3:6]: continue
 
-    count += 1
+    paths.append((root, name))
+
+count = len(paths)
+labels = [os.path.join(root, name) for (root, name) in paths]
 
+# Open the output files, resuming an interrupted run if possible
 error_filename   = prefix + "_errors.txt"
 warning_filename = prefix + "_warnings.txt"
 noframe_filename = prefix + "_noframeconnect.txt"
 
-error_file   = open(error_filename,   "w")
-warning_file = open(warning_filename, "w")
-noframe_file = open(noframe_filename, "w")
+filenames = {"errors":   error_filename,
+             "warnings": warning_filename,
+             "noframe":  noframe_filename}
 
 if "S" in SELECTION:
-    ring_summary   = open(prefix + "_ring_summary.tab", "w")
-    planet_summary = open(prefix + "_saturn_summary.tab", "w")
-    moon_summary   = open(prefix + "_moon_summary.tab", "w")
+    filenames["ring_summary"]   = prefix + "_ring_summary.tab"
+    filenames["planet_summary"] = prefix + "_saturn_summary.tab"
+    filenames["moon_summary"]   = prefix + "_moon_summary.tab"
 
 if "D" in SELECTION:
-    ring_detailed   = open(prefix + "_ring_detailed.tab", "w")
-    planet_detailed = open(prefix + "_saturn_detailed.tab", "w")
-    moon_detailed   = open(prefix + "_moon_detailed.tab", "w")
+    filenames["ring_detailed"]   = prefix + "_ring_detailed.tab"
+    filenames["planet_detailed"] = prefix + "_saturn_detailed.tab"
+    filenames["moon_detailed"]   = prefix + "_moon_detailed.tab"
 
-# Walk the directory tree...
-index = 0
-for root, dirs, files in os.walk(data_dir):
-  for name in files:
+checkpoint = meta.Checkpoint(prefix + "_progress.txt", filenames)
+completed = checkpoint.start(labels)
+if completed:
+    print "%s  resuming after %d/%d" % (volname, completed, count)
 
-    # Ignore any file that is not a UVIS file label
-    if not name.lower().endswith(".lbl"): continue
-    if len(name) > 6 and "20" not in name[3:6]: continue
+error_file   = checkpoint.files["errors"]
+warning_file = checkpoint.files["warnings"]
+noframe_file = checkpoint.files["noframe"]
 
-    index += 1
-    process_file(root, name, index, count, selection=SELECTION)
+if "S" in SELECTION:
+    ring_summary   = checkpoint.files["ring_summary"]
+    planet_summary = checkpoint.files["planet_summary"]
+    moon_summary   = checkpoint.files["moon_summary"]
 
-# Close all files
-error_file.close()
-warning_file.close()
-noframe_file.close()
+if "D" in SELECTION:
+    ring_detailed   = checkpoint.files["ring_detailed"]
+    planet_detailed = checkpoint.files["planet_detailed"]
+    moon_detailed   = checkpoint.files["moon_detailed"]
+
+# Process the files, committing each one when it is done
+for index in range(completed, count):
+    (root, name) = paths[index]
+    process_file(root, name, index+1, count, selection=SELECTION)
+    checkpoint.commit(index+1, labels[index])
+
+# Close all files and give them their final names
+checkpoint.finish()
 
 if os.path.getsize(error_filename) == 0: os.remove(error_filename)
 if os.path.getsize(warning_filename) == 0: os.remove(warning_filename)
 if os.path.getsize(noframe_filename) == 0: os.remove(noframe_filename)
 
-if "S" in SELECTION:
-    ring_summary.close()
-    planet_summary.close()
-    moon_summary.close()
-
-if "D" in SELECTION:
-    ring_detailed.close()
-    planet_detailed.close()
-    moon_detailed.close()
-
 ################################################################################
 
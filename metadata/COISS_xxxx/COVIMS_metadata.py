@@ -286,8 +286,8 @@ volname = input_dir[ivol:ivol+11]
 prefix = os.path.join(output_dir, volname)
 data_dir = os.path.join(input_dir, 'data')
 
-# Walk the directory tree, counting files to process
-count = 0
+# Walk the directory tree, listing the files to process
+paths = []
 for root, dirs, files in os.walk(data_dir):
   for name in files:
 
@@ -295,47 +295,51 @@ for root, dirs, files in os.walk(data_dir):
     if not name.lower().endswith(".lbl"): continue
     if not name.lower().startswith("v"): continue
 
-    count += 1
+    paths.append((root, name))
 
-# Open the output files
-log_file = open(prefix + "_log.txt", "w")
-inventory_file = open(prefix + "_inventory.tab", "w")
+count = len(paths)
+labels = [os.path.join(root, name) for (root, name) in paths]
+
+# Open the output files, resuming an interrupted run if possible
+filenames = {"log":       prefix + "_log.txt",
+             "inventory": prefix + "_inventory.tab"}
 
 if "S" in SELECTION:
-    ring_summary   = open(prefix + "_ring_summary.tab", "w")
-    planet_summary = open(prefix + "_saturn_summary.tab", "w")
-    moon_summary   = open(prefix + "_moon_summary.tab", "w")
+    filenames["ring_summary"]   = prefix + "_ring_summary.tab"
+    filenames["planet_summary"] = prefix + "_saturn_summary.tab"
+    filenames["moon_summary"]   = prefix + "_moon_summary.tab"
 
 if "D" in SELECTION:
-    ring_detailed   = open(prefix + "_ring_detailed.tab", "w")
-    planet_detailed = open(prefix + "_saturn_detailed.tab", "w")
-    moon_detailed   = open(prefix + "_moon_detailed.tab", "w")
-
-# Walk the directory tree...
-index = 0
-for root, dirs, files in os.walk(data_dir):
-  for name in files:
-
-    # Ignore any file that is not a VIMS file label
-    if not name.lower().endswith(".lbl"): continue
-    if not name.lower().startswith("v"): continue
+    filenames["ring_detailed"]   = prefix + "_ring_detailed.tab"
+    filenames["planet_detailed"] = prefix + "_saturn_detailed.tab"
+    filenames["moon_detailed"]   = prefix + "_moon_detailed.tab"
 
-    index += 1
-    process_file(root, name, index, count, selection=SELECTION)
+checkpoint = meta.Checkpoint(prefix + "_progress.txt", filenames)
+completed = checkpoint.start(labels)
+if completed:
+    print "%s  resuming after %d/%d" % (volname, completed, count)
 
-# Close all files
-log_file.close()
-inventory_file.close()
+log_file = checkpoint.files["log"]
+inventory_file = checkpoint.files["inventory"]
 
 if "S" in SELECTION:
-    ring_summary.close()
-    planet_summary.close()
-    moon_summary.close()
+    ring_summary   = checkpoint.files["ring_summary"]
+    planet_summary = checkpoint.files["planet_summary"]
+    moon_summary   = checkpoint.files["moon_summary"]
 
 if "D" in SELECTION:
-    ring_detailed.close()
-    planet_detailed.close()
-    moon_detailed.close()
+    ring_detailed   = checkpoint.files["ring_detailed"]
+    planet_detailed = checkpoint.files["planet_detailed"]
+    moon_detailed   = checkpoint.files["moon_detailed"]
+
+# Process the files, committing each one when it is done
+for index in range(completed, count):
+    (root, name) = paths[index]
+    process_file(root, name, index+1, count, selection=SELECTION)
+    checkpoint.commit(index+1, labels[index])
+
+# Close all files and give them their final names
+checkpoint.finish()
 
 ################################################################################
 
@@ -4,6 +4,7 @@
 
 import oops
 import numpy as np
+import os
 import warnings
 
 NULL = "null"                   # Indicates a suppressed backplane calculation
@@ -83,6 +84,250 @@ ALT_FORMAT_DICT = {
     ("longitude", "-180")       : ("DEG", 2, 8, "%8.3f",   None,     -999.),
     ("sub_longitude", "-180")   : ("DEG", 1, 8, "%8.3f",   None,     -999.)}
 
+################################################################################
+# Memo of masked backplane values
+################################################################################
+
+class EvaluationMemo(object):
+    """A memo of the masked backplane values and the excluded masks of one
+    snapshot.
+
+    The same ring, body and sky backplanes appear in the columns of the
+    inventory, summary and detailed files, and in the columns of every moon.
+    The memo holds the values of each (event key, mask descriptor) once, with
+    the excluded mask already applied, and shares them among all calls to
+    prep_rows() for the same backplane. It is cleared whenever a new backplane
+    is seen.
+
+    It also holds the weights of the meshgrid points, if any. A meshgrid that
+    samples the FOV coarse-to-fine skips points, and the weight of each of its
+    points is the number of points of the full meshgrid it stands for; None
+    means that every point counts once.
+    """
+
+    def __init__(self):
+        self.backplane = None
+        self.values = {}
+        self.excluded = {}
+        self.weights = None
+        self.hits = 0
+        self.misses = 0
+        self.total_hits = 0
+        self.total_misses = 0
+
+    def use(self, backplane, weights=None):
+        """Start using the memo for the given backplane, clearing it first if
+        the backplane is new. If weights are given, they replace the weights of
+        the meshgrid points."""
+
+        if backplane is not self.backplane:
+            self.backplane = backplane
+            self.values = {}
+            self.excluded = {}
+            self.weights = None
+            self.hits = 0
+            self.misses = 0
+
+        if weights is not None:
+            self.weights = weights
+
+    def excluded_mask(self, target, planet, mask_desc, blocker=None,
+                            ignore_shadows=False):
+        """Return the excluded mask of construct_excluded_mask(), from the memo
+        if possible."""
+
+        key = (target, planet, mask_desc, blocker, ignore_shadows)
+        if key not in self.excluded:
+            self.excluded[key] = construct_excluded_mask(self.backplane,
+                                                         target, planet,
+                                                         mask_desc, blocker,
+                                                         ignore_shadows)
+        return self.excluded[key]
+
+    def masked_values(self, event_key, planet, mask_desc, blocker=None,
+                            ignore_shadows=False):
+        """Return the values of a backplane with its excluded mask applied,
+        from the memo if possible.
+
+        Input:
+            event_key       the backplane key.
+            planet          name of planet, uppercase, e.g., "SATURN".
+            mask_desc       the mask descriptor; see construct_excluded_mask().
+            blocker         the name of the blocker moon, if any.
+            ignore_shadows  True to ignore shadowing and face constraints.
+        """
+
+        key = (event_key, planet, mask_desc, blocker, ignore_shadows)
+        if key in self.values:
+            self.hits += 1
+            self.total_hits += 1
+            return self.values[key]
+
+        self.misses += 1
+        self.total_misses += 1
+
+        # Fill in the backplane array
+        target = event_key[1]
+        if target == NULL:
+            values = oops.Scalar(0., True)
+        else:
+            values = self.backplane.evaluate(event_key)
+
+        # Make a shallow copy and apply the excluded mask
+        excluded = self.excluded_mask(target, planet, mask_desc, blocker,
+                                      ignore_shadows)
+        values = values.mask_where(excluded)
+
+        self.values[key] = values
+        return values
+
+    def report(self, total=False):
+        """Return a one-line summary of the hit rate of the memo, either for the
+        current backplane or, if total is True, for all backplanes."""
+
+        if total:
+            (hits, misses) = (self.total_hits, self.total_misses)
+        else:
+            (hits, misses) = (self.hits, self.misses)
+
+        lookups = hits + misses
+        rate = 100. * hits / max(lookups, 1)
+        return ("backplane memo: %d lookups, %d hits, %d misses (%.1f%% hits)"
+                % (lookups, hits, misses, rate))
+
+# The memo shared by all calls to prep_rows()
+MEMO = EvaluationMemo()
+
+################################################################################
+# Checkpointed output files
+################################################################################
+
+class Checkpoint(object):
+    """The output files of a metadata run, written so that an interrupted run
+    can resume where it stopped.
+
+    Each file is written under a temporary name, which is its final name plus
+    ".part". After every completed row of the index, the files are flushed and
+    a progress file records the number of rows completed, the label of the last
+    one, and the size of every file. A rerun truncates the files to those sizes,
+    discarding anything written for an incomplete row, and resumes after the
+    last completed row. When the run finishes, each file is renamed to its final
+    name and the progress file is removed.
+    """
+
+    def __init__(self, progress_filename, filenames):
+        """Constructor.
+
+        Input:
+            progress_filename   the name of the progress file.
+            filenames           a dictionary of the final names of the output
+                                files, keyed by any name the caller chooses.
+        """
+
+        self.progress_filename = progress_filename
+        self.filenames = filenames
+        self.files = {}
+
+    def start(self, labels):
+        """Open the files and return the number of rows already completed.
+
+        Input:
+            labels          a list of the label of every row of the index,
+                            e.g., its file specification name. A previous run is
+                            resumed only if its last completed row has the same
+                            label as the row in this list.
+        """
+
+        (completed, sizes) = self.read_progress(labels)
+
+        for key in self.filenames:
+            temp_filename = self.filenames[key] + ".part"
+            if completed:
+                self.files[key] = open(temp_filename, "r+")
+                self.files[key].truncate(sizes[key])
+                self.files[key].seek(0, 2)
+            else:
+                self.files[key] = open(temp_filename, "w")
+
+        return completed
+
+    def read_progress(self, labels):
+        """Return (completed, sizes) from the progress file, where completed is
+        the number of rows completed and sizes is a dictionary of the committed
+        size of each file. Return (0, {}) if the previous run cannot be resumed.
+        """
+
+        if not os.path.exists(self.progress_filename):
+            return (0, {})
+
+        completed = 0
+        label = None
+        sizes = {}
+        with open(self.progress_filename) as f:
+            for line in f:
+                (name, value) = line.rstrip("\n").split(" ", 1)
+                if name == "completed":
+                    completed = int(value)
+                elif name == "label":
+                    label = value
+                elif name == "size":
+                    (key, size) = value.rsplit(" ", 1)
+                    sizes[key] = int(size)
+
+        # The last completed row must be the same one
+        if completed < 1 or completed > len(labels):
+            return (0, {})
+
+        if labels[completed-1] != label:
+            return (0, {})
+
+        # Every file must still hold its committed contents
+        for key in self.filenames:
+            temp_filename = self.filenames[key] + ".part"
+            if key not in sizes or not os.path.exists(temp_filename):
+                return (0, {})
+
+            if os.path.getsize(temp_filename) < sizes[key]:
+                return (0, {})
+
+        return (completed, sizes)
+
+    def commit(self, completed, label):
+        """Record that the first rows of the index are complete.
+
+        Input:
+            completed       the number of rows completed.
+            label           the label of the last completed row.
+        """
+
+        lines = ["completed %d\n" % completed,
+                 "label %s\n" % label]
+        for key in self.files:
+            f = self.files[key]
+            f.flush()
+            os.fsync(f.fileno())
+            lines.append("size %s %d\n" % (key, f.tell()))
+
+        # Replace the progress file in a single step
+        temp_filename = self.progress_filename + ".part"
+        with open(temp_filename, "w") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.rename(temp_filename, self.progress_filename)
+
+    def finish(self):
+        """Close the files, give them their final names, and remove the progress
+        file."""
+
+        for key in self.files:
+            self.files[key].close()
+            os.rename(self.filenames[key] + ".part", self.filenames[key])
+
+        if os.path.exists(self.progress_filename):
+            os.remove(self.progress_filename)
+
 ################################################################################
 # General functions for writing metadata files
 ################################################################################
@@ -129,6 +374,8 @@ def write_record(prefixes, backplane, blocker, outfile, column_descs, planet,
                         of summary tabulations. See details above.
         tiling_min      the lower limit on the number of meshgrid points in a
                         region before that region is subdivided into tiles.
+                        With weights in MEMO, this limit and the sample counts
+                        are in points of the full meshgrid.
         ignore_shadows  True to ignore any mask constraints applicable to
                         shadowing or to the sunlit faces of surfaces.
     """
@@ -196,57 +443,59 @@ def prep_rows(prefixes, backplane, blocker, column_descs,
                         of summary tabulations. See details above.
         tiling_min      the lower limit on the number of meshgrid points in a
                         region before that region is subdivided into tiles.
+                        With weights in MEMO, this limit and the sample counts
+                        are in points of the full meshgrid.
         ignore_shadows  True to ignore any mask constraints applicable to
                         shadowing or to the sunlit faces of surfaces.
     """
 
+    # Share the masked backplane values of this snapshot among all calls
+    MEMO.use(backplane)
+    weights = MEMO.weights
+
     # Handle option for tiles
     if tiles:
-        subregion_masks = [None]    # let zone indexing start at 1
-
-        # Handle a 1-D set of regions
-        if len(tiles) == 1:
-            indices = range(1, len(tiles[0]) + 1)
-            for tile in tiles[0]:
-                mask = backplane.evaluate(tile).vals
-                subregion_masks.append(np.logical_not(mask))
-
-        # Handle a 2-D set of regions
-        else:
-            indices = range(1, len(tiles[0]) * len(tiles[1]) + 1)
-            for tile1 in tiles[0]:
-                mask1 = backplane.evaluate(tile1).vals
-                for tile2 in tiles[1]:
-                    mask2 = backplane.evaluate(tile2).vals & mask1
-                    subregion_masks.append(np.logical_not(mask2))
+        (tile_pixels, tile_starts) = group_tile_pixels(backplane, tiles)
+        tile_sizes = np.diff(tile_starts)
+        indices = range(1, tile_sizes.size + 1)  # let zone indexing start at 1
 
         # Check size of tile
-        pixels = 0
-        for mask in subregion_masks[1:]:
-            pixels += mask.size - np.count_nonzero(mask)
+        if weights is None:
+            tile_total = np.sum(tile_sizes)
+        else:
+            tile_total = np.sum(weights.ravel()[tile_pixels])
 
-        if pixels < tiling_min:
+        if tile_total < tiling_min:
             return []
 
     # Without tiling, the subregion index is zero
     else:
         indices = [0]
-        subregion_masks = []
 
-    # Create all the needed pixel masks
-    excluded_mask_dict = {}
+    # Get the values of each column, and with tiles, their statistics within
+    # every tile
+    columns = []
     for column_desc in column_descs:
         event_key = column_desc[0]
         mask_desc = column_desc[1]
-        target = event_key[1]
 
-        key = (target,) + mask_desc
-        if key in excluded_mask_dict: continue
+        # Get the backplane array with its excluded mask applied
+        values = MEMO.masked_values(event_key, planet, mask_desc,
+                                    blocker, ignore_shadows)
+
+        # Select the format
+        if len(column_desc) > 2:
+            format = ALT_FORMAT_DICT[(event_key[0], column_desc[2])]
+        else:
+            format = FORMAT_DICT[event_key[0]]
+
+        if tiles:
+            stats = tile_statistics(values, format, backplane.shape,
+                                    tile_pixels, tile_starts, weights)
+        else:
+            stats = None
 
-        excluded_mask = construct_excluded_mask(backplane, target, planet,
-                                                mask_desc,
-                                                blocker, ignore_shadows)
-        excluded_mask_dict[key] = excluded_mask
+        columns.append((values, format, stats))
 
     # Initialize the list of rows
     rows = []
@@ -255,7 +504,7 @@ def prep_rows(prefixes, backplane, blocker, column_descs,
     for indx in indices:
 
         # Skip a tile if it contains no pixels
-        if indx != 0 and np.all(subregion_masks[indx]): continue
+        if indx != 0 and tile_sizes[indx-1] == 0: continue
 
         # Initialize the list of columns
         prefix_columns = list(prefixes) # make a copy
@@ -279,36 +528,32 @@ def prep_rows(prefixes, backplane, blocker, column_descs,
 
         # For each column...
         pixel_count = 0
-        for column_desc in column_descs:
-            event_key = column_desc[0]
-            mask_desc = column_desc[1]
+        for (values, format, stats) in columns:
+
+            # Use the statistics of the tile if they are available
+            if stats is not None:
+                (results, count) = stats[indx-1]
+                pixel_count = max(pixel_count, count)
 
-            # Fill in the backplane array
-            if event_key[1] == NULL:
-                values = oops.Scalar(0., True)
+            # Otherwise, mask the pixels outside the tile
             else:
-                values = backplane.evaluate(event_key)
+                if tiles:
+                    values = values.mask_where(tile_excluded_mask(
+                                                        backplane.shape,
+                                                        tile_pixels,
+                                                        tile_starts, indx))
 
-            # Make a shallow copy and apply the new masks
-            target = event_key[1]
-            excluded = excluded_mask_dict[(target,) + mask_desc]
-            values = values.mask_where(excluded)
-            if tiles:
-                values = values.mask_where(subregion_masks[indx])
+                if values.size > 1:
+                    pixel_count = max(pixel_count,
+                                      sample_count(values, weights))
 
-            if values.size > 1:
-                pixel_count = max(pixel_count, values.unmasked())
+                results = column_results(values, format)
 
             # Write the column using the specified format
-            if len(column_desc) > 2:
-                format = ALT_FORMAT_DICT[(event_key[0], column_desc[2])]
-            else:
-                format = FORMAT_DICT[event_key[0]]
-
-            data_columns.append(formatted_column(values, format))
+            data_columns.append(formatted_column(results, format))
 
         # Save the row if it was completed
-        if len(data_columns) < len(column_descs): continue # hopeless error
+        if len(data_columns) < len(columns): continue # hopeless error
         if indx > 0 and pixel_count == 0: continue
 
         # Generate the sample count column if necessary
@@ -409,11 +654,155 @@ def construct_excluded_mask(backplane, target, planet, mask_desc,
 
     return excluded
 
-def formatted_column(values, format):
-    """Returns one formatted column (or a pair of columns) as a string.
+def group_tile_pixels(backplane, tiles):
+    """Returns the flattened indices of the meshgrid pixels in every tile,
+    grouped by tile.
+
+    Input:
+        backplane       backplane for the observation.
+        tiles           a list of one or two lists of boolean backplane keys,
+                        as in prep_rows(). With two lists, the tiles are the
+                        intersections of every key in the first list with every
+                        key in the second.
+
+    Return:             (pixels, starts), where pixels is an array of the
+                        indices into the flattened meshgrid of the pixels in
+                        each tile, in the order of the tiles. The pixels of
+                        tile i (from 1) are pixels[starts[i-1]:starts[i]].
+                        A pixel on the boundary of two tiles appears in both.
+    """
+
+    # Handle a 1-D set of regions
+    if len(tiles) == 1:
+        masks = [backplane.evaluate(tile).vals for tile in tiles[0]]
+
+    # Handle a 2-D set of regions
+    else:
+        masks = []
+        for tile1 in tiles[0]:
+            mask1 = backplane.evaluate(tile1).vals
+            for tile2 in tiles[1]:
+                masks.append(backplane.evaluate(tile2).vals & mask1)
+
+    groups = []
+    for mask in masks:
+        full_mask = np.zeros(backplane.shape, dtype='bool')
+        full_mask[...] = mask
+        groups.append(np.flatnonzero(full_mask))
+
+    starts = np.zeros(len(groups) + 1, dtype='int')
+    starts[1:] = np.cumsum([group.size for group in groups])
+
+    return (np.concatenate(groups), starts)
+
+def tile_excluded_mask(shape, pixels, starts, indx):
+    """Returns the mask of the meshgrid pixels outside one tile.
+
+    Input:
+        shape           the shape of the meshgrid.
+        pixels, starts  the pixels of every tile, from group_tile_pixels().
+        indx            the index of the tile, starting at 1.
+    """
+
+    excluded = np.ones(shape, dtype='bool')
+    excluded.ravel()[pixels[starts[indx-1]:starts[indx]]] = False
+    return excluded
+
+def sample_count(values, weights=None):
+    """Returns the number of unmasked values, each counted as the weight of its
+    meshgrid point if weights are given and cover the values."""
+
+    if weights is None or np.shape(values.vals) != np.shape(weights):
+        return values.unmasked()
+
+    mask = np.zeros(np.shape(weights), dtype='bool')
+    mask[...] = values.mask
+    return int(np.sum(weights[np.logical_not(mask)]))
+
+def tile_statistics(values, format, shape, pixels, starts, weights=None):
+    """Returns the numeric results of one column for every tile.
+
+    Minimum and maximum values are found for all the tiles at once with grouped
+    reductions over the pixels of the tiles. Other statistics are found from
+    the pixels of each tile in turn.
+
+    Input:
+        values          a Scalar of values with its applied mask.
+        format          the format tuple of the column.
+        shape           the shape of the meshgrid.
+        pixels, starts  the pixels of every tile, from group_tile_pixels().
+        weights         the weights of the meshgrid points, or None.
+
+    Return:             a list containing a tuple (results, count) for each
+                        tile, where results is the list returned by
+                        column_results() and count is the number of unmasked
+                        values in the tile, each counted as its weight; None if
+                        the values do not cover the meshgrid.
+    """
+
+    if np.shape(values.vals) != shape:
+        return None
+
+    (flag, number_of_values) = format[:2]
+    null_value = format[5]
+
+    # Gather the values of the tiles, with the values of each tile together
+    vals = values.vals.ravel()[pixels]
+    mask = np.zeros(shape, dtype='bool')
+    mask[...] = values.mask
+    unmasked = np.logical_not(mask.ravel()[pixels])
+
+    # Count the unmasked values of each non-empty tile. The reductions cannot
+    # handle empty groups, so these are left out.
+    if weights is None:
+        counts_per_pixel = unmasked.astype('int')
+    else:
+        counts_per_pixel = np.where(unmasked, weights.ravel()[pixels], 0)
+
+    sizes = np.diff(starts)
+    nonempty = np.flatnonzero(sizes)
+    counts = np.zeros(sizes.size, dtype='int')
+    if nonempty.size:
+        counts[nonempty] = np.add.reduceat(counts_per_pixel, starts[nonempty])
+
+    # Find the range of each tile in one pass
+    if number_of_values == 2 and flag in ("", "DEG"):
+        vals = vals.astype('float')
+        if flag == "DEG":
+            vals = vals * oops.DPR
+
+        minima = np.zeros(sizes.size)
+        maxima = np.zeros(sizes.size)
+        if nonempty.size:
+            minima[nonempty] = np.minimum.reduceat(
+                                        np.where(unmasked, vals, np.inf),
+                                        starts[nonempty])
+            maxima[nonempty] = np.maximum.reduceat(
+                                        np.where(unmasked, vals, -np.inf),
+                                        starts[nonempty])
+
+        stats = []
+        for i in range(sizes.size):
+            if counts[i] == 0:
+                stats.append(([null_value, null_value], 0))
+            else:
+                stats.append(([minima[i], maxima[i]], counts[i]))
+
+        return stats
+
+    # Otherwise, use the values of each tile in turn
+    stats = []
+    for i in range(sizes.size):
+        tile = slice(starts[i], starts[i+1])
+        tile_values = oops.Scalar(vals[tile], np.logical_not(unmasked[tile]))
+        stats.append((column_results(tile_values, format), counts[i]))
+
+    return stats
+
+def column_results(values, format):
+    """Returns the list of the one or two numeric values of a column.
 
     Input:
-        columns         a list of the columns so far.
         values          a Scalar of values with its applied mask.
         format          a tuple (flag, number_of_values, column_width,
                         standard_format, overflow_format, null_value),
@@ -452,6 +841,20 @@ def formatted_column(values, format):
     else:
         results = [values.min(), values.max()]
 
+    return results
+
+def formatted_column(results, format):
+    """Returns one formatted column (or a pair of columns) as a string.
+
+    Input:
+        results         the list of numeric values from column_results().
+        format          the format tuple, as in column_results().
+    """
+
+    # Interpret the format
+    (flag, number_of_values, column_width,
+     standard_format, overflow_format, null_value) = format
+
     # Write the formatted value(s)
     strings = []
     for number in results:
@@ -4,6 +4,7 @@
 
 import oops
 import numpy as np
+import os
 import warnings
 
 NULL = "null"                   # Indicates a suppressed backplane calculation
@@ -83,6 +84,136 @@ ALT_FORMAT_DICT = {
     ("longitude", "-180")       : ("DEG", 2, 8, "%8.3f",   None,     -999.),
     ("sub_longitude", "-180")   : ("DEG", 1, 8, "%8.3f",   None,     -999.)}
 
+################################################################################
+# Checkpointed output files
+################################################################################
+
+class Checkpoint(object):
+    """The output files of a metadata run, written so that an interrupted run
+    can resume where it stopped.
+
+    Each file is written under a temporary name, which is its final name plus
+    ".part". After every completed row of the index, the files are flushed and
+    a progress file records the number of rows completed, the label of the last
+    one, and the size of every file. A rerun truncates the files to those sizes,
+    discarding anything written for an incomplete row, and resumes after the
+    last completed row. When the run finishes, each file is renamed to its final
+    name and the progress file is removed.
+    """
+
+    def __init__(self, progress_filename, filenames):
+        """Constructor.
+
+        Input:
+            progress_filename   the name of the progress file.
+            filenames           a dictionary of the final names of the output
+                                files, keyed by any name the caller chooses.
+        """
+
+        self.progress_filename = progress_filename
+        self.filenames = filenames
+        self.files = {}
+
+    def start(self, labels):
+        """Open the files and return the number of rows already completed.
+
+        Input:
+            labels          a list of the label of every row of the index,
+                            e.g., its file specification name. A previous run is
+                            resumed only if its last completed row has the same
+                            label as the row in this list.
+        """
+
+        (completed, sizes) = self.read_progress(labels)
+
+        for key in self.filenames:
+            temp_filename = self.filenames[key] + ".part"
+            if completed:
+                self.files[key] = open(temp_filename, "r+")
+                self.files[key].truncate(sizes[key])
+                self.files[key].seek(0, 2)
+            else:
+                self.files[key] = open(temp_filename, "w")
+
+        return completed
+
+    def read_progress(self, labels):
+        """Return (completed, sizes) from the progress file, where completed is
+        the number of rows completed and sizes is a dictionary of the committed
+        size of each file. Return (0, {}) if the previous run cannot be resumed.
+        """
+
+        if not os.path.exists(self.progress_filename):
+            return (0, {})
+
+        completed = 0
+        label = None
+        sizes = {}
+        with open(self.progress_filename) as f:
+            for line in f:
+                (name, value) = line.rstrip("\n").split(" ", 1)
+                if name == "completed":
+                    completed = int(value)
+                elif name == "label":
+                    label = value
+                elif name == "size":
+                    (key, size) = value.rsplit(" ", 1)
+                    sizes[key] = int(size)
+
+        # The last completed row must be the same one
+        if completed < 1 or completed > len(labels):
+            return (0, {})
+
+        if labels[completed-1] != label:
+            return (0, {})
+
+        # Every file must still hold its committed contents
+        for key in self.filenames:
+            temp_filename = self.filenames[key] + ".part"
+            if key not in sizes or not os.path.exists(temp_filename):
+                return (0, {})
+
+            if os.path.getsize(temp_filename) < sizes[key]:
+                return (0, {})
+
+        return (completed, sizes)
+
+    def commit(self, completed, label):
+        """Record that the first rows of the index are complete.
+
+        Input:
+            completed       the number of rows completed.
+            label           the label of the last completed row.
+        """
+
+        lines = ["completed %d\n" % completed,
+                 "label %s\n" % label]
+        for key in self.files:
+            f = self.files[key]
+            f.flush()
+            os.fsync(f.fileno())
+            lines.append("size %s %d\n" % (key, f.tell()))
+
+        # Replace the progress file in a single step
+        temp_filename = self.progress_filename + ".part"
+        with open(temp_filename, "w") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.rename(temp_filename, self.progress_filename)
+
+    def finish(self):
+        """Close the files, give them their final names, and remove the progress
+        file."""
+
+        for key in self.files:
+            self.files[key].close()
+            os.rename(self.filenames[key] + ".part", self.filenames[key])
+
+        if os.path.exists(self.progress_filename):
+            os.remove(self.progress_filename)
+
 ################################################################################
 # General functions for writing metadata files
 ################################################################################
@@ -105,40 +105,67 @@ def process_index(input_filename, selection="S"):
 
     records = len(snapshots)
 
-    # Open the output files
+    # Open the output files, resuming an interrupted run if possible
     (path, filename) = os.path.split(input_filename)
     path = path.replace("/index", "")
     path = path.replace("/INDEX", "")
 
     prefix = path + "/" + volume_id
-    log_file = open(prefix + "_log.txt", "w")
-    inventory_file = open(prefix + "_inventory.tab", "w")
 
     planet = '_' + PLANET.lower()
 
+    filenames = {"log":       prefix + "_log.txt",
+                 "inventory": prefix + "_inventory.tab"}
+
     if "S" in selection:
-        ring_summary   = open(prefix + "_ring_summary.tab", "w")
-        planet_summary = open(prefix + planet + "_summary.tab", "w")
-        moon_summary   = open(prefix + "_moon_summary.tab", "w")
+        filenames["ring_summary"]   = prefix + "_ring_summary.tab"
+        filenames["planet_summary"] = prefix + planet + "_summary.tab"
+        filenames["moon_summary"]   = prefix + "_moon_summary.tab"
 
     if "D" in selection:
-        ring_detailed   = open(prefix + "_ring_detailed.tab", "w")
-        planet_detailed = open(prefix + planet + "_detailed.tab", "w")
-        moon_detailed   = open(prefix + "_moon_detailed.tab", "w")
+        filenames["ring_detailed"]   = prefix + "_ring_detailed.tab"
+        filenames["planet_detailed"] = prefix + planet + "_detailed.tab"
+        filenames["moon_detailed"]   = prefix + "_moon_detailed.tab"
 
     if "T" in selection:
-        test_summary = open(prefix + "_test_summary.tab", "w")
+        filenames["test_summary"] = prefix + "_test_summary.tab"
+
+    labels = [snapshot.dict["FILE_SPECIFICATION_NAME"]
+              for snapshot in snapshots]
+
+    checkpoint = meta.Checkpoint(prefix + "_progress.txt", filenames)
+    completed = checkpoint.start(labels)
+    if completed:
+        print "%s  resuming after %d/%d" % (volume_id, completed, records)
+
+    log_file = checkpoint.files["log"]
+    inventory_file = checkpoint.files["inventory"]
 
-    # Loop through the snapshots...
+    if "S" in selection:
+        ring_summary   = checkpoint.files["ring_summary"]
+        planet_summary = checkpoint.files["planet_summary"]
+        moon_summary   = checkpoint.files["moon_summary"]
+
+    if "D" in selection:
+        ring_detailed   = checkpoint.files["ring_detailed"]
+        planet_detailed = checkpoint.files["planet_detailed"]
+        moon_detailed   = checkpoint.files["moon_detailed"]
 
-    for i in range(records):
+    if "T" in selection:
+        test_summary = checkpoint.files["test_summary"]
+
+    # Loop through the snapshots, committing each one when it is done...
+
+    for i in range(completed, records):
         snapshot = snapshots[i]
 
         target = snapshot.dict['TARGET_NAME']
         if target in TRANSLATIONS:
             target = TRANSLATIONS[target]
 
-        if target in ('DARK', 'CAL LAMPS', 'PLAQUE'): continue
+        if target in ('DARK', 'CAL LAMPS', 'PLAQUE'):
+            checkpoint.commit(i+1, labels[i])
+            continue
 
         # Don't abort if cspice throws a runtime error
         try:
@@ -261,22 +288,10 @@ def process_index(input_filename, selection="S"):
             log_file.write(traceback.format_exc())
             log_file.write("\n\n")
 
-    # Close all files
-    log_file.close()
-    inventory_file.close()
-
-    if "S" in selection:
-        ring_summary.close()
-        planet_summary.close()
-        moon_summary.close()
+        checkpoint.commit(i+1, labels[i])
 
-    if "D" in selection:
-        ring_detailed.close()
-        planet_detailed.close()
-        moon_detailed.close()
-
-    if "T" in selection:
-        test_summary.close()
+    # Close all files and give them their final names
+    checkpoint.finish()
 
 ############################################
 # Finally, generate the indices...
@@ -47,8 +47,8 @@ def back_migrate_image_area(old_binary_header_len, pds4_tail, pds4_image_area):
             pds4_image_area.binary_header[:old_binary_header_len]
 
     return ImageArea(pds3_binary_header,
-                     pds4_tail.binary_prefixes_at_tail,
-                     pds4_image_area.binary_image_lines)
+                     pds4_tail.binary_prefix_block,
+                     pds4_image_area.binary_image_block)
 
 
 def make_trimmed_labels(system_labels,
@@ -67,13 +67,15 @@ def make_trimmed_labels(system_labels,
                         property_labels.to_byte_length(),
                         history_labels.to_byte_length(),
                         len(maybe_bs(padding))])
-    # then we figure how much to trim.
+    # then we figure how much to trim.  (Careful: padding[:-excess]
+    # would drop all the padding when there is no excess.)
     excess = dummy_length - orig_lblsize
+    padding = maybe_bs(padding)
 
     return Labels(system_labels,
                   property_labels,
                   history_labels,
-                  padding[:-excess])
+                  padding[:len(padding) - excess])
 
 
 def back_migrate_eol_labels(orig_label_items, pds4_eol_labels):
@@ -0,0 +1,272 @@
+"""
+Migrate many VICAR files in parallel, resumably.
+
+Each file is migrated by Migrate.migrate_file() in a pool of worker
+processes.  Every migrated file is recorded in a manifest, one JSON
+object per line, holding the input path, size and modification time,
+and the output path, size and MD5 checksum.  When the batch is run
+again with the same manifest, inputs that are recorded there and
+unchanged since, and whose outputs still match their recorded size and
+checksum, are skipped; so after a crash the batch picks up where it
+left off.  Since migrate_file() writes to
+a temporary file and renames it, a crash never leaves a partial
+output behind.
+
+With --verify, each output is also back-migrated and compared against
+its input (see VerifyMigration.py) before it is recorded as complete.
+With --trusted, the parsed files are checked less thoroughly (see
+VicarSyntax.CHEAP_VALIDATION).
+
+Usage: python BatchMigrate.py [--jobs N] [--manifest PATH] [--verify]
+                              [--trusted] PATH ...
+
+where each PATH is a VICAR file or a directory to search for them.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import os.path
+import sys
+import time
+import traceback
+
+from typing import TYPE_CHECKING
+
+from Migrate import make_dat_tim, make_output_filepath, migrate_file
+from VerifyMigration import verify_file
+from VicarSyntax import CHEAP_VALIDATION, set_validation_level
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+    # A task is a 3-tuple of the input filepath, the output filepath
+    # and the original filepath to be saved in the migration task.
+    TASK = Tuple[str, str, str]
+
+    # A manifest entry or a worker's result.
+    RECORD = Dict[str, Any]
+
+DEFAULT_MANIFEST_FILEPATH = 'migration_manifest.jsonl'  # type: str
+
+# The size of the chunks in which outputs are read to checksum them.
+_MD5_CHUNK_SIZE = 1 << 20  # type: int
+
+
+def find_vicar_files(paths):
+    # type: (Iterable[str]) -> List[str]
+    """
+    Return the VICAR files (*.IMG or *.img) that are either given in
+    paths or found below the directories given in paths, in sorted
+    order within each directory.
+    """
+
+    def is_vicar_file(filepath):
+        # type: (str) -> bool
+        return filepath.endswith('.IMG') or filepath.endswith('.img')
+
+    res = []  # type: List[str]
+    for path in paths:
+        if os.path.isfile(path):
+            if is_vicar_file(path):
+                res.append(path)
+        elif os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                res.extend(os.path.join(root, name)
+                           for name in sorted(files)
+                           if is_vicar_file(name))
+    return res
+
+
+def load_manifest(manifest_filepath):
+    # type: (str) -> Dict[str, RECORD]
+    """
+    Read the manifest, returning its entries keyed by input filepath.
+    A missing manifest is empty; a truncated last line (from a crash
+    while appending) is ignored.
+    """
+    manifest = {}  # type: Dict[str, RECORD]
+    if os.path.exists(manifest_filepath):
+        with open(manifest_filepath) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                manifest[entry['input']] = entry
+    return manifest
+
+
+def file_md5(filepath):
+    # type: (str) -> str
+    """Return the MD5 checksum of the file, reading it a chunk at a time."""
+    md5 = hashlib.md5()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(_MD5_CHUNK_SIZE), ''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def is_already_migrated(manifest, task):
+    # type: (Dict[str, RECORD], TASK) -> bool
+    """
+    Return True if the manifest shows the task's input was migrated to
+    its output, the input is unchanged since, and the output still has
+    the recorded size and MD5 checksum.  If either file can't be read,
+    it is not migrated.
+    """
+    input_filepath, output_filepath, _original_filepath = task
+    try:
+        entry = manifest[input_filepath]
+    except KeyError:
+        return False
+    if entry['output'] != output_filepath:
+        return False
+    try:
+        input_stat = os.stat(input_filepath)
+        if (entry['size'] != input_stat.st_size or
+                entry['mtime'] != input_stat.st_mtime):
+            return False
+        # Manifests written before output sizes were recorded only
+        # have the checksum.
+        if ('output_size' in entry and
+                entry['output_size'] != os.path.getsize(output_filepath)):
+            return False
+        return entry['md5'] == file_md5(output_filepath)
+    except (IOError, OSError):
+        return False
+
+
+def _migrate_task(args):
+    # type: (Tuple[TASK, str, bool, bool]) -> RECORD
+    """
+    Migrate (and optionally verify) one file in a worker process.
+    Return a record of the result; any exception is caught and
+    reported in the record so one bad file doesn't stop the batch.
+    """
+    ((input_filepath, output_filepath, original_filepath),
+     dat_tim,
+     verify,
+     trusted) = args
+    if trusted:
+        set_validation_level(CHEAP_VALIDATION)
+    record = {'input': input_filepath,
+              'output': output_filepath}  # type: RECORD
+    start = time.time()
+    try:
+        stat = os.stat(input_filepath)
+        md5 = migrate_file(input_filepath,
+                           output_filepath,
+                           original_filepath,
+                           dat_tim)
+        if verify:
+            mismatch_offset = verify_file(output_filepath, input_filepath)
+            if mismatch_offset is not None:
+                os.remove(output_filepath)
+                raise Exception('back-migration differs from the original '
+                                'at byte %d' % mismatch_offset)
+        record.update({'size': stat.st_size,
+                       'mtime': stat.st_mtime,
+                       'output_size': os.path.getsize(output_filepath),
+                       'md5': md5})
+    except Exception:
+        record['error'] = traceback.format_exc()
+    record['seconds'] = time.time() - start
+    return record
+
+
+def migrate_files(tasks, manifest_filepath, jobs=None, dat_tim=None,
+                  verify=False, trusted=False):
+    # type: (List[TASK], str, Optional[int], Optional[str], bool, bool) -> List[RECORD]
+    """
+    Migrate the tasks not already recorded in the manifest across a
+    pool of jobs worker processes (by default, one per CPU).  All
+    files are stamped with the same DAT_TIM.  If verify is True, an
+    output that does not back-migrate to its input is a failure and
+    is removed.  If trusted is True, the workers use cheap
+    validation.  Append each success to the manifest as it completes
+    and print its throughput.  Return the records of the failures.
+    """
+    manifest = load_manifest(manifest_filepath)
+    todo = [task for task in tasks if not is_already_migrated(manifest, task)]
+    print '**** %d files to migrate; %d already migrated.' % \
+        (len(todo), len(tasks) - len(todo))
+
+    if not dat_tim:
+        dat_tim = make_dat_tim()
+
+    failures = []  # type: List[RECORD]
+    total_bytes = 0
+    start = time.time()
+    pool = multiprocessing.Pool(jobs)
+    try:
+        with open(manifest_filepath, 'a') as manifest_file:
+            for record in pool.imap_unordered(_migrate_task,
+                                              [(task, dat_tim,
+                                                verify, trusted)
+                                               for task in todo]):
+                if 'error' in record:
+                    failures.append(record)
+                    print '**** FAILED %s:\n%s' % (record['input'],
+                                                   record['error'])
+                    continue
+                manifest_file.write(json.dumps(record, sort_keys=True))
+                manifest_file.write('\n')
+                manifest_file.flush()
+                total_bytes += record['size']
+                print '**** Migrated %s (%.1f MB/s).' % \
+                    (record['output'],
+                     record['size'] / max(record['seconds'], 1e-6) / 1e6)
+    finally:
+        pool.terminate()
+        pool.join()
+
+    elapsed = time.time() - start
+    print '**** Migrated %d files, %.1f MB in %.1f s (%.1f MB/s); ' \
+        '%d failed.' % (len(todo) - len(failures),
+                        total_bytes / 1e6,
+                        elapsed,
+                        total_bytes / max(elapsed, 1e-6) / 1e6,
+                        len(failures))
+    return failures
+
+
+def _make_tasks(input_filepaths):
+    # type: (List[str]) -> List[TASK]
+    """
+    Migrate each file next to itself, as Migrate.py does.  Skip files
+    that are themselves the outputs of such a migration.
+    """
+    return [(input_filepath,
+             make_output_filepath(input_filepath),
+             input_filepath)
+            for input_filepath in input_filepaths
+            if not os.path.splitext(input_filepath)[0].endswith('_pds4')]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Migrate VICAR files in parallel, resumably.')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='number of worker processes '
+                             '(default: one per CPU)')
+    parser.add_argument('--manifest', default=DEFAULT_MANIFEST_FILEPATH,
+                        help='manifest of completed files (default: %s)' %
+                             DEFAULT_MANIFEST_FILEPATH)
+    parser.add_argument('--verify', action='store_true',
+                        help='verify that each output back-migrates to '
+                             'its input')
+    parser.add_argument('--trusted', action='store_true',
+                        help='check the parsed files less thoroughly')
+    parser.add_argument('paths', nargs='+',
+                        help='VICAR files or directories to search')
+    args = parser.parse_args()
+
+    failures = migrate_files(_make_tasks(find_vicar_files(args.paths)),
+                             args.manifest,
+                             args.jobs,
+                             verify=args.verify,
+                             trusted=args.trusted)
+    sys.exit(1 if failures else 0)
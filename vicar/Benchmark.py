@@ -0,0 +1,233 @@
+"""
+Benchmarks for the parse / migrate / back-migrate pipeline.
+
+Synthetic VICAR files are built from generated labels and blocks of
+bytes: square images of 256, 512 and 1024 lines, each with and
+without binary prefixes and with and without EOL labels.  For each,
+we time parsing, migration, back-migration and writing the results,
+and report the wall time, the throughput and the peak RSS of the
+process.  Each file is benchmarked in a fresh process so the peak RSS
+belongs to that file alone.
+
+Usage: python Benchmark.py [--repeat N] [--output FILE] [--compare FILE]
+
+The results are written as JSON (to FILE, or to standard output), so
+results from two commits can be diffed, or compared with --compare.
+"""
+import argparse
+import json
+import multiprocessing
+import resource
+import subprocess
+import sys
+import time
+from StringIO import StringIO
+
+from typing import TYPE_CHECKING
+
+from BackMigration import back_migrate_vicar_file
+from ImageArea import ImageArea
+from Migration import migrate_vicar_file
+from Parsers import parse_all_at
+from StringUtils import generate_block
+from Tail import Tail
+from VicarFile import VicarFile, parse_vicar_file_at
+from test_VicarFile import gen_eol_labels, gen_labels
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, List, Optional, Tuple
+
+    # A case is a 3-tuple of the image size, the binary prefix width
+    # and whether there are EOL labels.
+    CASE = Tuple[int, int, bool]
+    RESULT = Dict[str, Any]
+
+IMAGE_SIZES = [256, 512, 1024]  # type: List[int]
+
+# The width of the binary prefixes of Cassini ISS images.
+PREFIX_WIDTH = 24  # type: int
+
+DAT_TIM = 'Thu Jan 01 00:00:00 1970'  # type: str
+
+
+def gen_vicar_file(image_size, prefix_width, has_eol_labels):
+    # type: (int, int, bool) -> VicarFile
+    """
+    Generate a VICAR file with a square image of the given size,
+    binary prefixes of the given width (or none, if zero), and
+    optionally EOL labels.
+    """
+    recsize = prefix_width + image_size
+    label_kwargs = {'LBLSIZE': 0,
+                    'RECSIZE': recsize,
+                    'NBB': prefix_width,
+                    'NL': image_size,
+                    'NS': image_size,
+                    'N1': image_size,
+                    'N2': image_size,
+                    'N3': 1}
+    if has_eol_labels:
+        label_kwargs['EOL'] = 1
+        eol_labels = gen_eol_labels(recsize, LBLSIZE=0, NBB=prefix_width)
+    else:
+        eol_labels = None
+    if prefix_width:
+        prefixes = generate_block(prefix_width, image_size)
+    else:
+        prefixes = None
+    return VicarFile(gen_labels(**label_kwargs),
+                     ImageArea(None,
+                               prefixes,
+                               generate_block(image_size, image_size)),
+                     eol_labels,
+                     Tail(None, None))
+
+
+def _time(f, repeat):
+    # type: (Callable[[], Any], int) -> Tuple[float, Any]
+    """
+    Call f repeat times and return the best wall time and the last
+    result.
+    """
+    best = None  # type: Optional[float]
+    res = None
+    for _ in xrange(repeat):
+        start = time.time()
+        res = f()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, res
+
+
+def run_case(args):
+    # type: (Tuple[CASE, int]) -> RESULT
+    """
+    Benchmark one case and return its results.  Meant to be run in a
+    fresh process.
+    """
+    (image_size, prefix_width, has_eol_labels), repeat = args
+    pds3_bytes = gen_vicar_file(image_size,
+                                prefix_width,
+                                has_eol_labels).to_byte_string()
+    size = len(pds3_bytes)
+
+    timings = {}  # type: Dict[str, float]
+    timings['parse_vicar_file'], pds3_vicar_file = _time(
+        lambda: parse_all_at(parse_vicar_file_at, pds3_bytes), repeat)
+    timings['migrate_vicar_file'], pds4_vicar_file = _time(
+        lambda: migrate_vicar_file('BENCHMARK.IMG', DAT_TIM, pds3_vicar_file),
+        repeat)
+    timings['back_migrate_vicar_file'], _res = _time(
+        lambda: back_migrate_vicar_file(pds4_vicar_file), repeat)
+    timings['to_byte_string'], pds4_bytes = _time(
+        pds4_vicar_file.to_byte_string, repeat)
+    timings['write_to'], _res = _time(
+        lambda: pds4_vicar_file.write_to(StringIO()), repeat)
+    timings['parse_migrated_file'], _res = _time(
+        lambda: parse_all_at(parse_vicar_file_at, pds4_bytes), repeat)
+
+    return {'image_size': image_size,
+            'prefix_width': prefix_width,
+            'eol_labels': has_eol_labels,
+            'bytes': size,
+            'seconds': timings,
+            'bytes_per_second': {name: size / max(seconds, 1e-9)
+                                 for name, seconds in timings.items()},
+            # ru_maxrss is in kilobytes on Linux (bytes on Mac OS).
+            'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+
+def all_cases():
+    # type: () -> List[CASE]
+    return [(image_size, prefix_width, has_eol_labels)
+            for image_size in IMAGE_SIZES
+            for prefix_width in [0, PREFIX_WIDTH]
+            for has_eol_labels in [False, True]]
+
+
+def _case_name(result):
+    # type: (RESULT) -> str
+    return '%dx%d%s%s' % (result['image_size'],
+                          result['image_size'],
+                          ' prefixed' if result['prefix_width'] else '',
+                          ' eol' if result['eol_labels'] else '')
+
+
+def _git_commit():
+    # type: () -> Optional[str]
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD']).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(repeat=3):
+    # type: (int) -> Dict[str, Any]
+    """Run every case, each in its own process, and return the results."""
+    pool = multiprocessing.Pool(1, maxtasksperchild=1)
+    try:
+        results = pool.map(run_case, [(case, repeat) for case in all_cases()],
+                           chunksize=1)
+    finally:
+        pool.terminate()
+        pool.join()
+    return {'commit': _git_commit(),
+            'repeat': repeat,
+            'results': results}
+
+
+def print_results(benchmarks, baseline=None):
+    # type: (Dict[str, Any], Optional[Dict[str, Any]]) -> None
+    """
+    Print the results as a table.  If baseline results are given,
+    also print the ratio of each time to the baseline's.
+    """
+    baseline_results = {}  # type: Dict[str, RESULT]
+    if baseline:
+        baseline_results = {_case_name(result): result
+                            for result in baseline['results']}
+    for result in benchmarks['results']:
+        name = _case_name(result)
+        print '**** %s (%d bytes, peak RSS %d):' % (name,
+                                                    result['bytes'],
+                                                    result['peak_rss'])
+        for step, seconds in sorted(result['seconds'].items()):
+            line = '****   %-24s %9.4f s %9.1f MB/s' % (
+                step, seconds, result['bytes_per_second'][step] / 1e6)
+            try:
+                baseline_seconds = baseline_results[name]['seconds'][step]
+                line += '  x%.2f' % (seconds / max(baseline_seconds, 1e-9))
+            except KeyError:
+                pass
+            print line
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark parsing, migration and back-migration.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='times to repeat each step; the best time '
+                             'is reported (default: 3)')
+    parser.add_argument('--output', default=None,
+                        help='file to write the JSON results to '
+                             '(default: standard output)')
+    parser.add_argument('--compare', default=None,
+                        help='JSON results of an earlier run to compare '
+                             'against')
+    args = parser.parse_args()
+
+    benchmarks = run_benchmarks(args.repeat)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    else:
+        baseline = None
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(benchmarks, f, indent=2, sort_keys=True)
+        print_results(benchmarks, baseline)
+    else:
+        json.dump(benchmarks, sys.stdout, indent=2, sort_keys=True)
+        print
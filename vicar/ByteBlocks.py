@@ -0,0 +1,117 @@
+"""
+Functionality to hold rectangular blocks of bytes (image lines, binary
+prefixes) as 2-D numpy arrays of uint8 instead of as lists of
+byte-strings, one per line.
+
+A block parsed out of a file is a view into the bytes of the file, so
+parsing does not copy it, and cutting a block into columns (for
+instance, separating binary prefixes from image lines) is slicing,
+not copying.
+"""
+import numpy as np
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import List, Optional, Union
+
+
+def lines_to_block(lines):
+    # type: (List[str]) -> np.ndarray
+    """
+    Convert a list of byte-strings of equal length into a block with
+    one row per byte-string.
+    """
+    height = len(lines)
+    if height == 0:
+        return np.zeros((0, 0), dtype=np.uint8)
+    width = len(lines[0])
+    for line in lines:
+        assert line is not None
+        assert len(line) == width
+    if width == 0:
+        return np.zeros((height, 0), dtype=np.uint8)
+    return np.frombuffer(''.join(lines), dtype=np.uint8).reshape(height,
+                                                                 width)
+
+
+def block_to_lines(block):
+    # type: (np.ndarray) -> List[str]
+    """Convert a block into a list of byte-strings, one per row."""
+    return [row.tobytes() for row in block]
+
+
+def as_block(lines_or_block):
+    # type: (Optional[Union[List[str], np.ndarray]]) -> Optional[np.ndarray]
+    """
+    Accept either a list of byte-strings or a block and return a
+    block.  None stays None.
+    """
+    if lines_or_block is None:
+        return None
+    elif isinstance(lines_or_block, np.ndarray):
+        assert lines_or_block.ndim == 2
+        assert lines_or_block.dtype == np.uint8
+        return lines_or_block
+    else:
+        return lines_to_block(lines_or_block)
+
+
+def block_at(height, width, src, pos):
+    # type: (int, int, str, int) -> np.ndarray
+    """
+    Return a block of the given dimensions viewing the bytes of src
+    starting at offset pos.  The bytes are not copied.
+    """
+    size = height * width
+    if len(src) < pos + size:
+        raise Exception('block_at(): not enough bytes available')
+    if size == 0:
+        return np.zeros((height, width), dtype=np.uint8)
+    return np.frombuffer(src,
+                         dtype=np.uint8,
+                         count=size,
+                         offset=pos).reshape(height, width)
+
+
+def blocks_are_equal(block, other_block):
+    # type: (Optional[np.ndarray], Optional[np.ndarray]) -> bool
+    """
+    Return True if both blocks are None or if they have the same
+    shape and contents.  All blocks without rows are equal, as all
+    empty lists of lines are.
+    """
+    if block is None or other_block is None:
+        return block is None and other_block is None
+    if block.shape[0] == 0 and other_block.shape[0] == 0:
+        return True
+    return (block.shape == other_block.shape and
+            np.array_equal(block, other_block))
+
+
+def copy_bytes_into(byte_str, buf, offset):
+    # type: (str, np.ndarray, int) -> int
+    """
+    Copy a byte-string into the 1-D uint8 array buf at offset.  Return
+    the offset just past the copied bytes.
+    """
+    end = offset + len(byte_str)
+    if byte_str:
+        buf[offset:end] = np.frombuffer(byte_str, dtype=np.uint8)
+    return end
+
+
+def copy_block_into(block, buf, offset):
+    # type: (np.ndarray, np.ndarray, int) -> int
+    """
+    Copy a block, row after row, into the 1-D uint8 array buf at
+    offset with a single vectorized copy.  The block may be a strided
+    view (a column slice of a wider block); copying it this way is
+    much faster than calling tobytes() on it.  Return the offset just
+    past the copied bytes.
+    """
+    height, width = block.shape
+    end = offset + height * width
+    if end > offset:
+        buf[offset:end].reshape(height, width)[...] = block
+    return end
@@ -5,7 +5,7 @@ from LabelItem import LabelItem
 from Labels import Labels
 from SystemLabels import SystemLabels
 from Value import StringValue
-from VicarFile import VicarFile
+from VicarFile import VicarFile, parse_vicar_labels
 
 if TYPE_CHECKING:
     from typing import Optional, Tuple
@@ -98,6 +98,16 @@ def fix_labels(labels):
         return None
 
 
+def has_cassini_bug(filepath):
+    # type: (str) -> bool
+    """
+    Return True if the labels or EOL labels of the VICAR file at the
+    given path need the Cassini bug fixed.  Only the labels are read.
+    """
+    labels, eol_labels = parse_vicar_labels(filepath)
+    return fix_labels(labels) is not None or fix_labels(eol_labels) is not None
+
+
 def fix_cassini_bug(filepath, vicar_file):
     # type: (str, VicarFile) -> VicarFile
     fixed_labels = fix_labels(vicar_file.labels)
@@ -90,15 +90,15 @@ def dump_image_area(image_area, dumper=None):
         else:
             dumper.print_line('Binary header (%d):' %
                               (len(image_area.binary_header),))
-        if image_area.binary_prefixes is None:
+        if image_area.binary_prefix_block is None:
             dumper.print_line('Binary prefixes: None')
         else:
+            height, width = image_area.binary_prefix_block.shape
             dumper.print_line('Binary prefixes (%d x %d):' %
-                              (len(image_area.binary_prefixes[0]),
-                               len(image_area.binary_prefixes)))
+                              (width, height))
+        height, width = image_area.binary_image_block.shape
         dumper.print_line('Binary image lines (%d x %d):' %
-                          (len(image_area.binary_image_lines[0]),
-                           len(image_area.binary_image_lines)))
+                          (width, height))
 
 
 
@@ -120,12 +120,12 @@ def dump_tail(tail, dumper=None):
 
     dumper.print_line('Tail (%d):' % tail.to_byte_length())
     with indentation(dumper):
-        if tail.binary_prefixes_at_tail is None:
+        if tail.binary_prefix_block is None:
             dumper.print_line('Binary prefixes at tail: None')
         else:
+            height, width = tail.binary_prefix_block.shape
             dumper.print_line('Binary prefixes at tail (%d x %d):' % 
-                              (len(tail.binary_prefixes_at_tail[0]),
-                               len(tail.binary_prefixes_at_tail)))
+                              (width, height))
         if tail.tail_bytes is None:
             dumper.print_line('Tail bytes: None')
         else:
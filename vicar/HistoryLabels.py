@@ -4,7 +4,7 @@ from LabelItem import LabelItem
 from MigrationConstants import MIGRATION_TASK_NAME, MIGRATION_USER_NAME
 from StringUtils import escape_byte_string
 from Value import StringValue
-from VicarSyntax import VicarSyntax
+from VicarSyntax import VicarSyntax, full_validation
 
 if TYPE_CHECKING:
     from typing import List, Tuple
@@ -30,15 +30,19 @@ class HistoryLabels(VicarSyntax):
     An object representing the history labels of the VICAR file.  It
     is made up of a list of Tasks.
     """
+    __slots__ = ('tasks', '_byte_length')
 
     def __init__(self, tasks):
         # type: (List[Task]) -> None
         VicarSyntax.__init__(self)
         assert tasks is not None
-        for task in tasks:
-            assert task is not None
-            assert isinstance(task, Task)
+        if full_validation():
+            for task in tasks:
+                assert task is not None
+                assert isinstance(task, Task)
         self.tasks = tasks
+        self._byte_length = sum([task.to_byte_length()
+                                 for task in tasks])
 
     def __eq__(self, other):
         return other is not None and \
@@ -52,10 +56,7 @@ class HistoryLabels(VicarSyntax):
         return 'HistoryLabels([%s])' % tasks_str
 
     def to_byte_length(self):
-        # Summing is slightly more efficient than concatenating a bunch of
-        # byte-strings then taking the length.
-        return sum([task.to_byte_length()
-                    for task in self.tasks])
+        return self._byte_length
 
     def to_byte_string(self):
         return ''.join([task.to_byte_string()
@@ -82,19 +83,23 @@ class Task(VicarSyntax):
     Represents a step in the processing history of the image.  It
     consists of a list of LabelItems.
     """
+    __slots__ = ('history_label_items', '_byte_length')
 
     def __init__(self, history_label_items):
         # type: (List[LabelItem]) -> None
         VicarSyntax.__init__(self)
         assert history_label_items is not None
-        for label_item in history_label_items:
-            assert label_item is not None
-            assert isinstance(label_item, LabelItem)
+        if full_validation():
+            for label_item in history_label_items:
+                assert label_item is not None
+                assert isinstance(label_item, LabelItem)
         assert len(history_label_items) >= 3
         assert ['TASK', 'USER', 'DAT_TIM'] == [label_item.keyword for
                                                label_item in
                                                history_label_items[:3]]
         self.history_label_items = history_label_items
+        self._byte_length = sum([label_item.to_byte_length()
+                                 for label_item in history_label_items])
 
     def __eq__(self, other):
         return other is not None and \
@@ -108,10 +113,7 @@ class Task(VicarSyntax):
         return 'Task([%s])' % label_items_str
 
     def to_byte_length(self):
-        # Summing is slightly more efficient than concatenating a bunch of
-        # byte-strings then taking the length.
-        return sum([label_item.to_byte_length()
-                    for label_item in self.history_label_items])
+        return self._byte_length
 
     def to_byte_string(self):
         return ''.join([label_item.to_byte_string()
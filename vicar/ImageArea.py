@@ -1,10 +1,19 @@
+import numpy as np
+
 from typing import TYPE_CHECKING
 
-from Parsers import bytes, repeat
+from ByteBlocks import as_block, block_at, block_to_lines, \
+    blocks_are_equal, copy_bytes_into
+from Parsers import bytes_at, from_cursor_parser
 from VicarSyntax import VicarSyntax, maybe_bs
 
 if TYPE_CHECKING:
-    from typing import List, Optional, Tuple
+    from typing import IO, List, Optional, Tuple, Union
+
+    LINES = Union[List[str], np.ndarray]
+
+# The approximate number of bytes of image lines to write at a time.
+WRITE_CHUNK_SIZE = 1 << 20  # type: int
 
 
 def parse_image_area(header_len,
@@ -22,44 +31,51 @@ def parse_image_area(header_len,
     arguments to control the parse.
     """
 
+    def image_area_parser(src, pos):
+        # type: (str, int) -> Tuple[int, ImageArea]
+        return parse_image_area_at(header_len,
+                                   image_height,
+                                   prefix_width,
+                                   image_width,
+                                   src,
+                                   pos)
+
+    return from_cursor_parser(image_area_parser)(byte_str)
+
+
+def parse_image_area_at(header_len,
+                        image_height,
+                        prefix_width,
+                        image_width,
+                        src,
+                        pos):
+    # type: (int, int, int, int, str, int) -> Tuple[int, ImageArea]
+    """
+    Parse the bytes of src starting at offset pos into ImageArea.
+    Return a 2-tuple of the offset of any remaining bytes and the
+    ImageArea object.
+    """
+
     # Parse the header as necessary;
     if header_len > 0:
-        byte_str, header = bytes(header_len)(byte_str)
+        pos, header = bytes_at(header_len)(src, pos)
     else:
         header = None
 
+    # View the image area as one block of lines, each line a binary
+    # prefix (if any) followed by the image line.  Splitting the
+    # prefixes from the image lines is then just slicing.
+    recsize = prefix_width + image_width
+    prefixed_image = block_at(image_height, recsize, src, pos)
+    pos += image_height * recsize
+
     if prefix_width > 0:
-        # If there are binary prefixes, parse the prefixes and the image.
-
-        def parse_prefixed_image_line(byte_str):
-            # type: (str) -> Tuple[str, Tuple[str,str]]
-            """
-            Parse a prefixed image line as a tuple of the prefix and
-            image_line.
-            """
-            byte_str, prefix = bytes(prefix_width)(byte_str)
-            byte_str, image_line = bytes(image_width)(byte_str)
-            return byte_str, (prefix, image_line)
-
-        byte_str, prefixed_image_lines = \
-            repeat(image_height, parse_prefixed_image_line)(byte_str)
-
-        # prefixed_image_lines is a list of tuples of prefix and
-        # image_line.  But we want a list the prefixes and a list of
-        # the image_lines, so we have to zip the result.
-        prefixes, image_lines = zip(*prefixed_image_lines)
-
-        # Furthermore, zip() produces tuples; we want lists.
-        prefixes = list(prefixes)
-        image_lines = list(image_lines)
-        # All good now.
+        prefixes = prefixed_image[:, :prefix_width]
     else:
-        # Just parse the image.
         prefixes = None
-        byte_str, image_lines = repeat(image_height,
-                                       bytes(image_width))(byte_str)
+    image_lines = prefixed_image[:, prefix_width:]
 
-    return byte_str, ImageArea(header, prefixes, image_lines)
+    return pos, ImageArea(header, prefixes, image_lines)
 
 
 class ImageArea(VicarSyntax):
@@ -67,60 +83,77 @@ class ImageArea(VicarSyntax):
     Represents the image area of the VICAR file.  May or may not
     contain binary prefixes.
     """
+    __slots__ = ('binary_header', 'binary_prefix_block', 'binary_image_block')
 
     def __init__(self,
                  binary_header,
                  binary_prefixes,
                  binary_image_lines):
-        # type: (Optional[str], Optional[List[str]], List[str]) -> None
+        # type: (Optional[str], Optional[LINES], LINES) -> None
+        """
+        The binary prefixes and image lines may be given either as
+        lists of byte-strings, one per line, or as blocks (2-D uint8
+        numpy arrays, one row per line).  They are stored as blocks.
+        """
         VicarSyntax.__init__(self)
 
-        def assert_widths_are_consistent(str_list):
-            # type: (List[str]) -> None
-            """
-            Assert that the lengths of the strings in the list are all
-            the same.
-            """
-            if str_list:
-                for str_ in str_list:
-                    assert str_ is not None
-                    assert len(str_) == len(str_list[0])
-
-        def get_dimensions(str_list):
-            # type: (List[str]) -> Tuple[int, int]
-            """Returns the width and the height of the image."""
-            assert_widths_are_consistent(str_list)
-            if str_list:
-                height = len(str_list)
+        def get_dimensions(block):
+            # type: (Optional[np.ndarray]) -> Tuple[int, int]
+            """Returns the width and the height of the block."""
+            if block is not None and block.size:
+                height, width = block.shape
                 assert height > 0
-                width = len(str_list[0])
                 assert width > 0
                 return width, height
             else:
                 return 0, 0
 
-        assert binary_image_lines
-        image_width, image_height = get_dimensions(binary_image_lines)
-        prefixes_width, prefixes_height = get_dimensions(binary_prefixes)
+        assert binary_image_lines is not None
+        binary_image_block = as_block(binary_image_lines)
+        binary_prefix_block = as_block(binary_prefixes)
+        image_width, image_height = get_dimensions(binary_image_block)
+        prefixes_width, prefixes_height = get_dimensions(binary_prefix_block)
+        assert image_height > 0
 
         if binary_header is None:
             header_len = 0
         else:
             header_len = len(binary_header)
         assert header_len % (prefixes_width + image_width) == 0
-        if binary_prefixes is not None:
+        if binary_prefix_block is not None:
             assert prefixes_height == image_height
 
         self.binary_header = binary_header
-        self.binary_prefixes = binary_prefixes
-        self.binary_image_lines = binary_image_lines
+        self.binary_prefix_block = binary_prefix_block
+        self.binary_image_block = binary_image_block
+
+    @property
+    def binary_prefixes(self):
+        # type: () -> Optional[List[str]]
+        """
+        The binary prefixes as a list of byte-strings, or None.  This
+        copies the prefixes; prefer binary_prefix_block.
+        """
+        if self.binary_prefix_block is None:
+            return None
+        else:
+            return block_to_lines(self.binary_prefix_block)
+
+    @property
+    def binary_image_lines(self):
+        # type: () -> List[str]
+        """
+        The image lines as a list of byte-strings.  This copies the
+        image; prefer binary_image_block.
+        """
+        return block_to_lines(self.binary_image_block)
 
     def __eq__(self, other):
-        return [self.binary_header,
-                self.binary_prefixes,
-                self.binary_image_lines] == [other.binary_header,
-                                             other.binary_prefixes,
-                                             other.binary_image_lines]
+        return (self.binary_header == other.binary_header and
+                blocks_are_equal(self.binary_prefix_block,
+                                 other.binary_prefix_block) and
+                blocks_are_equal(self.binary_image_block,
+                                 other.binary_image_block))
 
     def __repr__(self):
         return 'ImageArea(%r, %r, %r)' % (self.binary_header,
@@ -129,15 +162,8 @@ class ImageArea(VicarSyntax):
                                           )
 
     def to_byte_length(self):
-        if self.binary_prefixes:
-            prefix_width = len(self.binary_prefixes[0])
-        else:
-            prefix_width = 0
-
-        image_width = len(self.binary_image_lines[0])
-        width = prefix_width + image_width
-
-        image_height = len(self.binary_image_lines)
+        width = self.implicit_recsize_value()
+        image_height = self.binary_image_block.shape[0]
         if self.binary_header is None:
             header_height = 0
         else:
@@ -147,31 +173,82 @@ class ImageArea(VicarSyntax):
         return width * height
 
     def to_byte_string(self):
-        if self.binary_prefixes:
-            prefixed_lines = [prefix + line
-                              for (prefix, line)
-                              in zip(self.binary_prefixes,
-                                     self.binary_image_lines)]
-        else:
-            prefixed_lines = self.binary_image_lines
+        buf = np.empty(self.to_byte_length(), dtype=np.uint8)
+        self.copy_into(buf, 0)
+        return buf.tobytes()
 
-        prefixed_image = ''.join(prefixed_lines)
-        header = maybe_bs(self.binary_header)
+    def copy_into(self, buf, offset):
+        # type: (np.ndarray, int) -> int
+        """
+        Copy the header, then the (prefixed) image lines into buf.
+        The prefixes and the image lines are each placed with one
+        vectorized copy into their columns of the output, so neither
+        (possibly strided) block is ever turned into a byte-string.
+        """
+        offset = copy_bytes_into(maybe_bs(self.binary_header), buf, offset)
+
+        recsize = self.implicit_recsize_value()
+        image_height = self.binary_image_block.shape[0]
+        end = offset + image_height * recsize
+        if end > offset:
+            self._copy_lines_into(0,
+                                  image_height,
+                                  buf[offset:end].reshape(image_height,
+                                                          recsize))
+        return end
+
+    def _copy_lines_into(self, start, end, lines):
+        # type: (int, int, np.ndarray) -> None
+        """
+        Copy the prefixed image lines from start to end into the
+        contiguous block lines.
+        """
+        prefix_width = self.implicit_nbb_value()
+        if self.binary_prefix_block is not None:
+            lines[:, :prefix_width] = self.binary_prefix_block[start:end]
+        lines[:, prefix_width:] = self.binary_image_block[start:end]
 
-        return header + prefixed_image
+    def write_to(self, fileobj):
+        # type: (IO[str]) -> None
+        """
+        Write the header, then the (prefixed) image lines a chunk of
+        lines at a time, so only one chunk is ever copied into a
+        byte-string.  The chunk buffer is allocated once and reused.
+        """
+        fileobj.write(maybe_bs(self.binary_header))
+
+        recsize = self.implicit_recsize_value()
+        image_height = self.binary_image_block.shape[0]
+        if image_height == 0 or recsize == 0:
+            return
+        lines_per_chunk = max(1, WRITE_CHUNK_SIZE // recsize)
+        if (self.binary_prefix_block is None and
+                self.binary_image_block.flags.c_contiguous):
+            # the image lines are already laid out as they are written
+            for start in xrange(0, image_height, lines_per_chunk):
+                end = start + lines_per_chunk
+                fileobj.write(self.binary_image_block[start:end].tobytes())
+            return
+        chunk = np.empty((min(lines_per_chunk, image_height), recsize),
+                         dtype=np.uint8)
+        for start in xrange(0, image_height, lines_per_chunk):
+            end = min(start + lines_per_chunk, image_height)
+            lines = chunk[:end - start]
+            self._copy_lines_into(start, end, lines)
+            fileobj.write(lines.tobytes())
 
     def has_binary_prefixes(self):
         # type: () -> bool
         """
         Return True if there are binary prefixes.
         """
-        return self.binary_prefixes is not None
+        return self.binary_prefix_block is not None
 
     def implicit_nbb_value(self):
         # type: () ->  int
         """Return what the NBB value should be for this ImageArea."""
-        if self.binary_prefixes:
-            return len(self.binary_prefixes[0])
+        if self.binary_prefix_block is not None:
+            return self.binary_prefix_block.shape[1]
         else:
             return 0
 
@@ -186,4 +263,4 @@ class ImageArea(VicarSyntax):
     def implicit_recsize_value(self):
         # type: () ->  int
         """Return what the RECSIZE value should be for this ImageArea."""
-        return self.implicit_nbb_value() + len(self.binary_image_lines[0])
+        return self.implicit_nbb_value() + self.binary_image_block.shape[1]
@@ -51,6 +51,8 @@ class LabelItem(VicarSyntax):
     back-migration need to maintain byte-for-byte equality, we make
     the extra effort to store all whitespace.
     """
+    __slots__ = ('initial_space', 'keyword', 'equals', 'value',
+                 'trailing_space', '_byte_length')
 
     def __init__(self, initial_space, keyword, equals, value,
                  trailing_space):
@@ -66,6 +68,11 @@ class LabelItem(VicarSyntax):
         self.equals = equals
         self.value = value
         self.trailing_space = trailing_space
+        self._byte_length = sum([len(maybe_bs(initial_space)),
+                                 len(keyword),
+                                 len(equals),
+                                 value.to_byte_length(),
+                                 len(maybe_bs(trailing_space))])
 
     def __repr__(self):
         return 'LabelItem(%r, %r, %r, %s, %r)' % \
@@ -74,8 +81,12 @@ class LabelItem(VicarSyntax):
 
     def __eq__(self, other):
         return isinstance(other, LabelItem) and \
+               self._byte_length == other._byte_length and \
                self.to_byte_string() == other.to_byte_string()
 
+    def to_byte_length(self):
+        return self._byte_length
+
     def to_byte_string(self):
         return ''.join([maybe_bs(self.initial_space),
                         self.keyword,
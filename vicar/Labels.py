@@ -5,7 +5,7 @@ Syntax for VICAR files.
 from typing import TYPE_CHECKING
 
 from LabelItem import LabelItem
-from Parsers import bytes
+from Parsers import bytes, bytes_at, from_cursor_parser
 from Value import *
 from VicarSyntax import maybe_bs, round_to_multiple_of
 
@@ -26,14 +26,24 @@ def parse_labels(byte_str):
     Parse the given bytes into Labels.  Return a 2-tuple of any
     remaining bytes and the Labels object.
     """
+    return from_cursor_parser(parse_labels_at)(byte_str)
+
+
+def parse_labels_at(src, pos):
+    # type: (str, int) -> Tuple[int, Labels]
+    """
+    Parse the bytes of src starting at offset pos into Labels.  Return
+    a 2-tuple of the offset of any remaining bytes and the Labels
+    object.
+    """
 
     # First, find the LBLSIZE without consuming data.
     import PlyParser  # to avoid circular import
-    lblsize = PlyParser.get_lblsize(byte_str)
+    lblsize = PlyParser.get_lblsize(src, pos)
 
-    # Now "consume" the first LBLSIZE bytes, returning the remaining
-    # bytes and it.
-    byte_str, src = bytes(lblsize)(byte_str)
+    # Now "consume" the first LBLSIZE bytes, returning the offset of
+    # the remaining bytes and it.
+    pos, label_bytes = bytes_at(lblsize)(src, pos)
 
     def split_at_nul(byte_str):
         # type: (str) -> Tuple[str, str]
@@ -51,19 +61,20 @@ def parse_labels(byte_str):
 
     # Split the LBLSIZE bytes into the padding bytes and the
     # significant bytes.
-    padding, label_src = split_at_nul(src)
+    padding, label_src = split_at_nul(label_bytes)
 
     # Once we have the significant bytes, we can parse them with the
     # context-independent PlyParser.
     system_labels, property_labels, history_labels = \
         PlyParser.ply_parse_labels(label_src)
 
-    # Return unconsumed bytes and the resulting Labels.
+    # Return the offset of the unconsumed bytes and the resulting
+    # Labels.
     labels = Labels(system_labels,
                     property_labels,
                     history_labels,
                     padding)
-    return byte_str, labels
+    return pos, labels
 
 
 class Labels(VicarSyntax):
@@ -71,6 +82,8 @@ class Labels(VicarSyntax):
     A series of keyword-value pairs divided (like Gaul) into three
     parts.
     """
+    __slots__ = ('system_labels', 'property_labels', 'history_labels',
+                 'padding', '_byte_length')
 
     def __init__(self, system_labels, property_labels, history_labels,
                  padding):
@@ -94,6 +107,7 @@ class Labels(VicarSyntax):
         self.property_labels = property_labels
         self.history_labels = history_labels
         self.padding = padding
+        self._byte_length = size_of_labels
 
     def __eq__(self, other):
         return [self.system_labels,
@@ -113,10 +127,7 @@ class Labels(VicarSyntax):
         return 'Labels(%s)' % items_str
 
     def to_byte_length(self):
-        return sum([self.system_labels.to_byte_length(),
-                    self.property_labels.to_byte_length(),
-                    self.history_labels.to_byte_length(),
-                    len(maybe_bs(self.padding))])
+        return self._byte_length
 
     def to_byte_string(self):
         return ''.join([self.system_labels.to_byte_string(),
@@ -1,11 +1,19 @@
 import datetime
+import hashlib
+import os
 import os.path
 import sys
+import tempfile
+
+from typing import TYPE_CHECKING
 
 from CassiniBug import fix_cassini_bug
 from Migration import migrate_vicar_file
-from Parsers import parse_all
-from VicarFile import parse_vicar_file
+from Parsers import parse_all_at
+from VicarFile import parse_vicar_file_at
+
+if TYPE_CHECKING:
+    from typing import Optional
 
 
 def make_output_filepath(in_filepath):
@@ -18,7 +26,42 @@ def make_output_filepath(in_filepath):
     return os.path.join(dirname, root + "_pds4" + ext.lower())
 
 
-def migrate_file(input_filepath, output_filepath=None, original_filepath=None):
+def make_dat_tim():
+    # type: () -> str
+    """Create a DAT_TIM string for the current time."""
+    now = datetime.datetime.utcnow()
+    return now.strftime('%a %b %d %H:%M:%S %Y')
+
+
+class HashingWriter(object):
+    """
+    Wraps a file object opened for writing, keeping an MD5 checksum of
+    all the bytes written through it.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.md5 = hashlib.md5()
+
+    def write(self, byte_str):
+        # type: (str) -> None
+        self.md5.update(byte_str)
+        self.fileobj.write(byte_str)
+
+    def hexdigest(self):
+        # type: () -> str
+        return self.md5.hexdigest()
+
+
+def migrate_file(input_filepath, output_filepath=None, original_filepath=None,
+                 dat_tim=None):
+    # type: (str, Optional[str], Optional[str], Optional[str]) -> str
+    """
+    Migrate the VICAR file at input_filepath and write the result to
+    output_filepath.  The output is written to a temporary file in the
+    same directory, then renamed, so output_filepath either does not
+    exist or is complete.  Return the MD5 checksum of the output.
+    """
     if not output_filepath:
         output_filepath = make_output_filepath(input_filepath)
 
@@ -26,28 +69,46 @@ def migrate_file(input_filepath, output_filepath=None, original_filepath=None):
         original_filepath = input_filepath
 
     # Read the file.
-    with open(input_filepath, 'r') as f:
+    with open(input_filepath, 'rb') as f:
         pds3_bytes = f.read()
 
     # Parse it.
-    pds3_vicar_file = parse_all(parse_vicar_file, pds3_bytes)
+    pds3_vicar_file = parse_all_at(parse_vicar_file_at, pds3_bytes)
 
     # Fix the Cassini bug
     fixed_pds3_vicar_file = fix_cassini_bug(input_filepath, pds3_vicar_file)
 
     # Create the DAT_TIM string.
-    now = datetime.datetime.utcnow()
-    dat_tim = now.strftime('%a %b %d %H:%M:%S %Y')
+    if not dat_tim:
+        dat_tim = make_dat_tim()
 
     # Migrate it.
     pds4_vicar_file = migrate_vicar_file(original_filepath,
                                          dat_tim,
                                          fixed_pds3_vicar_file)
 
-    # Write it out
-    pds4_bytes = pds4_vicar_file.to_byte_string()
-    with open(output_filepath, 'w') as f:
-        f.write(pds4_bytes)
+    # Write it out.  The migrated file shares its image with the
+    # input bytes, and is written piece by piece, so we never hold a
+    # second full-size copy of the file in memory.
+    output_dirname, output_basename = os.path.split(output_filepath)
+    fd, tmp_filepath = tempfile.mkstemp(prefix='.' + output_basename,
+                                        suffix='.tmp',
+                                        dir=output_dirname or '.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            writer = HashingWriter(f)
+            pds4_vicar_file.write_to(writer)
+        # mkstemp() makes the file private; give it the usual
+        # permissions.
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_filepath, 0o666 & ~umask)
+        os.rename(tmp_filepath, output_filepath)
+    except BaseException:
+        os.remove(tmp_filepath)
+        raise
+
+    return writer.hexdigest()
 
 
 if __name__ == '__main__':
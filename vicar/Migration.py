@@ -48,7 +48,7 @@ def migrate_labels(dat_tim, migration_info, pds3_labels):
 def migrate_image_area(new_recsize, pds3_image_area):
     # type: (int, ImageArea) -> ImageArea
     """
-    Drop the binary labels.
+    Drop the binary labels.  The image block is shared, not copied.
     """
     if pds3_image_area.binary_header is None:
         pds4_binary_header = None
@@ -60,7 +60,7 @@ def migrate_image_area(new_recsize, pds3_image_area):
         pds4_binary_header = pds3_image_area.binary_header + padding
     return ImageArea(pds4_binary_header,
                      None,
-                     pds3_image_area.binary_image_lines)
+                     pds3_image_area.binary_image_block)
 
 
 def migrate_eol_labels(new_recsize, pds3_eol_labels):
@@ -86,7 +86,7 @@ def migrate_tail(new_recsize, pds3_image_area, pds3_tail):
     PDS4 tail, and pad appropriately.
     """
     return Tail.create_with_padding(new_recsize,
-                                    pds3_image_area.binary_prefixes,
+                                    pds3_image_area.binary_prefix_block,
                                     pds3_tail.tail_bytes)
 
 
@@ -172,10 +172,10 @@ if __name__ == '__main__':
     with open(in_filepath, 'r') as f:
         pds3_bytes = f.read()
 
-    from Parsers import parse_all
-    from VicarFile import parse_vicar_file
+    from Parsers import parse_all_at
+    from VicarFile import parse_vicar_file_at
 
-    pds3_vicar_file = parse_all(parse_vicar_file, pds3_bytes)
+    pds3_vicar_file = parse_all_at(parse_vicar_file_at, pds3_bytes)
 
     import datetime
 
@@ -193,7 +193,7 @@ if __name__ == '__main__':
         f.write(pds4_bytes)
 
     # Sanity check: can I parse a PDS4 file?  Yep.
-    pds4_rt_vicar_file = parse_all(parse_vicar_file, pds4_bytes)
+    pds4_rt_vicar_file = parse_all_at(parse_vicar_file_at, pds4_bytes)
     assert pds4_bytes == pds4_rt_vicar_file.to_byte_string()
 
     # Now try back-migrating.
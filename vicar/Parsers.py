@@ -15,35 +15,122 @@ return byte_str, combine_parts(part_1, part_2, part_3)
 By having all parsing functions follow this format, we can compose
 large parsers hierarchically.
 
+Returning the unconsumed string means copying it, so a parser that
+runs once per image line copies the rest of the file once per line.
+To keep parsing linear in the size of the file, the real work is done
+by cursor parsers, which take the whole source and an offset into it,
+and return a 2-tuple of the offset after the consumed input and the
+result.  They compose the same way:
+
+pos, part_1 = parse_part_1_at(src, pos)
+pos, part_2 = parse_part_2_at(src, pos)
+pos, part_3 = parse_part_3_at(src, pos)
+return pos, combine_parts(part_1, part_2, part_3)
+
+from_cursor_parser() turns a cursor parser into a parser of the first
+kind, so both styles remain available.
+
 This file contains building blocks to build larger parsers.
 """
 
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from typing import Any, Callable, Tuple
+    from typing import Any, Callable, List, Tuple
 
     # A parser is a function that takes a string and returns the
     # unconsumed input and the result of that parser.
     Parser = Callable[[str], Tuple[str, Any]]
 
+    # A cursor parser is a function that takes a string and an offset
+    # into it and returns the offset of the unconsumed input and the
+    # result of that parser.
+    CursorParser = Callable[[str, int], Tuple[int, Any]]
 
-def bytes(n):
-    # type: (int) -> Parser
+
+def from_cursor_parser(p):
+    # type: (CursorParser) -> Parser
     """
-    A parser that consumes a fixed number of bytes.
+    Wrap a cursor parser as a parser that takes and returns
+    byte-strings.  Only the unconsumed input at the end of the parse
+    is copied.
     """
 
-    def bytes_parser(byte_str):
+    def wrapped_parser(byte_str):
         # type: (str) -> Tuple[str, Any]
-        l = len(byte_str)
-        if l < n:
+        pos, res = p(byte_str, 0)
+        if pos == 0:
+            return byte_str, res
+        else:
+            return byte_str[pos:], res
+
+    return wrapped_parser
+
+
+def bytes_at(n):
+    # type: (int) -> CursorParser
+    """
+    A cursor parser that consumes a fixed number of bytes.
+    """
+
+    def bytes_parser(src, pos):
+        # type: (str, int) -> Tuple[int, Any]
+        end = pos + n
+        if len(src) < end:
             raise Exception('bytes(): not enough bytes available')
-        return byte_str[n:], byte_str[:n]
+        return end, src[pos:end]
 
     return bytes_parser
 
 
+def repeat_at(n, p):
+    # type: (int, CursorParser) -> CursorParser
+    """
+    A cursor parser that runs the given cursor parser n times and
+    returns a list of the results.
+    """
+    assert n >= 0
+
+    def repeating_parser(src, pos):
+        # type: (str, int) -> Tuple[int, List[Any]]
+        res = list()
+        for i in xrange(n):
+            pos, item = p(src, pos)
+            res.append(item)
+        return pos, res
+
+    return repeating_parser
+
+
+def rest_of_input_at(src, pos):
+    # type: (str, int) -> Tuple[int, Any]
+    """
+    A cursor parser that consumes and returns the rest of the input.
+    """
+    return len(src), src[pos:]
+
+
+def parse_all_at(p, src, pos=0):
+    # type: (CursorParser, str, int) -> Any
+    """
+    Run the cursor parser from the given offset; raise an exception if
+    it does not consume the entire input.
+    """
+    pos, res = p(src, pos)
+    if pos != len(src):
+        raise Exception('parse_all() left %d bytes unconsumed' %
+                        (len(src) - pos))
+    return res
+
+
+def bytes(n):
+    # type: (int) -> Parser
+    """
+    A parser that consumes a fixed number of bytes.
+    """
+    return from_cursor_parser(bytes_at(n))
+
+
 def repeat(n, p):
     # type: (int, Parser) -> Parser
     """
@@ -11,6 +11,7 @@ from a grammar description.  That grammar description is found below.
 """
 
 from ply import lex, yacc
+from typing import TYPE_CHECKING
 
 from HistoryLabels import HistoryLabels, Task
 from LabelItem import LabelItem
@@ -18,6 +19,9 @@ from PropertyLabels import Property, PropertyLabels
 from SystemLabels import SystemLabels
 from Value import *
 
+if TYPE_CHECKING:
+    from typing import Dict, Optional
+
 reserved = {
     'DAT_TIM': 'DAT_TIM_KW',
     'LBLSIZE': 'LBLSIZE_KW',
@@ -346,14 +350,15 @@ def p_error(p):
 
 ################################
 
-def get_lblsize(src):
-    # type: (str) -> int
+def get_lblsize(src, pos=0):
+    # type: (str, int) -> int
     """
-    Not exactly a parse, just a pick through the first few tokens,
-    looking for the LBLSIZE.
+    Not exactly a parse, just a pick through the first few tokens
+    starting at offset pos, looking for the LBLSIZE.
     """
-    lexer = lex.lex()
+    lexer = get_lexer()
     lexer.input(src)
+    lexer.lexpos = pos
     tok = lexer.token()
     if tok.type == 'WHITESPACE':
         tok = lexer.token()
@@ -375,14 +380,51 @@ def dump_tokens(lexer, data):
         print(tok)
 
 
+# Building the lexer and the parsers is expensive compared to parsing
+# the labels of a single file, so we build each at most once per
+# process and reuse them.  The LALR tables for each start symbol are
+# also written next to this module as parsetab_<start>.py; later
+# processes read them instead of analysing the grammar again.  PLY
+# checks the tables against the grammar's signature and rebuilds them
+# if the grammar has changed.
+
+_LEXER = None  # type: Optional[lex.Lexer]
+
+_PARSERS = {}  # type: Dict[str, yacc.LRParser]
+
+
+def get_lexer():
+    # type: () -> lex.Lexer
+    """Return the lexer, building it on first use."""
+    global _LEXER
+    if _LEXER is None:
+        _LEXER = lex.lex()
+    return _LEXER
+
+
+def get_parser(start):
+    # type: (str) -> yacc.LRParser
+    """
+    Return the parser for the given start symbol, building it (or
+    reading its tables) on first use.
+    """
+    try:
+        return _PARSERS[start]
+    except KeyError:
+        parser = yacc.yacc(start=start,
+                           tabmodule='parsetab_' + start,
+                           debug=False,
+                           errorlog=yacc.NullLogger())
+        _PARSERS[start] = parser
+        return parser
+
+
 def ply_parse(start, data):
     """
-    Create a parser for the given start symbol and parse the given
-    byte-string.
+    Parse the given byte-string with the parser for the given start
+    symbol.
     """
-    lexer = lex.lex()
-    parser = yacc.yacc(start=start, errorlog=yacc.NullLogger())
-    return parser.parse(data)
+    return get_parser(start).parse(data, lexer=get_lexer())
 
 
 ################################
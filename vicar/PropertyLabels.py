@@ -1,7 +1,7 @@
 from typing import TYPE_CHECKING
 
 from LabelItem import LabelItem
-from VicarSyntax import VicarSyntax
+from VicarSyntax import VicarSyntax, full_validation
 
 if TYPE_CHECKING:
     from typing import Tuple
@@ -24,15 +24,19 @@ def parse_property_labels(byte_str):
 
 class PropertyLabels(VicarSyntax):
     """Represents the list of properties of an image."""
+    __slots__ = ('properties', '_byte_length')
 
     def __init__(self, properties):
         # type: (List[Property]) -> None
         VicarSyntax.__init__(self)
         assert properties is not None
-        for property in properties:
-            assert property is not None
-            assert isinstance(property, Property)
+        if full_validation():
+            for property in properties:
+                assert property is not None
+                assert isinstance(property, Property)
         self.properties = properties
+        self._byte_length = sum([property.to_byte_length()
+                                 for property in properties])
 
     def __eq__(self, other):
         return other is not None and \
@@ -45,10 +49,7 @@ class PropertyLabels(VicarSyntax):
         return 'PropertyLabels([%s])' % properties_str
 
     def to_byte_length(self):
-        # Summing is slightly more efficient than concatenating a bunch of
-        # byte-strings then taking the length.
-        return sum([property.to_byte_length()
-                    for property in self.properties])
+        return self._byte_length
 
     def to_byte_string(self):
         return ''.join([property.to_byte_string()
@@ -72,16 +73,20 @@ def parse_property(byte_str):
 
 class Property(VicarSyntax):
     """Represents a property of the image in the image domain."""
+    __slots__ = ('property_label_items', '_byte_length')
 
     def __init__(self, property_label_items):
         # type: (List[LabelItem]) -> None
         VicarSyntax.__init__(self)
         assert property_label_items is not None
         assert len(property_label_items) > 0
-        for label_item in property_label_items:
-            assert label_item is not None
-            assert isinstance(label_item, LabelItem)
+        if full_validation():
+            for label_item in property_label_items:
+                assert label_item is not None
+                assert isinstance(label_item, LabelItem)
         self.property_label_items = property_label_items
+        self._byte_length = sum([label_item.to_byte_length()
+                                 for label_item in property_label_items])
 
     def __eq__(self, other):
         return other is not None and \
@@ -95,10 +100,7 @@ class Property(VicarSyntax):
         return 'Property([%s])' % label_items_str
 
     def to_byte_length(self):
-        # Summing is slightly more efficient than concatenating a bunch of
-        # byte-strings then taking the length.
-        return sum([label_item.to_byte_length()
-                    for label_item in self.property_label_items])
+        return self._byte_length
 
     def to_byte_string(self):
         return ''.join([label_item.to_byte_string()
@@ -2,7 +2,7 @@ from typing import TYPE_CHECKING
 
 from LabelItem import LabelItem
 from Value import IntegerValue
-from VicarSyntax import VicarSyntax
+from VicarSyntax import VicarSyntax, full_validation
 
 if TYPE_CHECKING:
     from typing import List, Tuple
@@ -39,19 +39,23 @@ class SystemLabels(VicarSyntax):
     An object representing the label items of the VICAR, excluding
     properties and tasks.
     """
+    __slots__ = ('label_items', '_byte_length')
 
     def __init__(self, label_items):
         # type: (List[LabelItem]) -> None
         VicarSyntax.__init__(self)
         assert label_items is not None
-        for label_item in label_items:
-            assert label_item is not None
-            assert isinstance(label_item, LabelItem)
+        if full_validation():
+            for label_item in label_items:
+                assert label_item is not None
+                assert isinstance(label_item, LabelItem)
 
         assert len(_lookup_label_items('LBLSIZE', label_items)) == 1, \
             'must have LBLSIZE'
 
         self.label_items = label_items
+        self._byte_length = sum([label_item.to_byte_length()
+                                 for label_item in label_items])
 
     def __repr__(self):
         label_items_str = ', '.join([repr(label_item)
@@ -64,10 +68,7 @@ class SystemLabels(VicarSyntax):
                self.label_items == other.label_items
 
     def to_byte_length(self):
-        # Summing is slightly more efficient than concatenating a bunch of
-        # byte-strings.
-        return sum([label_item.to_byte_length()
-                    for label_item in self.label_items])
+        return self._byte_length
 
     def to_byte_string(self):
         return ''.join([label_item.to_byte_string()
@@ -1,19 +1,35 @@
+import numpy as np
+
 from typing import TYPE_CHECKING
 
-from Parsers import bytes, repeat, rest_of_input
+from ByteBlocks import as_block, block_at, block_to_lines, \
+    blocks_are_equal, copy_block_into, copy_bytes_into
+from Parsers import from_cursor_parser, rest_of_input_at
 from VicarSyntax import VicarSyntax, maybe_bs, round_to_multiple_of
 
 if TYPE_CHECKING:
-    from typing import List, Optional, Tuple
+    from typing import IO, List, Optional, Tuple, Union
+    import numpy as np
+
+    LINES = Union[List[str], np.ndarray]
 
 
 def parse_pds3_tail(byte_str):
     # type: (str) -> Tuple[str, Tail]
     """Parse a PDS3 tail.  All the bytes go into the tail of the tail."""
-    byte_str, res = rest_of_input(byte_str)
+    return from_cursor_parser(parse_pds3_tail_at)(byte_str)
+
+
+def parse_pds3_tail_at(src, pos):
+    # type: (str, int) -> Tuple[int, Tail]
+    """
+    Parse a PDS3 tail from the bytes of src starting at offset pos.
+    All the bytes go into the tail of the tail.
+    """
+    pos, res = rest_of_input_at(src, pos)
     if len(res) == 0:
         res = None
-    return (byte_str, Tail(None, res))
+    return (pos, Tail(None, res))
 
 
 def parse_pds4_tail(img_height, prefix_width, byte_str):
@@ -24,14 +40,29 @@ def parse_pds4_tail(img_height, prefix_width, byte_str):
     goes where from the integer arguments: the dimensions of the
     binary prefixes.
     """
+
+    def pds4_tail_parser(src, pos):
+        # type: (str, int) -> Tuple[int, Tail]
+        return parse_pds4_tail_at(img_height, prefix_width, src, pos)
+
+    return from_cursor_parser(pds4_tail_parser)(byte_str)
+
+
+def parse_pds4_tail_at(img_height, prefix_width, src, pos):
+    # type: (int, int, str, int) -> Tuple[int, Tail]
+    """
+    Parse a PDS4 tail from the bytes of src starting at offset pos.
+    See parse_pds4_tail().
+    """
     if prefix_width > 0:
-        byte_str, prefs = repeat(img_height, bytes(prefix_width))(byte_str)
+        prefs = block_at(img_height, prefix_width, src, pos)
+        pos += img_height * prefix_width
     else:
         prefs = None
-    byte_str, rest = rest_of_input(byte_str)
+    pos, rest = rest_of_input_at(src, pos)
     if len(rest) == 0:
         rest = None
-    return byte_str, Tail(prefs, rest)
+    return pos, Tail(prefs, rest)
 
 
 class Tail(VicarSyntax):
@@ -39,47 +70,90 @@ class Tail(VicarSyntax):
     Represents the bytes in a VICAR file following the image area or
     EOL labels, if they exist.
     """
+    __slots__ = ('binary_prefix_block', 'tail_bytes')
 
     def __init__(self,
                  binary_prefixes_at_tail,
                  tail_bytes):
-        # type: (Optional[List[str]], Optional[str]) -> None
+        # type: (Optional[LINES], Optional[str]) -> None
+        """
+        The binary prefixes may be given either as a list of
+        byte-strings, one per line, or as a block (a 2-D uint8 numpy
+        array, one row per line).  They are stored as a block.
+        """
         VicarSyntax.__init__(self)
-        if binary_prefixes_at_tail:
-            for binary_prefix in binary_prefixes_at_tail:
-                assert binary_prefix is not None
-        self.binary_prefixes_at_tail = binary_prefixes_at_tail
+        self.binary_prefix_block = as_block(binary_prefixes_at_tail)
         self.tail_bytes = tail_bytes
 
+    @property
+    def binary_prefixes_at_tail(self):
+        # type: () -> Optional[List[str]]
+        """
+        The binary prefixes as a list of byte-strings, or None.  This
+        copies the prefixes; prefer binary_prefix_block.
+        """
+        if self.binary_prefix_block is None:
+            return None
+        else:
+            return block_to_lines(self.binary_prefix_block)
+
     def __eq__(self, other):
-        return [self.binary_prefixes_at_tail,
-                self.tail_bytes] == [other.binary_prefixes_at_tail,
-                                     other.tail_bytes]
+        return (blocks_are_equal(self.binary_prefix_block,
+                                 other.binary_prefix_block) and
+                self.tail_bytes == other.tail_bytes)
 
     def __repr__(self):
         return 'Tail(%r, %r)' % (self.binary_prefixes_at_tail,
                                      self.tail_bytes)
 
-    def to_byte_string(self):
-        if self.binary_prefixes_at_tail:
-            binary_prefixes = ''.join(self.binary_prefixes_at_tail)
+    def to_byte_length(self):
+        if self.binary_prefix_block is None:
+            binary_prefixes_length = 0
         else:
-            binary_prefixes = ''
-        return ''.join([binary_prefixes,
-                        maybe_bs(self.tail_bytes)])
+            binary_prefixes_length = self.binary_prefix_block.size
+        return binary_prefixes_length + len(maybe_bs(self.tail_bytes))
+
+    def to_byte_string(self):
+        buf = np.empty(self.to_byte_length(), dtype=np.uint8)
+        self.copy_into(buf, 0)
+        return buf.tobytes()
+
+    def copy_into(self, buf, offset):
+        # type: (np.ndarray, int) -> int
+        """
+        Copy the binary prefixes into buf with one vectorized copy,
+        then the tail bytes.
+        """
+        if self.binary_prefix_block is not None:
+            offset = copy_block_into(self.binary_prefix_block, buf, offset)
+        return copy_bytes_into(maybe_bs(self.tail_bytes), buf, offset)
+
+    def write_to(self, fileobj):
+        # type: (IO[str]) -> None
+        """
+        Write the binary prefixes and the tail bytes separately,
+        without joining them into one byte-string.
+        """
+        if self.binary_prefix_block is not None:
+            # The prefix block is usually a strided view into the
+            # original image area; copying it into a contiguous block
+            # first is much faster than tobytes() on the view.
+            fileobj.write(
+                np.ascontiguousarray(self.binary_prefix_block).tobytes())
+        fileobj.write(maybe_bs(self.tail_bytes))
 
     def has_binary_prefixes(self):
         # type: () -> bool
         """
         Return True if binary prefixes are stored in the tail.
         """
-        return self.binary_prefixes_at_tail is not None
+        return self.binary_prefix_block is not None
 
     @staticmethod
     def create_with_padding(recsize,
                             binary_prefixes_at_tail,
                             tail_bytes):
-        # type: (int, List[str], str) -> Tail
+        # type: (int, Optional[LINES], str) -> Tail
         """
         Create a tail from the parts, adding padding to make it a
         multiple of RECSIZE.
@@ -7,6 +7,7 @@ from VicarSyntax import VicarSyntax
 class Value(VicarSyntax):
     """The value in a key-value pair in a label item."""
     __metaclass__ = ABCMeta
+    __slots__ = ('value_byte_string',)
 
     def __init__(self, byte_str):
         # type: (str) -> None
@@ -15,6 +16,9 @@ class Value(VicarSyntax):
         assert isinstance(byte_str, str)
         self.value_byte_string = byte_str
 
+    def to_byte_length(self):
+        return len(self.value_byte_string)
+
     def to_byte_string(self):
         return self.value_byte_string
 
@@ -30,6 +34,7 @@ class Value(VicarSyntax):
 
 class IntegerValue(Value):
     """An integer value."""
+    __slots__ = ()
 
     def __init__(self, byte_str):
         # type: (str) -> None
@@ -49,6 +54,7 @@ class IntegerValue(Value):
 
 class RealValue(Value):
     """A real floating-point value."""
+    __slots__ = ()
 
     def __init__(self, byte_str):
         # type: (str) -> None
@@ -57,6 +63,7 @@ class RealValue(Value):
 
 class StringValue(Value):
     """A string value."""
+    __slots__ = ()
 
     def __init__(self, byte_str):
         # type: (str) -> None
@@ -76,6 +83,7 @@ class StringValue(Value):
 
 class IntegersValue(Value):
     """An array of integer values."""
+    __slots__ = ()
 
     def __init__(self, byte_str):
         # type: (str) -> None
@@ -84,6 +92,7 @@ class IntegersValue(Value):
 
 class RealsValue(Value):
     """An array of real, floating-point values."""
+    __slots__ = ()
 
     def __init__(self, byte_str):
         # type: (str) -> None
@@ -92,6 +101,7 @@ class RealsValue(Value):
 
 class StringsValue(Value):
     """An array of string values."""
+    __slots__ = ()
 
     def __init__(self, byte_str):
         # type: (str) -> None
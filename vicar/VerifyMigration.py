@@ -0,0 +1,194 @@
+"""
+Verify that migrated VICAR files back-migrate to their originals,
+byte for byte.
+
+The migrated file is parsed and back-migrated, and the back-migrated
+file is streamed (see VicarSyntax.write_to()) against the original
+file, read a chunk at a time, stopping at the first byte that
+differs.  The back-migrated file is never built as a byte-string, and
+the original is never read into memory whole.
+
+Migration fixes the Cassini bug in the labels first (see
+CassiniBug.py), so an original with the bug is compared after the
+same fix; only these originals are parsed whole.
+
+Usage: python VerifyMigration.py [--jobs N] MANIFEST ...
+
+verifies every file recorded in the given BatchMigrate.py manifests.
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+import traceback
+from StringIO import StringIO
+
+from typing import TYPE_CHECKING
+
+from BackMigration import back_migrate_vicar_file
+from CassiniBug import fix_cassini_bug, has_cassini_bug
+from Parsers import parse_all_at
+from VicarFile import parse_vicar_file_at
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, IO, List, Optional, Tuple
+
+    from VicarFile import VicarFile
+
+    RECORD = Dict[str, Any]
+
+
+class _Mismatch(Exception):
+    """Raised to stop writing at the first mismatching byte."""
+    pass
+
+
+class ComparingWriter(object):
+    """
+    A write-only file object that, instead of writing, compares what
+    it is given against the bytes of another file.  mismatch_offset
+    is the offset of the first byte that differed, or None.
+    """
+
+    def __init__(self, fileobj):
+        # type: (IO[str]) -> None
+        self.fileobj = fileobj
+        self.offset = 0
+        self.mismatch_offset = None  # type: Optional[int]
+
+    def write(self, byte_str):
+        # type: (str) -> None
+        expected = self.fileobj.read(len(byte_str))
+        if expected != byte_str:
+            for i, (c, d) in enumerate(zip(expected, byte_str)):
+                if c != d:
+                    break
+            else:
+                # One is a prefix of the other.
+                i = min(len(expected), len(byte_str))
+            self.mismatch_offset = self.offset + i
+            raise _Mismatch()
+        self.offset += len(byte_str)
+
+    def finish(self):
+        # type: () -> Optional[int]
+        """
+        Check that the other file has no more bytes, and return
+        mismatch_offset.
+        """
+        if self.mismatch_offset is None and self.fileobj.read(1):
+            self.mismatch_offset = self.offset
+        return self.mismatch_offset
+
+
+def verify_file(pds4_filepath, pds3_filepath):
+    # type: (str, str) -> Optional[int]
+    """
+    Back-migrate the migrated VICAR file at pds4_filepath and compare
+    it to the original at pds3_filepath, with the Cassini bug fixed as
+    migration fixes it.  Return None if they are identical, else the
+    offset of the first byte that differs.
+    """
+    with open(pds4_filepath, 'rb') as f:
+        pds4_bytes = f.read()
+    pds4_vicar_file = parse_all_at(parse_vicar_file_at, pds4_bytes)
+    _original_filepath, pds3_vicar_file = back_migrate_vicar_file(
+        pds4_vicar_file)
+
+    if has_cassini_bug(pds3_filepath):
+        with open(pds3_filepath, 'rb') as f:
+            original_bytes = f.read()
+        fixed_vicar_file = fix_cassini_bug(
+            pds3_filepath,
+            parse_all_at(parse_vicar_file_at, original_bytes))
+        fixed_file = StringIO()
+        fixed_vicar_file.write_to(fixed_file)
+        fixed_file.seek(0)
+        return _compare(pds3_vicar_file, fixed_file)
+
+    with open(pds3_filepath, 'rb') as f:
+        return _compare(pds3_vicar_file, f)
+
+
+def _compare(vicar_file, fileobj):
+    # type: (VicarFile, IO[str]) -> Optional[int]
+    """
+    Compare the bytes of the VicarFile to those read from fileobj.
+    Return None if they are identical, else the offset of the first
+    byte that differs.
+    """
+    writer = ComparingWriter(fileobj)
+    try:
+        vicar_file.write_to(writer)
+    except _Mismatch:
+        pass
+    return writer.finish()
+
+
+def _verify_task(args):
+    # type: (Tuple[str, str]) -> RECORD
+    """
+    Verify one file in a worker process.  Return a record of the
+    result; any exception is caught and reported in the record.
+    """
+    pds4_filepath, pds3_filepath = args
+    record = {'input': pds3_filepath,
+              'output': pds4_filepath}  # type: RECORD
+    start = time.time()
+    try:
+        record['mismatch_offset'] = verify_file(pds4_filepath, pds3_filepath)
+    except Exception:
+        record['error'] = traceback.format_exc()
+    record['seconds'] = time.time() - start
+    return record
+
+
+def verify_files(pairs, jobs=None):
+    # type: (List[Tuple[str, str]], Optional[int]) -> List[RECORD]
+    """
+    Verify the pairs of migrated and original filepaths across a pool
+    of jobs worker processes (by default, one per CPU).  Print each
+    failure as it happens and return the records of the failures.
+    """
+    failures = []  # type: List[RECORD]
+    pool = multiprocessing.Pool(jobs)
+    try:
+        for record in pool.imap_unordered(_verify_task, pairs):
+            if 'error' in record:
+                failures.append(record)
+                print '**** FAILED to verify %s:\n%s' % (record['output'],
+                                                         record['error'])
+            elif record['mismatch_offset'] is not None:
+                failures.append(record)
+                print '**** MISMATCH: %s differs from %s at byte %d.' % \
+                    (record['output'], record['input'],
+                     record['mismatch_offset'])
+    finally:
+        pool.terminate()
+        pool.join()
+
+    print '**** Verified %d files; %d failed.' % (len(pairs), len(failures))
+    return failures
+
+
+if __name__ == '__main__':
+    from BatchMigrate import load_manifest
+
+    parser = argparse.ArgumentParser(
+        description='Verify that migrated VICAR files back-migrate to '
+                    'their originals.')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='number of worker processes '
+                             '(default: one per CPU)')
+    parser.add_argument('manifests', nargs='+',
+                        help='manifests written by BatchMigrate.py')
+    args = parser.parse_args()
+
+    pairs = []  # type: List[Tuple[str, str]]
+    for manifest_filepath in args.manifests:
+        manifest = load_manifest(manifest_filepath)
+        pairs.extend((manifest[input_filepath]['output'], input_filepath)
+                     for input_filepath in sorted(manifest))
+
+    failures = verify_files(pairs, args.jobs)
+    sys.exit(1 if failures else 0)
@@ -1,14 +1,17 @@
+import numpy as np
+
 from typing import TYPE_CHECKING
 
 from ImageArea import ImageArea
 from Labels import Labels
 from MigrationInfo import remove_migration_task
+from Parsers import from_cursor_parser, parse_all_at
 from Tail import Tail
 from Value import IntegerValue
 from VicarSyntax import VicarSyntax
 
 if TYPE_CHECKING:
-    from typing import List, Optional, Tuple
+    from typing import IO, List, Optional, Tuple
     from LabelItem import LabelItem
 
 
@@ -34,11 +37,21 @@ def parse_vicar_file(byte_str):
     remaining bytes (must be empty, by construction) and the VicarFile
     object.
     """
-    from ImageArea import parse_image_area
-    from Labels import parse_labels
+    return from_cursor_parser(parse_vicar_file_at)(byte_str)
+
+
+def parse_vicar_file_at(src, pos):
+    # type: (str, int) -> Tuple[int, VicarFile]
+    """
+    Parse the bytes of src starting at offset pos into a VicarFile.
+    Return a 2-tuple of the offset of any remaining bytes (must be the
+    end of src, by construction) and the VicarFile object.
+    """
+    from ImageArea import parse_image_area_at
+    from Labels import parse_labels_at
 
     # Parse the labels.
-    byte_str, labels = parse_labels(byte_str)
+    pos, labels = parse_labels_at(src, pos)
 
     # Extract info from the labels needed for further parsing.
     binary_header_size = labels.get_binary_header_size()
@@ -47,16 +60,17 @@ def parse_vicar_file(byte_str):
     image_width = labels.get_image_width()
 
     # Parse the image area.
-    byte_str, image_area = parse_image_area(binary_header_size,
-                                            image_height,
-                                            prefix_width,
-                                            image_width,
-                                            byte_str)
+    pos, image_area = parse_image_area_at(binary_header_size,
+                                          image_height,
+                                          prefix_width,
+                                          image_width,
+                                          src,
+                                          pos)
 
     # If there are EOL labels, parse them.
     has_eol_labels = labels.get_int_value('EOL')
     if has_eol_labels:
-        byte_str, eol_labels = parse_labels(byte_str)
+        pos, eol_labels = parse_labels_at(src, pos)
     else:
         eol_labels = None
 
@@ -64,34 +78,84 @@ def parse_vicar_file(byte_str):
     # image area has binary prefixes.
     has_binary_prefixes = image_area.has_binary_prefixes()
     if has_binary_prefixes:
-        from Tail import parse_pds3_tail
-        byte_str, tail = parse_pds3_tail(byte_str)
+        from Tail import parse_pds3_tail_at
+        pos, tail = parse_pds3_tail_at(src, pos)
     else:
-        # Figure out how long the binary header in the tail is.
-        if False:
+        # If the file was migrated, any binary prefixes were moved
+        # into the tail.  Figure out how wide they are from the
+        # information saved in the migration task.
+        if labels.has_migration_task():
             migration_info, _history = remove_migration_task(
                 labels.history_labels)
-            old_label_items = migration_info.label_items
-            old_nlb = _get_int_value(old_label_items, 'NLB')
-            old_recsize = _get_int_value(old_label_items, 'RECSIZE')
-            binary_header_length = old_nlb * old_recsize
+            tail_prefix_width = _get_int_value(migration_info.label_items,
+                                               'NBB')
+        else:
+            tail_prefix_width = prefix_width
 
         # Parse the tail.
-        from Tail import parse_pds4_tail
-        byte_str, tail = parse_pds4_tail(image_height,
-                                         prefix_width,
-                                         byte_str)
+        from Tail import parse_pds4_tail_at
+        pos, tail = parse_pds4_tail_at(image_height,
+                                       tail_prefix_width,
+                                       src,
+                                       pos)
 
-    assert not byte_str, 'should consume all input'
+    assert pos == len(src), 'should consume all input'
 
     # Return the result.
-    return byte_str, VicarFile(labels, image_area, eol_labels, tail)
+    return pos, VicarFile(labels, image_area, eol_labels, tail)
+
+
+# The number of bytes we read to find the LBLSIZE at the start of a
+# set of labels.  LBLSIZE is always the first label item, so this is
+# plenty.
+_LBLSIZE_PROBE_LENGTH = 1024  # type: int
+
+
+def _read_labels_at(fileobj, offset):
+    # type: (IO[str], int) -> Labels
+    """
+    Read and parse only the Labels starting at the given offset of the
+    file.
+    """
+    import PlyParser  # to avoid circular import
+    from Labels import parse_labels_at
+
+    fileobj.seek(offset)
+    probe = fileobj.read(_LBLSIZE_PROBE_LENGTH)
+    lblsize = PlyParser.get_lblsize(probe)
+    if lblsize > len(probe):
+        label_bytes = probe + fileobj.read(lblsize - len(probe))
+    else:
+        label_bytes = probe[:lblsize]
+    return parse_all_at(parse_labels_at, label_bytes)
+
+
+def parse_vicar_labels(filepath):
+    # type: (str) -> Tuple[Labels, Optional[Labels]]
+    """
+    Read and parse only the labels and EOL labels (or None) of the
+    VICAR file at the given path.  The image area and tail are never
+    read: we find the EOL labels from LBLSIZE, NLB, RECSIZE and the
+    image height, and seek straight to them.
+    """
+    with open(filepath, 'rb') as f:
+        labels = _read_labels_at(f, 0)
+        if labels.get_int_value('EOL'):
+            recsize = labels.get_int_value('RECSIZE')
+            eol_labels_offset = sum([labels.get_lblsize(),
+                                     labels.get_binary_header_size(),
+                                     labels.get_image_height() * recsize])
+            eol_labels = _read_labels_at(f, eol_labels_offset)
+        else:
+            eol_labels = None
+    return labels, eol_labels
 
 
 class VicarFile(VicarSyntax):
     """
     Represents a full VICAR file, whether unmigrated or migrated.
     """
+    __slots__ = ('labels', 'image_area', 'eol_labels', 'tail')
 
     def __init__(self,
                  labels,
@@ -194,14 +258,37 @@ class VicarFile(VicarSyntax):
                     self.tail.to_byte_length()])
 
     def to_byte_string(self):
-        if self.eol_labels is None:
-            eol_labels_byte_string = ''
-        else:
-            eol_labels_byte_string = self.eol_labels.to_byte_string()
-        return ''.join([self.labels.to_byte_string(),
-                        self.image_area.to_byte_string(),
-                        eol_labels_byte_string,
-                        self.tail.to_byte_string()])
+        return self.to_byte_array().tobytes()
+
+    def to_byte_array(self):
+        # type: () -> np.ndarray
+        """
+        Return the bytes of the VICAR file as a 1-D uint8 array.  The
+        array is allocated once at its final size and each part of the
+        file is copied into place; for migrated files, that moves the
+        image lines and the binary prefixes (both strided views into
+        the original image area) with one vectorized copy each.
+        """
+        buf = np.empty(self.to_byte_length(), dtype=np.uint8)
+        offset = self.labels.copy_into(buf, 0)
+        offset = self.image_area.copy_into(buf, offset)
+        if self.eol_labels is not None:
+            offset = self.eol_labels.copy_into(buf, offset)
+        offset = self.tail.copy_into(buf, offset)
+        assert offset == len(buf)
+        return buf
+
+    def write_to(self, fileobj):
+        # type: (IO[str]) -> None
+        """
+        Write the parts of the VICAR file one after another, so the
+        whole file is never held in memory as a single byte-string.
+        """
+        self.labels.write_to(fileobj)
+        self.image_area.write_to(fileobj)
+        if self.eol_labels is not None:
+            self.eol_labels.write_to(fileobj)
+        self.tail.write_to(fileobj)
 
     def get_recsize(self):
         # type: () -> int
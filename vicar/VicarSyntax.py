@@ -2,14 +2,48 @@ from abc import ABCMeta, abstractmethod
 
 from typing import TYPE_CHECKING
 
+from ByteBlocks import copy_bytes_into
+
 if TYPE_CHECKING:
-    from typing import Optional
+    from typing import IO, Optional
+    import numpy as np
     from Parsers import Parser
 
 
+# How thoroughly the VicarSyntax constructors check their arguments.
+# FULL_VALIDATION checks everything.  CHEAP_VALIDATION skips checking
+# the type of every element of lists of children (every LabelItem of a
+# Task, and so on), but still checks sizes and required keywords.  Use
+# it only for trusted input, such as batch runs over files that have
+# been parsed before.
+FULL_VALIDATION = 'full'  # type: str
+CHEAP_VALIDATION = 'cheap'  # type: str
+
+_validation_level = FULL_VALIDATION  # type: str
+
+
+def set_validation_level(level):
+    # type: (str) -> None
+    """Set the validation level for all VicarSyntax constructors."""
+    global _validation_level
+    assert level in [FULL_VALIDATION, CHEAP_VALIDATION]
+    _validation_level = level
+
+
+def full_validation():
+    # type: () -> bool
+    """Return True if constructors should check everything."""
+    return _validation_level == FULL_VALIDATION
+
+
 class VicarSyntax(object):
-    """Elements of VICAR syntax."""
+    """
+    Elements of VICAR syntax.  They are immutable once constructed, so
+    subclasses may compute their byte length once, when constructed,
+    and use __slots__ to save memory.
+    """
     __metaclass__ = ABCMeta
+    __slots__ = ()
 
     def syntax_parser(self):
         # type: () -> Optional[Parser]
@@ -31,6 +65,25 @@ class VicarSyntax(object):
         """Return the length of the byte-string for this syntax."""
         return len(self.to_byte_string())
 
+    def write_to(self, fileobj):
+        # type: (IO[str]) -> None
+        """
+        Write the byte-string for this syntax to the file object.
+        Overloaded in subclasses that can write themselves in pieces
+        without building the whole byte-string first.
+        """
+        fileobj.write(self.to_byte_string())
+
+    def copy_into(self, buf, offset):
+        # type: (np.ndarray, int) -> int
+        """
+        Copy the byte-string for this syntax into the preallocated 1-D
+        uint8 array buf at offset.  Return the offset just past it.
+        Overloaded in subclasses that hold blocks of bytes and can
+        copy them without building a byte-string first.
+        """
+        return copy_bytes_into(self.to_byte_string(), buf, offset)
+
 
 def maybe_bs(byte_str):
     # type: (str) -> str
@@ -1,4 +1,7 @@
 from abc import ABCMeta, abstractmethod
+from StringIO import StringIO
+
+import numpy as np
 
 from typing import TYPE_CHECKING
 
@@ -59,6 +62,29 @@ class VicarSyntaxTests(object):
         for arg in self.args_for_test():
             self.assertEqual(len(arg.to_byte_string()), arg.to_byte_length())
 
+    def test_write_to(self):
+        # type: () -> None
+        """
+        Verify that write_to() writes the same bytes as
+        to_byte_string().
+        """
+        for arg in self.args_for_test():
+            fileobj = StringIO()
+            arg.write_to(fileobj)
+            self.assertEqual(arg.to_byte_string(), fileobj.getvalue())
+
+    def test_copy_into(self):
+        # type: () -> None
+        """
+        Verify that copy_into() copies the same bytes as
+        to_byte_string() and returns the offset past them.
+        """
+        for arg in self.args_for_test():
+            length = arg.to_byte_length()
+            buf = np.zeros(length + 2, dtype=np.uint8)
+            self.assertEqual(length + 1, arg.copy_into(buf, 1))
+            self.assertEqual(arg.to_byte_string(), buf[1:-1].tobytes())
+
     def test_repr(self):
         """
         Verify that evaluating repr(arg) is equal to arg.
@@ -0,0 +1,27 @@
+import unittest
+
+from BackMigration import *
+from HistoryLabels import HistoryLabels
+from PropertyLabels import PropertyLabels
+from test_SystemLabels import gen_system_labels
+
+
+class TestBackMigration(unittest.TestCase):
+    def test_make_trimmed_labels(self):
+        system_labels = gen_system_labels(LBLSIZE=40, RECSIZE=8)
+        length = system_labels.to_byte_length()
+        padding = (40 - length) * '\0'
+
+        # trim the excess padding
+        labels = make_trimmed_labels(system_labels,
+                                     PropertyLabels([]),
+                                     HistoryLabels([]),
+                                     padding + 8 * '\0')
+        self.assertEqual(40, labels.to_byte_length())
+
+        # nothing to trim
+        labels = make_trimmed_labels(system_labels,
+                                     PropertyLabels([]),
+                                     HistoryLabels([]),
+                                     padding)
+        self.assertEqual(40, labels.to_byte_length())
@@ -0,0 +1,155 @@
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from BatchMigrate import *
+from HistoryLabels import HistoryLabels, Task
+from ImageArea import ImageArea
+from LabelItem import LabelItem
+from Labels import Labels
+from PropertyLabels import PropertyLabels
+from StringUtils import generate_block, generate_line
+from SystemLabels import SystemLabels
+from Tail import Tail
+from Value import StringValue
+from VicarFile import VicarFile
+from test_SystemLabels import gen_system_labels
+
+
+def gen_vicar_file():
+    # type: () -> VicarFile
+    labels = Labels.create_labels_with_adjusted_lblsize(
+        gen_system_labels(LBLSIZE=0, RECSIZE=10, NBB=2, N2=3, N3=1),
+        PropertyLabels([]),
+        HistoryLabels([]),
+        None)
+    return VicarFile(labels,
+                     ImageArea(None, generate_block(2, 3),
+                               generate_block(8, 3)),
+                     None,
+                     Tail(None, generate_line(5)))
+
+
+def gen_cassini_bug_vicar_file():
+    # type: () -> VicarFile
+    """
+    A VICAR file with the Cassini bug: an unescaped quote in a history
+    label string, which the fix escapes by taking a space from after
+    LBLSIZE.
+    """
+    label_items = gen_system_labels(LBLSIZE=0, RECSIZE=10, NBB=2,
+                                    N2=3, N3=1).label_items
+    lblsize = label_items[0]
+    label_items[0] = LabelItem(lblsize.initial_space, lblsize.keyword,
+                               lblsize.equals, lblsize.value, '  ')
+    task = Task([LabelItem.create('TASK', StringValue("'ISS'")),
+                 LabelItem.create('USER', StringValue("'ME'")),
+                 LabelItem.create('DAT_TIM', StringValue("'NOW'")),
+                 LabelItem.create('MESSAGE',
+                                  StringValue("'MOVE FW'S WHEEL'"))])
+    labels = Labels.create_labels_with_adjusted_lblsize(
+        SystemLabels(label_items),
+        PropertyLabels([]),
+        HistoryLabels([task]),
+        None)
+    return VicarFile(labels,
+                     ImageArea(None, generate_block(2, 3),
+                               generate_block(8, 3)),
+                     None,
+                     Tail(None, generate_line(5)))
+
+
+class TestBatchMigrate(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.manifest_filepath = os.path.join(self.tmp_dir, 'manifest.jsonl')
+        self.input_filepaths = [os.path.join(self.tmp_dir, name)
+                                for name in ['A.IMG', 'B.IMG']]
+        for input_filepath in self.input_filepaths:
+            with open(input_filepath, 'wb') as f:
+                gen_vicar_file().write_to(f)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_find_vicar_files(self):
+        with open(os.path.join(self.tmp_dir, 'notes.txt'), 'w') as f:
+            f.write('not a VICAR file')
+        self.assertEqual(self.input_filepaths,
+                         find_vicar_files([self.tmp_dir]))
+        self.assertEqual(self.input_filepaths[:1],
+                         find_vicar_files(self.input_filepaths[:1]))
+
+    def test_migrate_files(self):
+        tasks = [(input_filepath, input_filepath + '.out', input_filepath)
+                 for input_filepath in self.input_filepaths]
+        self.assertEqual([], migrate_files(tasks, self.manifest_filepath, 2))
+        manifest = load_manifest(self.manifest_filepath)
+        self.assertEqual(set(self.input_filepaths), set(manifest.keys()))
+        for task in tasks:
+            self.assertTrue(os.path.exists(task[1]))
+            self.assertTrue(is_already_migrated(manifest, task))
+
+        # Nothing is left to do, so nothing is appended to the
+        # manifest.
+        self.assertEqual([], migrate_files(tasks, self.manifest_filepath, 2))
+        with open(self.manifest_filepath) as f:
+            self.assertEqual(2, len(f.readlines()))
+
+        # A missing output is redone.
+        os.remove(tasks[0][1])
+        self.assertFalse(is_already_migrated(manifest, tasks[0]))
+        self.assertEqual([], migrate_files(tasks, self.manifest_filepath, 2))
+        self.assertTrue(os.path.exists(tasks[0][1]))
+
+        # So are a truncated output and a replaced one of the same
+        # size.
+        manifest = load_manifest(self.manifest_filepath)
+        with open(tasks[0][1], 'r+b') as f:
+            f.truncate(10)
+        self.assertFalse(is_already_migrated(manifest, tasks[0]))
+        with open(tasks[1][1], 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write('\1')
+        self.assertFalse(is_already_migrated(manifest, tasks[1]))
+        self.assertEqual([], migrate_files(tasks, self.manifest_filepath, 2))
+        manifest = load_manifest(self.manifest_filepath)
+        for task in tasks:
+            self.assertTrue(is_already_migrated(manifest, task))
+
+        # A vanished input is not migrated, rather than an error.
+        os.remove(tasks[0][0])
+        self.assertFalse(is_already_migrated(manifest, tasks[0]))
+
+    def test_migrate_files_failure(self):
+        bad_filepath = os.path.join(self.tmp_dir, 'BAD.IMG')
+        with open(bad_filepath, 'wb') as f:
+            f.write('LBLSIZE=100')
+        task = (bad_filepath, bad_filepath + '.out', bad_filepath)
+        failures = migrate_files([task], self.manifest_filepath, 1)
+        self.assertEqual([bad_filepath], [failure['input']
+                                          for failure in failures])
+        self.assertFalse(os.path.exists(task[1]))
+        self.assertEqual([], [name for name in os.listdir(self.tmp_dir)
+                              if name.endswith('.tmp')])
+        self.assertEqual({}, load_manifest(self.manifest_filepath))
+
+    def test_migrate_files_verify(self):
+        tasks = [(input_filepath, input_filepath + '.out', input_filepath)
+                 for input_filepath in self.input_filepaths]
+        self.assertEqual([], migrate_files(tasks, self.manifest_filepath, 2,
+                                           verify=True, trusted=True))
+        self.assertEqual(set(self.input_filepaths),
+                         set(load_manifest(self.manifest_filepath).keys()))
+
+    def test_migrate_files_verify_cassini_bug(self):
+        with open(self.input_filepaths[0], 'wb') as f:
+            gen_cassini_bug_vicar_file().write_to(f)
+        tasks = [(input_filepath, input_filepath + '.out', input_filepath)
+                 for input_filepath in self.input_filepaths]
+        self.assertEqual([], migrate_files(tasks, self.manifest_filepath, 2,
+                                           verify=True))
+        for task in tasks:
+            self.assertTrue(os.path.exists(task[1]))
@@ -0,0 +1,63 @@
+import unittest
+
+import numpy as np
+
+from ByteBlocks import *
+
+
+class TestByteBlocks(unittest.TestCase):
+    def test_lines_to_block(self):
+        block = lines_to_block(['abc', 'def'])
+        self.assertEqual((2, 3), block.shape)
+        self.assertEqual(np.uint8, block.dtype)
+        self.assertEqual('abcdef', block.tobytes())
+
+        self.assertEqual((0, 0), lines_to_block([]).shape)
+        self.assertEqual((2, 0), lines_to_block(['', '']).shape)
+
+        with self.assertRaises(Exception):
+            lines_to_block(['abc', 'de'])
+
+    def test_block_to_lines(self):
+        lines = ['abc', 'def']
+        self.assertEqual(lines, block_to_lines(lines_to_block(lines)))
+        self.assertEqual([], block_to_lines(lines_to_block([])))
+
+    def test_as_block(self):
+        self.assertIsNone(as_block(None))
+        block = lines_to_block(['ab', 'cd'])
+        self.assertIs(block, as_block(block))
+        self.assertTrue(blocks_are_equal(block, as_block(['ab', 'cd'])))
+
+    def test_block_at(self):
+        src = 'xxabcdefyy'
+        block = block_at(2, 3, src, 2)
+        self.assertEqual(['abc', 'def'], block_to_lines(block))
+        self.assertEqual((0, 3), block_at(0, 3, src, 10).shape)
+
+        with self.assertRaises(Exception):
+            block_at(3, 3, src, 2)
+
+    def test_blocks_are_equal(self):
+        self.assertTrue(blocks_are_equal(None, None))
+        self.assertFalse(blocks_are_equal(None, lines_to_block(['a'])))
+        self.assertFalse(blocks_are_equal(lines_to_block(['ab']),
+                                          lines_to_block(['a', 'b'])))
+        self.assertTrue(blocks_are_equal(lines_to_block(['ab']),
+                                         block_at(1, 2, 'ab', 0)))
+        self.assertTrue(blocks_are_equal(lines_to_block([]),
+                                         block_at(0, 2, 'ab', 0)))
+
+    def test_copy_bytes_into(self):
+        buf = np.zeros(5, dtype=np.uint8)
+        self.assertEqual(4, copy_bytes_into('abc', buf, 1))
+        self.assertEqual('\0abc\0', buf.tobytes())
+        self.assertEqual(4, copy_bytes_into('', buf, 4))
+
+    def test_copy_block_into(self):
+        # copy the strided columns of a wider block
+        block = lines_to_block(['abcd', 'efgh'])
+        buf = np.zeros(6, dtype=np.uint8)
+        self.assertEqual(5, copy_block_into(block[:, 1:3], buf, 1))
+        self.assertEqual('\0bcfg\0', buf.tobytes())
+        self.assertEqual(3, copy_block_into(block[:, :0], buf, 3))
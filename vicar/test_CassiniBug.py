@@ -0,0 +1,33 @@
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from CassiniBug import *
+from test_BatchMigrate import gen_cassini_bug_vicar_file, gen_vicar_file
+
+
+class TestCassiniBug(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filepath = os.path.join(self.tmp_dir, 'A.IMG')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_has_cassini_bug(self):
+        with open(self.filepath, 'wb') as f:
+            gen_vicar_file().write_to(f)
+        self.assertFalse(has_cassini_bug(self.filepath))
+
+        vicar_file = gen_cassini_bug_vicar_file()
+        with open(self.filepath, 'wb') as f:
+            vicar_file.write_to(f)
+        self.assertTrue(has_cassini_bug(self.filepath))
+
+        # Only the labels are read: the check still works with the
+        # image area cut off.
+        with open(self.filepath, 'r+b') as f:
+            f.truncate(vicar_file.labels.to_byte_length())
+        self.assertTrue(has_cassini_bug(self.filepath))
@@ -1,4 +1,5 @@
 import unittest
+from StringIO import StringIO
 
 from ImageArea import *
 from StringUtils import generate_block, generate_line
@@ -64,3 +65,12 @@ class TestImageArea(unittest.TestCase, VicarSyntaxTests):
 
         image_area = ImageArea(header, prefixes, image_lines)
         self.assertTrue(image_area.has_binary_prefixes())
+
+    def test_write_to_in_chunks(self):
+        # big enough that write_to() needs several chunks
+        image_area = ImageArea(generate_line(2 * 1024),
+                               generate_block(24, 3000),
+                               generate_block(1000, 3000))
+        fileobj = StringIO()
+        image_area.write_to(fileobj)
+        self.assertEqual(image_area.to_byte_string(), fileobj.getvalue())
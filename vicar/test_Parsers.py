@@ -22,3 +22,42 @@ class TestParsers(unittest.TestCase):
 
         with self.assertRaises(Exception):
             parse_all(bytes(3), byte_str)
+
+    def test_bytes_at(self):
+        src = 'barfoo'
+        with self.assertRaises(Exception):
+            bytes_at(12)(src, 0)
+        with self.assertRaises(Exception):
+            bytes_at(4)(src, 3)
+
+        self.assertEqual((3, 'bar'), bytes_at(3)(src, 0))
+        self.assertEqual((6, 'foo'), bytes_at(3)(src, 3))
+
+    def test_repeat_at(self):
+        src = 'foobarbaz'
+        self.assertEqual((9, ['foo', 'bar', 'baz']),
+                         repeat_at(3, bytes_at(3))(src, 0))
+        self.assertEqual((9, ['bar', 'baz']),
+                         repeat_at(2, bytes_at(3))(src, 3))
+        self.assertEqual((3, []), repeat_at(0, bytes_at(3))(src, 3))
+
+    def test_rest_of_input_at(self):
+        src = 'foobar'
+        self.assertEqual((6, 'bar'), rest_of_input_at(src, 3))
+        self.assertEqual((6, ''), rest_of_input_at(src, 6))
+
+    def test_parse_all_at(self):
+        src = 'foobar'
+        self.assertEqual('foobar', parse_all_at(bytes_at(6), src))
+        self.assertEqual('bar', parse_all_at(bytes_at(3), src, 3))
+
+        with self.assertRaises(Exception):
+            parse_all_at(bytes_at(3), src)
+
+    def test_from_cursor_parser(self):
+        byte_str = 'foobar'
+        self.assertEqual(('bar', 'foo'),
+                         from_cursor_parser(bytes_at(3))(byte_str))
+        self.assertEqual(('foobar', []),
+                         from_cursor_parser(repeat_at(0, bytes_at(3)))(
+                             byte_str))
@@ -0,0 +1,27 @@
+import unittest
+
+from PlyParser import *
+
+
+class TestPlyParser(unittest.TestCase):
+    def test_get_lexer(self):
+        self.assertIs(get_lexer(), get_lexer())
+
+    def test_get_parser(self):
+        self.assertIs(get_parser('labelitem'), get_parser('labelitem'))
+        self.assertIsNot(get_parser('labelitem'), get_parser('task'))
+
+    def test_get_lblsize(self):
+        self.assertEqual(24, get_lblsize('LBLSIZE=24  FORMAT=BYTE'))
+        self.assertEqual(24, get_lblsize(' LBLSIZE=24  FORMAT=BYTE'))
+        self.assertEqual(36, get_lblsize('\0\0\0LBLSIZE = 36 NS=4', 3))
+
+    def test_ply_parse(self):
+        # Parsers for different start symbols share the lexer, so
+        # interleaving them must not leak state from one to the
+        # other.
+        label_item = ply_parse_label_item('NS=4')
+        system_labels = ply_parse_system_labels('LBLSIZE=24 NS=4')
+        self.assertEqual(label_item, ply_parse_label_item('NS=4'))
+        self.assertEqual(system_labels,
+                         ply_parse_system_labels('LBLSIZE=24 NS=4'))
@@ -0,0 +1,79 @@
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+from Migrate import migrate_file
+from VerifyMigration import *
+from test_BatchMigrate import gen_cassini_bug_vicar_file, gen_vicar_file
+
+
+class TestVerifyMigration(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.pds3_filepath = os.path.join(self.tmp_dir, 'A.IMG')
+        self.pds4_filepath = os.path.join(self.tmp_dir, 'A_pds4.img')
+        with open(self.pds3_filepath, 'wb') as f:
+            gen_vicar_file().write_to(f)
+        migrate_file(self.pds3_filepath, self.pds4_filepath)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_comparing_writer(self):
+        writer = ComparingWriter(StringIO('foobar'))
+        writer.write('foo')
+        writer.write('bar')
+        self.assertIsNone(writer.finish())
+
+        writer = ComparingWriter(StringIO('foobar'))
+        writer.write('foo')
+        with self.assertRaises(Exception):
+            writer.write('baz')
+        self.assertEqual(5, writer.finish())
+
+        writer = ComparingWriter(StringIO('foobar'))
+        writer.write('foo')
+        self.assertEqual(3, writer.finish())
+
+        writer = ComparingWriter(StringIO('foo'))
+        with self.assertRaises(Exception):
+            writer.write('foobar')
+        self.assertEqual(3, writer.finish())
+
+    def test_verify_file(self):
+        self.assertIsNone(verify_file(self.pds4_filepath, self.pds3_filepath))
+
+        # Change a byte of a binary prefix in the original.
+        with open(self.pds3_filepath, 'r+b') as f:
+            f.seek(-20, os.SEEK_END)
+            f.write('\1')
+        size = os.path.getsize(self.pds3_filepath)
+        self.assertEqual(size - 20,
+                         verify_file(self.pds4_filepath, self.pds3_filepath))
+
+    def test_verify_file_cassini_bug(self):
+        with open(self.pds3_filepath, 'wb') as f:
+            gen_cassini_bug_vicar_file().write_to(f)
+        migrate_file(self.pds3_filepath, self.pds4_filepath)
+        self.assertIsNone(verify_file(self.pds4_filepath, self.pds3_filepath))
+
+        # The fix is not a license to differ elsewhere.
+        with open(self.pds3_filepath, 'r+b') as f:
+            f.seek(-20, os.SEEK_END)
+            f.write('\1')
+        size = os.path.getsize(self.pds3_filepath)
+        self.assertEqual(size - 20,
+                         verify_file(self.pds4_filepath, self.pds3_filepath))
+
+    def test_verify_files(self):
+        pairs = [(self.pds4_filepath, self.pds3_filepath)]
+        self.assertEqual([], verify_files(pairs, 1))
+
+        with open(self.pds3_filepath, 'ab') as f:
+            f.write('extra')
+        failures = verify_files(pairs, 1)
+        self.assertEqual([self.pds3_filepath],
+                         [failure['input'] for failure in failures])
@@ -1,3 +1,6 @@
+import os
+import shutil
+import tempfile
 import unittest
 
 from HistoryLabels import HistoryLabels
@@ -6,7 +9,7 @@ from Labels import Labels
 from PropertyLabels import PropertyLabels
 from StringUtils import generate_block, generate_line
 from Tail import Tail
-from VicarFile import VicarFile, parse_vicar_file
+from VicarFile import VicarFile, parse_vicar_file, parse_vicar_labels
 from VicarSyntaxTests import VicarSyntaxTests
 from test_SystemLabels import gen_system_labels
 
@@ -207,3 +210,27 @@ class TestVicarFile(unittest.TestCase, VicarSyntaxTests):
             return parse_vicar_file
         else:
             return None
+
+    def test_parse_vicar_labels(self):
+        labels = gen_labels(RECSIZE=10, LBLSIZE=10, EOL=1, NBB=2, NLB=1,
+                            N2=3, N3=2)
+        eol_labels = gen_eol_labels(10, LBLSIZE=10, NS=8)
+        image_area = ImageArea(generate_line(10),
+                               generate_block(2, 6),
+                               generate_block(8, 6))
+        tail = Tail(None, generate_line(7))
+        vicar_files = [VicarFile(labels, image_area, eol_labels, tail),
+                       VicarFile(gen_labels(RECSIZE=10, LBLSIZE=10, NBB=2,
+                                            NLB=1, N2=3, N3=2),
+                                 image_area, None, tail)]
+
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filepath = os.path.join(tmp_dir, 'test.IMG')
+            for vicar_file in vicar_files:
+                with open(filepath, 'wb') as f:
+                    vicar_file.write_to(f)
+                self.assertEqual((vicar_file.labels, vicar_file.eol_labels),
+                                 parse_vicar_labels(filepath))
+        finally:
+            shutil.rmtree(tmp_dir)
@@ -0,0 +1,45 @@
+import unittest
+
+from HistoryLabels import Task
+from LabelItem import LabelItem
+from SystemLabels import SystemLabels
+from VicarSyntax import *
+from test_SystemLabels import gen_label_items
+
+
+class TestVicarSyntax(unittest.TestCase):
+    def tearDown(self):
+        set_validation_level(FULL_VALIDATION)
+
+    def test_set_validation_level(self):
+        self.assertTrue(full_validation())
+        set_validation_level(CHEAP_VALIDATION)
+        self.assertFalse(full_validation())
+        set_validation_level(FULL_VALIDATION)
+        self.assertTrue(full_validation())
+        with self.assertRaises(Exception):
+            set_validation_level('none')
+
+    def test_cheap_validation(self):
+        label_items = gen_label_items(LBLSIZE=1, NS=3)
+        set_validation_level(CHEAP_VALIDATION)
+        system_labels = SystemLabels(label_items)
+        self.assertEqual(system_labels.to_byte_length(),
+                         len(system_labels.to_byte_string()))
+
+        # structural checks are still made
+        with self.assertRaises(Exception):
+            SystemLabels(label_items[1:])
+        with self.assertRaises(Exception):
+            Task(label_items)
+
+    def test_maybe_bs(self):
+        self.assertEqual('', maybe_bs(None))
+        self.assertEqual('foo', maybe_bs('foo'))
+
+    def test_round_to_multiple_of(self):
+        self.assertEqual(0, round_to_multiple_of(0, 4))
+        self.assertEqual(4, round_to_multiple_of(1, 4))
+        self.assertEqual(4, round_to_multiple_of(4, 4))
+        with self.assertRaises(Exception):
+            round_to_multiple_of(4, 0)